@@ -0,0 +1,69 @@
+# Offline stand-in for the NBA client, serving responses recorded by benchmarks.record_fixtures
+from collections import Counter, namedtuple
+from data.replay import get_placeholder_logo
+from PIL import Image
+import json
+import os
+import zlib
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# The parts of a requests.Response that PlayByPlayStore reads
+FixtureResponse = namedtuple('FixtureResponse', ['content', 'headers'])
+
+
+def get_fixture_path(*parts):
+  return os.path.join(FIXTURE_DIR, *parts)
+
+
+class FixtureClient(object):
+
+  def __init__(self, directory=FIXTURE_DIR):
+    self.directory = directory
+    self.calls = Counter()
+    self._contents = {}
+
+  def _read(self, name):
+    if name not in self._contents:
+      with open(os.path.join(self.directory, name), 'rb') as f:
+        self._contents[name] = f.read()
+    return self._contents[name]
+
+  # Parsed fresh on every call, like a real response would be
+  def _load(self, name):
+    self.calls[name] += 1
+    return json.loads(self._read(name))
+
+  def get_game(self, game_id):
+    return self._load('boxscore.json')['game']
+
+  def get_games_for_today(self):
+    return self._load('scoreboard.json')['scoreboard']['games']
+
+  def get_playbyplay(self, game_id):
+    return self._load('playbyplay.json')['game']
+
+  def get_playbyplay_if_modified(self, game_id, etag=None, last_modified=None):
+    self.calls['playbyplay.json'] += 1
+    content = self._read('playbyplay.json')
+    fixture_etag = '"%08x"' % zlib.crc32(content)
+    if etag == fixture_etag:
+      return None
+    return FixtureResponse(content, {'ETag': fixture_etag})
+
+  def get_standings(self):
+    result_sets = self._load('standings.json')['resultSets']
+    return next(result['rowSet'] for result in result_sets if result['name'] == 'Standings')
+
+  def get_image(self, url):
+    self.calls['logo'] += 1
+    path = os.path.join(self.directory, 'logos', os.path.basename(url))
+    if os.path.exists(path):
+      with Image.open(path) as img:
+        img.load()
+        return img
+    return get_placeholder_logo(url)
+
+  def close(self):
+    pass
+
@@ -0,0 +1,237 @@
+# Records the fixtures the benchmarks run against from the live NBA endpoints.
+# Run from the repository root: python -m benchmarks.record_fixtures [game_id]
+# Without a game id, the first finished game on today's scoreboard is recorded. With --synthetic,
+# a made-up but realistically shaped game is generated instead, for machines without network.
+from benchmarks.fixtures import FIXTURE_DIR, get_fixture_path
+from data.teams import get_team_by_abbreviation, get_teams
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import random
+import sys
+
+SYNTHETIC_GAME_ID = '0022200555'
+SYNTHETIC_TIPOFF = datetime(2023, 1, 5, 0, 30, tzinfo=timezone.utc)
+SYNTHETIC_TEAMS = ('MIL', 'CHI')  # Away, home
+
+STANDINGS_HEADERS = [
+    'LeagueID', 'SeasonID', 'TeamID', 'TeamCity', 'TeamName', 'Conference', 'ConferenceRecord',
+    'PlayoffRank', 'ClinchIndicator', 'Division', 'DivisionRecord', 'DivisionRank', 'WINS',
+    'LOSSES', 'WinPCT', 'LeagueRank', 'Record', 'HOME', 'ROAD', 'L10'
+]
+
+
+def record(game_id=None):
+  # Only needed when recording, so the benchmarks themselves never touch the network
+  from nba_api.live.nba.endpoints import boxscore, playbyplay, scoreboard
+  from nba_api.stats.endpoints.leaguestandings import LeagueStandings
+  from data.nba_client import get_client
+  from data.nba_data import get_logo_url
+
+  scoreboard_json = scoreboard.ScoreBoard().get_json()
+  if game_id is None:
+    games = json.loads(scoreboard_json)['scoreboard']['games']
+    finished = [game for game in games if game['gameStatus'] == 3]
+    if not finished:
+      raise Exception('No finished games today, pass a game id to record')
+    game_id = finished[0]['gameId']
+
+  boxscore_json = boxscore.BoxScore(game_id).get_json()
+  _write('scoreboard.json', scoreboard_json)
+  _write('boxscore.json', boxscore_json)
+  _write('playbyplay.json', playbyplay.PlayByPlay(game_id).get_json())
+  _write('standings.json', LeagueStandings().get_json())
+
+  game = json.loads(boxscore_json)['game']
+  for team in (game['awayTeam'], game['homeTeam']):
+    url = get_logo_url(team['teamId'])
+    get_client().get_image(url).save(get_fixture_path('logos', os.path.basename(url)))
+
+
+def generate(seed=0):
+  rng = random.Random(seed)
+  away, home = [get_team_by_abbreviation(tricode) for tricode in SYNTHETIC_TEAMS]
+  actions = _generate_actions(rng, away, home)
+  final = actions[-1]
+
+  game = _get_game(SYNTHETIC_GAME_ID, SYNTHETIC_TIPOFF, away, home, 3, 'Final', 4, 'PT00M00.00S',
+                   int(final['scoreAway']), int(final['scoreHome']))
+  _write_json('boxscore.json', {'meta': _get_meta(), 'game': game})
+  _write_json('playbyplay.json', {
+      'meta': _get_meta(),
+      'game': {
+          'gameId': SYNTHETIC_GAME_ID,
+          'actions': actions
+      }
+  })
+
+  # The rest of the slate, in every state a scoreboard can be in
+  games = [game]
+  others = [team for team in get_teams() if team['id'] not in (away['id'], home['id'])]
+  rng.shuffle(others)
+  for i in range(7):
+    game_away, game_home = others[2 * i], others[2 * i + 1]
+    tipoff = SYNTHETIC_TIPOFF + timedelta(minutes=30 * (i - 2))
+    if i < 3:
+      state = (3, 'Final', 4, 'PT00M00.00S', rng.randint(90, 130), rng.randint(90, 130))
+    elif i < 5:
+      state = (2, 'Q3 5:12', 3, 'PT05M12.00S', rng.randint(60, 90), rng.randint(60, 90))
+    else:
+      state = (1, tipoff.strftime('%I:%M %p ET'), 0, '', 0, 0)
+    games.append(
+        _get_game('00222005%02d' % (60 + i), tipoff, game_away, game_home, *state))
+  _write_json('scoreboard.json', {
+      'meta': _get_meta(),
+      'scoreboard': {
+          'gameDate': SYNTHETIC_TIPOFF.strftime('%Y-%m-%d'),
+          'leagueId': '00',
+          'leagueName': 'National Basketball Association',
+          'games': games
+      }
+  })
+
+  rows = []
+  for team in get_teams():
+    wins = rng.randint(8, 30)
+    losses = 38 - wins
+    rows.append([
+        '00', '22022', team['id'], team['city'], team['nickname'], 'East', '10-10',
+        0, '', 'Central', '5-5', 0, wins, losses, round(wins / 38, 3), 0,
+        '%d-%d' % (wins, losses), '', '', '5-5'
+    ])
+  _write_json('standings.json', {
+      'resource': 'leaguestandings',
+      'parameters': {},
+      'resultSets': [{
+          'name': 'Standings',
+          'headers': STANDINGS_HEADERS,
+          'rowSet': rows
+      }]
+  })
+
+
+def _generate_actions(rng, away, home):
+  actions = []
+  score = {away['id']: 0, home['id']: 0}
+  wall_clock = SYNTHETIC_TIPOFF
+
+  def add(period, clock, team, action_type, sub_type='', description='', points=0):
+    nonlocal wall_clock
+    if team:
+      score[team['id']] += points
+    actions.append({
+        'actionNumber': len(actions) + 1,
+        'clock': 'PT%02dM%05.2fS' % (clock // 60, clock % 60),
+        'timeActual': wall_clock.strftime('%Y-%m-%dT%H:%M:%S.') + '%dZ' % rng.randint(0, 9),
+        'period': period,
+        'periodType': 'REGULAR',
+        'teamId': team['id'] if team else None,
+        'teamTricode': team['abbreviation'] if team else None,
+        'actionType': action_type,
+        'subType': sub_type,
+        'qualifiers': [],
+        'personId': 0,
+        'scoreHome': str(score[home['id']]),
+        'scoreAway': str(score[away['id']]),
+        'edited': wall_clock.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'orderNumber': (len(actions) + 1) * 10000,
+        'isFieldGoal': int(action_type in ('2pt', '3pt')),
+        'description': description,
+    })
+
+  for period in range(1, 5):
+    clock = 12 * 60.0
+    add(period, clock, None, 'period', 'start', 'Start of %d%s Period' %
+        (period, {1: 'st', 2: 'nd', 3: 'rd'}.get(period, 'th')))
+    team = away if period % 2 else home
+    while clock > 0:
+      elapsed = min(clock, rng.uniform(6, 20))
+      clock -= elapsed
+      wall_clock += timedelta(seconds=elapsed * rng.uniform(1.1, 1.6))
+      if clock <= 0:
+        break
+
+      roll = rng.random()
+      if roll < 0.35:
+        add(period, clock, team, '2pt', 'jumpshot', 'Jump Shot', 2)
+      elif roll < 0.5:
+        add(period, clock, team, '3pt', 'jumpshot', '3PT Jump Shot', 3)
+      elif roll < 0.6:
+        add(period, clock, team, 'foul', 'personal', 'Personal Foul')
+        wall_clock += timedelta(seconds=rng.uniform(20, 40))
+        for _ in range(2):
+          made = rng.random() < 0.78
+          add(period, clock, team, 'freethrow', '1 of 2', 'Free Throw', 1 if made else 0)
+      elif roll < 0.68:
+        add(period, clock, team, 'turnover', 'bad pass', 'Bad Pass Turnover')
+      elif roll < 0.7:
+        add(period, clock, team, 'timeout', 'full', 'Timeout')
+        wall_clock += timedelta(seconds=rng.uniform(90, 150))
+      elif roll < 0.71:
+        add(period, clock, None, 'instantreplay', 'challenge', 'Instant Replay')
+        wall_clock += timedelta(seconds=rng.uniform(60, 120))
+      else:
+        add(period, clock, team, '2pt', 'layup', 'MISS Layup')
+        add(period, clock, away if team is home else home, 'rebound', 'defensive', 'Rebound')
+      team = away if team is home else home
+
+    add(period, 0, None, 'period', 'end', 'End of period')
+    wall_clock += timedelta(minutes=15 if period == 2 else 2.5)
+  add(4, 0, None, 'game', 'end', 'Game End')
+  return actions
+
+
+def _get_team(team, score):
+  return {
+      'teamId': team['id'],
+      'teamName': team['nickname'],
+      'teamCity': team['city'],
+      'teamTricode': team['abbreviation'],
+      'score': score,
+      'inBonus': '0',
+      'timeoutsRemaining': 0,
+  }
+
+
+def _get_game(game_id, tipoff, away, home, status, status_text, period, clock, away_score,
+              home_score):
+  return {
+      'gameId': game_id,
+      'gameCode': '%s/%s%s' % (tipoff.strftime('%Y%m%d'), away['abbreviation'],
+                               home['abbreviation']),
+      'gameStatus': status,
+      'gameStatusText': status_text,
+      'period': period,
+      'gameClock': clock,
+      'gameTimeUTC': tipoff.strftime('%Y-%m-%dT%H:%M:%SZ'),
+      'regulationPeriods': 4,
+      'awayTeam': _get_team(away, away_score),
+      'homeTeam': _get_team(home, home_score),
+  }
+
+
+def _get_meta():
+  return {'version': 1, 'code': 200, 'request': 'synthetic', 'time': '2023-01-05 03:00:00.000'}
+
+
+def _write(name, text):
+  os.makedirs(FIXTURE_DIR, exist_ok=True)
+  with open(get_fixture_path(name), 'w') as f:
+    f.write(text)
+
+
+def _write_json(name, data):
+  _write(name, json.dumps(data))
+
+
+def main():
+  if '--synthetic' in sys.argv[1:]:
+    generate()
+  else:
+    os.makedirs(get_fixture_path('logos'), exist_ok=True)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    record(args[0] if args else None)
+
+
+if __name__ == '__main__':
+  main()
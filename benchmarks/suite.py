@@ -0,0 +1,246 @@
+# Times the rendering and data hot paths offline, against the recorded fixtures.
+# Run from the repository root: python -m benchmarks.suite [options]
+#   --filter TEXT     only run benchmarks whose name contains TEXT
+#   --save PATH       save the results as a baseline
+#   --compare PATH    compare against a saved baseline, exiting with 1 on any regression
+#   --threshold PCT   how much slower than the baseline counts as a regression (default 10)
+from benchmarks.fixtures import FixtureClient
+from benchmarks.transitions import TRANSITIONS
+from data import nba_data
+from data.models import Game
+from data.nba_client import set_client
+from data.nba_data import find_team, get_important_games, _parse_standings
+from data.playbyplay import PlayByPlayStore
+from display.display import Display, FramePacer
+from display.render_cache import get_render_cache
+from display.nba_display import (AfterGame, BeforeGame, LiveGame, ScreenSaver, Standings,
+                                 get_five_px_font, get_seven_px_font_bold, _get_text_sprite,
+                                 draw_text)
+from display.sinks import FakeRGBMatrix, NullSink
+from functools import partial
+from PIL import Image, ImageColor
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+MIN_RUN_SECS = 0.2
+REPEAT = 5
+
+
+class Benchmark(object):
+
+  # func is called with the result of setup, which isn't timed. If it renders, func returns how
+  # many frames it rendered.
+  def __init__(self, name, func, setup=None, renders=False):
+    self.name = name
+    self.func = func
+    self.setup = setup or (lambda: None)
+    self.renders = renders
+
+  def _run_once(self):
+    arg = self.setup()
+    start = time.perf_counter()
+    frames = self.func(arg)
+    return time.perf_counter() - start, frames if self.renders else None
+
+  def run(self):
+    self._run_once()  # Warm up caches, as they would be on a running display
+    runs, frames = [], None
+    deadline = time.perf_counter() + MIN_RUN_SECS
+    while len(runs) < REPEAT or time.perf_counter() < deadline:
+      secs, frames = self._run_once()
+      runs.append(secs)
+
+    tracemalloc.start()
+    try:
+      self._run_once()
+      _, peak = tracemalloc.get_traced_memory()
+    finally:
+      tracemalloc.stop()
+
+    ms = min(runs) * 1000
+    return {
+        'ms': ms,
+        'msPerFrame': ms / frames if frames else None,
+        'frames': frames,
+        'allocKB': peak / 1024,
+        'runs': len(runs),
+    }
+
+
+def get_benchmarks():
+  client = FixtureClient()
+  set_client(client)
+  # Keep logos from a previous run (or a real install) out of the measurements
+  nba_data.TEAM_LOGO_DIR = tempfile.mkdtemp(prefix='nba-benchmark-logos-')
+  # Render as fast as possible instead of holding each frame for real
+  Display.pacer_factory = partial(FramePacer, realtime=False)
+
+  matrix = FakeRGBMatrix()
+  game = Game(client.get_game(None))
+  raw_games = client.get_games_for_today()
+  games = [Game(raw_game) for raw_game in raw_games]
+  actions = client.get_playbyplay(None)['actions']
+  standing_rows = client.get_standings()
+  standings = _parse_standings(standing_rows)
+  favorite_teams = [find_team(name) for name in ('MIL', 'Bulls', 'Boston', 'Lakers')]
+  blank = Image.new('RGBA', (matrix.width, matrix.height), color='#000')
+
+  def text(clear_cache):
+    if clear_cache:
+      _get_text_sprite.cache_clear()
+    draw_text(blank, (32, 16), 'MIL\n124', fill=ImageColor.getrgb('#fff'),
+              font=get_seven_px_font_bold(), anchor='mm', spacing=6, align='center')
+    draw_text(blank, (32, 16), ' \nQ4\n0:00', fill=ImageColor.getrgb('#fff'),
+              font=get_five_px_font(), anchor='mm', spacing=6, align='center')
+
+  def show(display):
+    sink = NullSink(copy_frames=True)
+    display.show(matrix, sink)
+    return sink.frame_count
+
+  displays = [
+      ('BeforeGame', lambda: BeforeGame(games[-1])),
+      ('AfterGame', lambda: AfterGame(game)),
+      ('LiveGame', lambda: LiveGame(game)),
+      ('Standings', lambda: Standings(standings[0])),
+      ('ScreenSaver', lambda: ScreenSaver()),
+  ]
+
+  def pre_image(display):
+    display.get_pre_image(matrix, None)
+    return 1
+
+  benchmarks = [
+      Benchmark('draw_text', lambda _: text(False)),
+      Benchmark('draw_text (uncached)', lambda _: text(True)),
+  ]
+  for name, create in displays:
+    benchmarks.append(
+        Benchmark('%s.get_pre_image' % name,
+                  pre_image,
+                  lambda create=create: _uncached(create()),
+                  renders=True))
+    benchmarks.append(
+        Benchmark('%s.show' % name,
+                  show,
+                  lambda create=create: _prepared(_uncached(create()), matrix),
+                  renders=True))
+  # What the idle carousel pays on later passes, with nothing changed
+  benchmarks += [
+      Benchmark('Standings.get_pre_image (cached)',
+                pre_image,
+                lambda: Standings(standings[0]),
+                renders=True),
+      Benchmark('BeforeGame.show (cached)',
+                show,
+                lambda: _prepared(BeforeGame(games[-1]), matrix),
+                renders=True),
+  ]
+
+  start_img, end_img = get_transition_images()
+  for transition_class, kwargs in TRANSITIONS:
+    name = '%s(%s)' % (transition_class.__name__, ', '.join(
+        '%s=%s' % (key, value) for key, value in kwargs.items()))
+    benchmarks.append(
+        Benchmark(name,
+                  lambda transition: len(list(transition.get_transition_frames())),
+                  partial(transition_class, start_img, end_img, **kwargs),
+                  renders=True))
+
+  benchmarks += [
+      Benchmark('Game (scoreboard)', lambda _: [Game(raw_game) for raw_game in raw_games]),
+      Benchmark('get_important_games', lambda _: get_important_games(favorite_teams, games)),
+      Benchmark('_parse_standings', lambda _: _parse_standings(standing_rows)),
+      Benchmark('PlayByPlayStore.merge_actions', lambda store: store.merge_actions(actions),
+                lambda: _get_playbyplay_store(actions)),
+  ]
+  return benchmarks
+
+
+def _uncached(display):
+  get_render_cache().clear()
+  return display
+
+
+def _prepared(display, matrix):
+  display.prepare(matrix)
+  return display
+
+
+def _get_playbyplay_store(actions):
+  # Everything but the last quarter is already known, as it would be mid-game
+  return PlayByPlayStore('benchmark', actions[:len(actions) * 3 // 4])
+
+
+def get_transition_images():
+  with Image.open('assets/testing/1642740948.png') as start_img:
+    start_img = start_img.convert('RGBA')
+  with Image.open('assets/testing/1642740978.png') as end_img:
+    end_img = end_img.convert('RGBA')
+  return start_img, end_img
+
+
+def get_peak_rss_kb():
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak / 1024 if sys.platform == 'darwin' else peak  # Bytes on macOS, KB elsewhere
+
+
+def compare(results, baseline, threshold):
+  regressions = []
+  print()
+  print('{:<47} {:>10} {:>10} {:>8}'.format('benchmark', 'base ms', 'ms', 'change'))
+  for name, result in results['benchmarks'].items():
+    base = baseline['benchmarks'].get(name)
+    if not base:
+      continue
+    change = (result['ms'] - base['ms']) / base['ms'] * 100
+    regressed = change > threshold
+    if regressed:
+      regressions.append(name)
+    print('{:<47} {:>10.3f} {:>10.3f} {:>+7.1f}%{}'.format(name, base['ms'], result['ms'], change,
+                                                           ' REGRESSION' if regressed else ''))
+  print('Peak RSS: %d KB (baseline %d KB)' % (results['peakRSSKB'], baseline['peakRSSKB']))
+  return regressions
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description='Benchmarks the display hot paths offline.')
+  arg_parser.add_argument('--filter', default='')
+  arg_parser.add_argument('--save')
+  arg_parser.add_argument('--compare')
+  arg_parser.add_argument('--threshold', type=float, default=10)
+  args = arg_parser.parse_args()
+
+  print('{:<47} {:>10} {:>10} {:>10}'.format('benchmark', 'ms', 'ms/frame', 'alloc KB'))
+  results = {'machine': platform.machine(), 'python': platform.python_version(), 'benchmarks': {}}
+  for benchmark in get_benchmarks():
+    if args.filter not in benchmark.name:
+      continue
+    result = benchmark.run()
+    results['benchmarks'][benchmark.name] = result
+    ms_per_frame = '%.3f' % result['msPerFrame'] if result['msPerFrame'] else '-'
+    print('{:<47} {:>10.3f} {:>10} {:>10.1f}'.format(benchmark.name, result['ms'], ms_per_frame,
+                                                     result['allocKB']))
+  results['peakRSSKB'] = get_peak_rss_kb()
+  print('Peak RSS: %d KB' % results['peakRSSKB'])
+
+  if args.save:
+    with open(args.save, 'w') as f:
+      json.dump(results, f, indent=2)
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+      print('%d benchmark(s) regressed by more than %g%%' % (len(regressions), args.threshold))
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
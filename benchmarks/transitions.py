@@ -0,0 +1,51 @@
+# Compares ms/transition between the PIL and NumPy transition paths.
+# Run from the repository root: python -m benchmarks.transitions
+from display.display import ArrayTransition
+from display.nba_display import (BallTransition, CoverTransition, FadeTransition, PushTransition,
+                                 ShredTransition)
+from PIL import Image
+import timeit
+
+TRANSITIONS = [
+    (FadeTransition, {}),
+    (PushTransition, {'x_direction': 1, 'y_direction': 0}),
+    (PushTransition, {'x_direction': -1, 'y_direction': 1}),
+    (CoverTransition, {'x_direction': 1, 'y_direction': 0}),
+    (CoverTransition, {'x_direction': 0, 'y_direction': -1}),
+    (ShredTransition, {'direction': 0}),
+    (ShredTransition, {'direction': 1}),
+    (BallTransition, {}),
+]
+
+
+def time_transition(transition_class,
+                    start_img,
+                    end_img,
+                    use_arrays,
+                    number=50,
+                    repeat=5,
+                    **kwargs):
+  ArrayTransition.use_arrays = use_arrays
+  try:
+    timer = timeit.Timer(lambda: list(transition_class(start_img, end_img, **kwargs).iter_frames()))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+  finally:
+    ArrayTransition.use_arrays = True
+
+
+def main():
+  with Image.open('assets/testing/1642740948.png') as start_img:
+    start_img = start_img.convert('RGBA')
+  with Image.open('assets/testing/1642740978.png') as end_img:
+    end_img = end_img.convert('RGBA')
+
+  print('{:<55} {:>10} {:>10} {:>8}'.format('transition', 'PIL ms', 'NumPy ms', 'speedup'))
+  for transition_class, kwargs in TRANSITIONS:
+    pil_ms = time_transition(transition_class, start_img, end_img, False, **kwargs)
+    array_ms = time_transition(transition_class, start_img, end_img, True, **kwargs)
+    name = '%s %s' % (transition_class.__name__, kwargs or '')
+    print('{:<55} {:>10.3f} {:>10.3f} {:>7.2f}x'.format(name, pil_ms, array_ms, pil_ms / array_ms))
+
+
+if __name__ == '__main__':
+  main()
@@ -39,6 +39,30 @@ WAKE_DAY = 0
 # Whether the clock should count down (may be inaccurate) or only update when it recieves new data.
 CLOCK_COUNTDOWN = True
 
+# Where to show the display. Any of "matrix" (the LED matrix), "preview" (a window on your
+# computer), "record" (saves every frame as a PNG in the recordings folder), "gif" (saves an
+# animated GIF in the recordings folder when the program is stopped) and "null" (nowhere).
+# Example: OUTPUTS = ["matrix", "preview"]
+OUTPUTS = ["matrix"]
+
+# How much memory (in megabytes) rendered screens and animations may be kept in between showings.
+# Lower it on boards with little memory. Screens over the limit are simply rendered again.
+# Example: FRAME_MEMORY_MB = 4
+FRAME_MEMORY_MB = 16
+
+# The port of a local web page with performance metrics (timings, caches, polling), in the format
+# Prometheus reads, e.g. http://localhost:9181/metrics. Set it to 0 to turn the page off.
+# Example: METRICS_PORT = 9181
+METRICS_PORT = 9181
+
+# Who can see the metrics page. "127.0.0.1" is only this computer, "0.0.0.0" is your whole network.
+# Example: METRICS_HOST = "0.0.0.0"
+METRICS_HOST = "127.0.0.1"
+
+# How often (in seconds) to also write the metrics to the log, as JSON. 0 means never.
+# Example: METRICS_LOG_SECS = 300
+METRICS_LOG_SECS = 0
+
 ####################################################################################################
 
 # List of valid timezones, for reference
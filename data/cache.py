@@ -0,0 +1,195 @@
+# A stale-while-revalidate cache for responses. A fresh value is served as is. A stale one is served
+# straight away while a background thread fetches the new value, so the render loop never waits on
+# the network for data it already has. Only a missing (or too old) value is fetched inline, and
+# concurrent requests for the same key share a single fetch.
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from data.metrics import watch_cache
+from data.store import get_response_store
+from datetime import timedelta
+import logging
+import threading
+import time
+
+REFRESH_WORKERS = 2
+
+_caches = {}
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def _get_refresh_executor():
+  global _refresh_executor
+  with _refresh_executor_lock:
+    if _refresh_executor is None:
+      _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                             thread_name_prefix='cache-refresh')
+    return _refresh_executor
+
+
+def _to_seconds(duration):
+  if isinstance(duration, timedelta):
+    return duration.total_seconds()
+  return duration
+
+
+class CacheEntry(object):
+  __slots__ = ('value', 'fetched_at')
+
+  def __init__(self, value, fetched_at):
+    self.value = value
+    self.fetched_at = fetched_at
+
+
+class SWRCache(object):
+
+  def __init__(self, name, fetch, ttl, max_stale=None, max_size=None, persist=False):
+    self.name = name
+    self.fetch = fetch
+    self.ttl = _to_seconds(ttl)
+    # How long past its TTL a value may still be served while it is refreshed. Older values are
+    # evicted, and the next request fetches inline.
+    self.max_stale = _to_seconds(max_stale if max_stale is not None else ttl)
+    self.max_size = max_size
+    # Whether values are kept in the response store (see data.store) across restarts
+    self.persist = persist
+    self.restored = set()
+    self.entries = OrderedDict()
+    self.in_flight = {}
+    self.lock = threading.Lock()
+    self.stats = {
+        'hits': 0,
+        'misses': 0,
+        'stale': 0,
+        'refreshes': 0,
+        'errors': 0,
+        'evictions': 0,
+        'restored': 0,
+    }
+
+  # fetch_kwargs are passed to the fetch but aren't part of the key, e.g. how a refresh is made
+  def get(self, *args, max_age=None, refresh=False, fetch_kwargs=None, **kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    if fetch_kwargs:
+      kwargs = dict(kwargs, **fetch_kwargs)
+    max_age = self.ttl if max_age is None else _to_seconds(max_age)
+    now = time.monotonic()
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None and self.persist and key not in self.restored:
+        entry = self._restore(key, now)
+      age = now - entry.fetched_at if entry else None
+      if entry and not refresh and age < max_age + self.max_stale:
+        self.entries.move_to_end(key)
+        if age < max_age:
+          self.stats['hits'] += 1
+        else:
+          self.stats['stale'] += 1
+          self._start_fetch(key, args, kwargs, background=True)
+        return entry.value
+
+      self.stats['misses'] += 1
+      future, owner = self._start_fetch(key, args, kwargs)
+
+    if owner:
+      self._run_fetch(key, future, args, kwargs)
+    return future.result()
+
+  def invalidate(self, *args, **kwargs):
+    with self.lock:
+      self.entries.pop((args, tuple(sorted(kwargs.items()))), None)
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+
+  def get_stats(self):
+    with self.lock:
+      return dict(self.stats, size=len(self.entries))
+
+  # Must be called with the lock held. Stored values are only read once per key, on the first
+  # request after a restart.
+  def _restore(self, key, now):
+    self.restored.add(key)
+    store = get_response_store()
+    stored = store.load(self.name, key) if store else None
+    if stored is None:
+      return None
+    value, stored_at = stored
+    entry = CacheEntry(value, now - max(time.time() - stored_at, 0))
+    self.entries[key] = entry
+    self.stats['restored'] += 1
+    return entry
+
+  # Must be called with the lock held. Returns the in-flight fetch for the key, and whether the
+  # caller started it (and so has to run it).
+  def _start_fetch(self, key, args, kwargs, background=False):
+    if key in self.in_flight:
+      return self.in_flight[key], False
+    future = Future()
+    self.in_flight[key] = future
+    if background:
+      self.stats['refreshes'] += 1
+      _get_refresh_executor().submit(self._run_fetch, key, future, args, kwargs)
+      return future, False
+    return future, True
+
+  def _run_fetch(self, key, future, args, kwargs):
+    try:
+      value = self.fetch(*args, **kwargs)
+    except Exception as e:
+      logging.debug('Fetching %s %s failed: %s' % (self.name, args, e))
+      with self.lock:
+        self.stats['errors'] += 1
+        self.in_flight.pop(key, None)
+      future.set_exception(e)
+      return
+
+    with self.lock:
+      self.entries[key] = CacheEntry(value, time.monotonic())
+      self.entries.move_to_end(key)
+      self.in_flight.pop(key, None)
+      self._evict()
+    future.set_result(value)
+
+    store = get_response_store() if self.persist else None
+    if store:
+      try:
+        store.save(self.name, key, value)
+      except Exception as e:
+        logging.debug('Could not store %s %s: %s' % (self.name, args, e))
+
+  # Must be called with the lock held
+  def _evict(self):
+    now = time.monotonic()
+    expired = [
+        key for key, entry in self.entries.items()
+        if now - entry.fetched_at >= self.ttl + self.max_stale
+    ]
+    for key in expired:
+      del self.entries[key]
+    self.stats['evictions'] += len(expired)
+    while self.max_size and len(self.entries) > self.max_size:
+      expired.append(self.entries.popitem(last=False)[0])
+      self.stats['evictions'] += 1
+    # The stored value is as old as the evicted one, or newer, so it may be read again
+    self.restored.difference_update(expired)
+
+
+def swr_cache(name, ttl, max_stale=None, max_size=None, persist=False):
+
+  def decorator(fetch):
+    cache = SWRCache(name, fetch, ttl, max_stale=max_stale, max_size=max_size, persist=persist)
+    _caches[name] = cache
+    watch_cache(name, cache.get_stats)
+    return cache
+
+  return decorator
+
+
+def get_cache(name):
+  return _caches[name]
+
+
+def get_cache_stats():
+  return {name: cache.get_stats() for name, cache in _caches.items()}
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+import time
+
+
+# The wall clock, as far as game data is concerned. Replays swap in a VirtualClock so that
+# recorded games play out at their own time and speed.
+class SystemClock(object):
+  speed = 1
+
+  def time(self):
+    return time.time()
+
+  def monotonic(self):
+    return time.monotonic()
+
+  def now(self):
+    return datetime.now(timezone.utc)
+
+
+class VirtualClock(object):
+
+  def __init__(self, start, speed=1):
+    self.start = start.timestamp()
+    self.speed = speed
+    self.started = time.monotonic()
+
+  def time(self):
+    return self.start + self.monotonic()
+
+  def monotonic(self):
+    return (time.monotonic() - self.started) * self.speed
+
+  def now(self):
+    return datetime.fromtimestamp(self.time(), timezone.utc)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+  return _clock
+
+
+def set_clock(clock):
+  global _clock
+  _clock = clock
@@ -0,0 +1,106 @@
+# Estimates the game clock between polls from the play-by-play. Each action says when it happened
+# (timeActual) and what the clock read, and its type says whether the clock kept running after it.
+# From there the clock counts down with the monotonic clock until the next action corrects it.
+from collections import namedtuple
+from data.clock import get_clock
+from data.models import LIVE_BALL_TURNOVERS, STOPPED_CLOCK_ACTIONS, parse_utc_time
+import threading
+
+ClockEstimate = namedtuple('ClockEstimate', ['period', 'seconds', 'running', 'error'])
+
+# The shot clock means something is logged at least every 24 seconds of running clock, so without
+# a new action the clock has most likely been stopped since
+MAX_INTERPOLATION_SECS = 24
+# Feed delays longer than this are more likely a bad timestamp than a slow feed
+MAX_FEED_LAG_SECS = 60
+# Seconds of error from the feed's timestamps and poll timing
+BASE_ERROR_SECS = 1
+# How much error each second without a new action adds, as the clock may have stopped unseen
+ERROR_PER_SEC = 0.25
+
+
+def is_clock_running(action):
+  action_type = action.action_type
+  sub_type = (action.sub_type or '').lower()
+  if not action.clock_seconds or action_type in STOPPED_CLOCK_ACTIONS:
+    return False
+  if action_type in ('period', 'game'):
+    # The clock starts on the tip, which is logged as a jump ball
+    return False
+  if action_type == 'turnover':
+    return sub_type in LIVE_BALL_TURNOVERS
+  if action_type in ('2pt', '3pt') and action.shot_result != 'Missed':
+    # Made field goals stop the clock in the last two minutes of the fourth and overtime
+    return action.period < 4 or action.clock_seconds > 2 * 60
+  return True
+
+
+class GameClockModel(object):
+
+  def __init__(self):
+    # (period, clock seconds, running, monotonic times the action happened and was received)
+    self.anchor = None
+    self.action_number = None
+    self.lock = threading.Lock()
+    self.corrections = 0
+    self.total_correction = 0
+    self.max_correction = 0
+
+  def observe(self, action):
+    if not action or action.clock_seconds is None:
+      return
+    clock = get_clock()
+    with self.lock:
+      if action.number == self.action_number:
+        return
+
+      # How long ago the action happened, so feed and poll delays don't hold the clock back
+      lag = 0
+      if action.time_actual:
+        lag = max(clock.time() - parse_utc_time(action.time_actual).timestamp(), 0)
+      received_at = clock.monotonic()
+      happened_at = received_at - min(lag, MAX_FEED_LAG_SECS)
+
+      if self.anchor and self.anchor[0] == action.period:
+        predicted = self._get_seconds(self.anchor, happened_at)
+        correction = abs(predicted - action.clock_seconds)
+        self.corrections += 1
+        self.total_correction += correction
+        self.max_correction = max(self.max_correction, correction)
+
+      self.anchor = (action.period, action.clock_seconds, is_clock_running(action), happened_at,
+                     received_at)
+      self.action_number = action.number
+
+  def estimate(self):
+    with self.lock:
+      anchor = self.anchor
+    if anchor is None:
+      return None
+    period, _, running, _, received_at = anchor
+    now = get_clock().monotonic()
+    # The clock may have stopped unseen since the last poll, not since the action happened
+    unseen = max(now - received_at, 0)
+    error = BASE_ERROR_SECS + min(unseen, MAX_INTERPOLATION_SECS) * ERROR_PER_SEC
+    seconds = self._get_seconds(anchor, now)
+    running = running and unseen < MAX_INTERPOLATION_SECS and seconds > 0
+    return ClockEstimate(period, seconds, running, error)
+
+  def get_stats(self):
+    estimate = self.estimate()
+    with self.lock:
+      return {
+          'estimatedError': round(estimate.error, 2) if estimate else None,
+          'corrections': self.corrections,
+          'meanCorrection': round(self.total_correction / self.corrections, 2)
+                            if self.corrections else 0,
+          'maxCorrection': round(self.max_correction, 2),
+      }
+
+  def _get_seconds(self, anchor, at):
+    _, seconds, running, happened_at, received_at = anchor
+    if not running:
+      return seconds
+    # The feed delay is run time already seen, so only the time after it is capped
+    elapsed = min(max(at - happened_at, 0), received_at - happened_at + MAX_INTERPOLATION_SECS)
+    return max(seconds - elapsed, 0)
@@ -0,0 +1,256 @@
+from collections import namedtuple
+from data.clock import get_clock
+from data.game_clock import GameClockModel
+from data.metrics import PARSE_SECONDS, POLL_BUDGET_EXHAUSTED, POLL_ERRORS, collected
+from data.models import Game
+from data.nba_client import get_client
+from data.playbyplay import get_playbyplay_store, remove_playbyplay_store
+from data.polling import RequestBudget, get_poll_scheduler
+from data.store import get_response_store
+from functools import partial
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+# Shared by every tracked game, on top of the client's per-endpoint rate limits. Minutes are game
+# time, so a sped up replay gets a proportionally bigger budget.
+MAX_REQUESTS_PER_MINUTE = 40
+ERROR_RETRY_DELAY = 5
+
+# Every poller, for the game clock metrics. Held weakly, so dropped pollers leave the metrics too.
+_pollers = weakref.WeakSet()
+
+# Where the latest boxscore and play-by-play of each game are kept in the response store (see
+# data.store), so a restart mid-game carries on from them instead of starting cold
+BOXSCORE_STORE = 'live-boxscore'
+PLAYBYPLAY_STORE = 'live-playbyplay'
+# Older than this, a stored boxscore is no newer than the scoreboard's game
+MAX_STORED_BOXSCORE_AGE = 10 * 60
+
+GameSnapshot = namedtuple('GameSnapshot',
+                          ['game', 'latest_action', 'action_count', 'clock', 'updated_at'])
+
+
+def _parse_boxscore(result):
+  with PARSE_SECONDS.time(payload='boxscore'):
+    return Game(result)
+
+
+class TrackedGame(object):
+
+  def __init__(self, game, store):
+    self.game = game
+    self.store = store
+    # Dropped along with the tracked game, so finished games don't keep one around
+    self.clock = GameClockModel()
+    self.next_polls = {'boxscore': 0, 'playbyplay': 0}
+    self.in_flight = set()
+
+
+class LivePoller(threading.Thread):
+
+  def __init__(self, budget=None):
+    super().__init__(name='live-poller', daemon=True)
+    self.budget = budget or RequestBudget(int(MAX_REQUESTS_PER_MINUTE * get_clock().speed), 60)
+    self.tracked = {}
+    self.snapshots = {}
+    # Games that went final. The scoreboard can still call them live for a while after, and
+    # tracking them again would start over from an empty play-by-play.
+    self.finished = set()
+    # Polls with changes that haven't been written to the response store yet, by game id
+    self.unsaved = {}
+    self.lock = threading.Lock()
+    self.wakeup = threading.Event()
+    self.exitSignal = 0
+    _pollers.add(self)
+
+  def track(self, game, playbyplay=None):
+    game_id = game.id
+    with self.lock:
+      new = game_id not in self.tracked and game_id not in self.finished
+    if new:
+      store = get_playbyplay_store(game_id, playbyplay)
+      game = self._restore(game, store)
+      with self.lock:
+        if game_id not in self.tracked and game_id not in self.finished:
+          tracked = TrackedGame(game, store)
+          self.tracked[game_id] = tracked
+          self._publish(tracked)
+    self.wakeup.set()
+
+  def untrack(self, game_id):
+    with self.lock:
+      self.tracked.pop(game_id, None)
+      self.snapshots.pop(game_id, None)
+      self.finished.discard(game_id)
+      self.unsaved.pop(game_id, None)
+    remove_playbyplay_store(game_id)
+
+  def set_tracked_games(self, games):
+    game_ids = {game.id for game in games}
+    with self.lock:
+      # Finished games are no longer tracked, but their snapshots are kept until they go too
+      known_game_ids = set(self.tracked) | set(self.snapshots)
+    for game_id in known_game_ids - game_ids:
+      self.untrack(game_id)
+    for game in games:
+      self.track(game)
+
+  def get_snapshot(self, game_id):
+    with self.lock:
+      return self.snapshots.get(game_id)
+
+  # The game as of its final poll, once the poller has seen it go final. The scoreboard can still
+  # call it live for a while after.
+  def get_final_game(self, game_id):
+    with self.lock:
+      snapshot = self.snapshots.get(game_id)
+      return snapshot.game if snapshot and game_id in self.finished else None
+
+  def get_tracked_game_ids(self):
+    with self.lock:
+      return list(self.tracked)
+
+  def get_clock_errors(self):
+    with self.lock:
+      clocks = {game_id: tracked.clock for game_id, tracked in self.tracked.items()}
+    estimates = {game_id: clock.estimate() for game_id, clock in clocks.items()}
+    return {game_id: estimate.error for game_id, estimate in estimates.items() if estimate}
+
+  def run(self):
+    client = get_client()
+    while not self.exitSignal:
+      self.wakeup.clear()
+      for tracked, endpoint in self._get_due_polls():
+        if not self.budget.try_spend():
+          POLL_BUDGET_EXHAUSTED.inc()
+          break
+        if endpoint == 'boxscore':
+          coro = self._poll_boxscore(client.async_client, tracked.game.id)
+        else:
+          coro = tracked.store.sync_async(client.async_client)
+        with self.lock:
+          tracked.in_flight.add(endpoint)
+        future = client.submit(coro)
+        future.add_done_callback(partial(self._on_poll_done, tracked, endpoint))
+
+      self._save()
+      self.wakeup.wait(timeout=self._get_seconds_to_next_poll())
+    logging.debug('Live poller exited.')
+
+  def stop(self):
+    self.exitSignal = 1
+    self.wakeup.set()
+
+  def _get_due_polls(self):
+    now = time.monotonic()
+    with self.lock:
+      due = [(next_poll, tracked, endpoint)
+             for tracked in self.tracked.values()
+             for endpoint, next_poll in tracked.next_polls.items()
+             if next_poll <= now and endpoint not in tracked.in_flight]
+    due.sort(key=lambda poll: poll[0])
+    return [(tracked, endpoint) for _, tracked, endpoint in due]
+
+  def _get_seconds_to_next_poll(self):
+    with self.lock:
+      next_polls = [
+          next_poll for tracked in self.tracked.values()
+          for endpoint, next_poll in tracked.next_polls.items()
+          if endpoint not in tracked.in_flight
+      ]
+    if not next_polls:
+      return None  # Nothing to do until a poll finishes or a game is tracked
+    return max(min(next_polls) - time.monotonic(), self.budget.seconds_until_available(), 0)
+
+  # Like play-by-play (see PlayByPlayStore.sync_async), the boxscore is parsed off the client's
+  # event loop so that it doesn't hold up the other requests
+  async def _poll_boxscore(self, async_client, game_id):
+    result = await async_client.get_game(game_id)
+    if not result:
+      return None
+    return await asyncio.get_running_loop().run_in_executor(None, _parse_boxscore, result)
+
+  def _on_poll_done(self, tracked, endpoint, future):
+    try:
+      result = future.result()
+      failed = False
+    except Exception as e:
+      logging.debug('Polling %s for game %s failed: %s' % (endpoint, tracked.game.id, e))
+      POLL_ERRORS.inc(endpoint=endpoint)
+      result, failed = None, True
+
+    game_id = tracked.game.id
+    get_poll_scheduler().record_poll(endpoint)
+    with self.lock:
+      tracked.in_flight.discard(endpoint)
+      if self.tracked.get(game_id) is not tracked:
+        # Untracked while the poll was in flight, so there is nothing left to publish it to
+        return
+      if endpoint == 'boxscore' and result:
+        tracked.game = result
+      if result:
+        # Saved from the poller thread, so the client's event loop never waits on the store
+        self.unsaved.setdefault(game_id, (tracked, set()))[1].add(endpoint)
+
+      playbyplay_delay, game_delay = get_poll_scheduler().next_live_poll(
+          tracked.game, tracked.store.latest_action())
+      self._publish(tracked)
+      if playbyplay_delay is None:
+        # The game is over, keep its final snapshot but stop polling it
+        self.tracked.pop(game_id, None)
+        self.finished.add(game_id)
+        remove_playbyplay_store(game_id)
+      else:
+        delay = playbyplay_delay if endpoint == 'playbyplay' else game_delay
+        delay = ERROR_RETRY_DELAY if failed else delay / get_clock().speed
+        tracked.next_polls[endpoint] = time.monotonic() + delay
+    self.wakeup.set()
+
+  # Carries on from the stored play-by-play and boxscore, if there are any
+  def _restore(self, game, store):
+    response_store = get_response_store()
+    if response_store is None:
+      return game
+    try:
+      if not store.actions:
+        stored = response_store.load(PLAYBYPLAY_STORE, game.id)
+        if stored:
+          store.set_state(stored[0])
+      stored = response_store.load(BOXSCORE_STORE, game.id)
+    except Exception as e:
+      logging.debug('Could not restore game %s: %s' % (game.id, e))
+      return game
+    if stored and time.time() - stored[1] < MAX_STORED_BOXSCORE_AGE:
+      return stored[0]
+    return game
+
+  def _save(self):
+    with self.lock:
+      unsaved, self.unsaved = self.unsaved, {}
+    response_store = get_response_store()
+    if response_store is None:
+      return
+    for game_id, (tracked, endpoints) in unsaved.items():
+      try:
+        if 'boxscore' in endpoints:
+          response_store.save(BOXSCORE_STORE, game_id, tracked.game)
+        if 'playbyplay' in endpoints:
+          response_store.save(PLAYBYPLAY_STORE, game_id, tracked.store.get_state())
+      except Exception as e:
+        logging.debug('Could not store game %s: %s' % (game_id, e))
+
+  def _publish(self, tracked):
+    latest_action = tracked.store.latest_action()
+    tracked.clock.observe(latest_action)
+    self.snapshots[tracked.game.id] = GameSnapshot(tracked.game, latest_action,
+                                                   len(tracked.store.actions), tracked.clock,
+                                                   time.time())
+
+
+collected('game_clock_error_seconds', 'Estimated error of the counted down game clock, by game',
+          'gauge', ['game'], lambda: {(game_id,): round(error, 2)
+                                      for poller in list(_pollers)
+                                      for game_id, error in poller.get_clock_errors().items()})
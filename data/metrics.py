@@ -0,0 +1,360 @@
+# Counters and timing histograms for where the time goes on a running board: fetching, parsing,
+# rendering, transitions and presenting frames, plus the caches, rate limits, polls and threads
+# behind them. They are served in the Prometheus text format on a local HTTP endpoint
+# (http://localhost:METRICS_PORT/metrics), and can also be logged as a JSON line every so often.
+#
+# Recording a value is a dict lookup and an addition under a lock, cheap enough for every frame.
+# Values that are already counted elsewhere (e.g. cache stats) are collected when read instead.
+from bisect import bisect_left
+from contextlib import contextmanager
+import config
+import json
+import logging
+import threading
+import time
+
+PREFIX = 'scoreboard_'
+# Seconds, from a fast frame up to a slow request
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30)
+
+DEFAULT_PORT = 9181
+DEFAULT_HOST = '127.0.0.1'
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_threads = {}
+_heartbeats = {}
+_caches = {}
+_routes = {}
+# Cache stats that are sizes rather than counts of events
+CACHE_USAGE_STATS = {'size': 'entries', 'entries': 'entries', 'bytes': 'bytes'}
+
+
+def _escape(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, values, extra=None):
+  pairs = list(zip(labels, values)) + ([extra] if extra else [])
+  if not pairs:
+    return ''
+  return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+def _format_key(labels, values):
+  # How a labelled value is keyed in the JSON snapshot, e.g. 'endpoint=boxscore'
+  return ','.join('%s=%s' % pair for pair in zip(labels, values))
+
+
+def _format_value(value):
+  if value == float('inf'):
+    return '+Inf'
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(object):
+  kind = None
+
+  def __init__(self, name, help, labels=()):
+    self.name = PREFIX + name
+    self.help = help
+    self.labels = tuple(labels)
+    self.values = {}
+    self.lock = threading.Lock()
+
+  def _key(self, labels):
+    return tuple(str(labels.get(name, '')) for name in self.labels)
+
+  def get_values(self):
+    with self.lock:
+      return dict(self.values)
+
+  def render(self):
+    lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s %s' % (self.name, self.kind)]
+    for key, value in sorted(self.get_values().items()):
+      lines.append('%s%s %s' % (self.name, _format_labels(self.labels, key), _format_value(value)))
+    return lines
+
+  def get_snapshot(self):
+    values = self.get_values()
+    if not self.labels:
+      return values.get((), 0)
+    return {_format_key(self.labels, key): value for key, value in sorted(values.items())}
+
+
+class Counter(Metric):
+  kind = 'counter'
+
+  def inc(self, amount=1, **labels):
+    key = self._key(labels)
+    with self.lock:
+      self.values[key] = self.values.get(key, 0) + amount
+
+
+# A counter or gauge read from somewhere else whenever the metrics are. collect returns a dict of
+# label values (as tuples, in the order of labels) to values.
+class CollectedMetric(Metric):
+
+  def __init__(self, name, help, kind, labels, collect):
+    super().__init__(name, help, labels)
+    self.kind = kind
+    self.collect = collect
+
+  def get_values(self):
+    try:
+      return {tuple(str(value) for value in key): value for key, value in self.collect().items()}
+    except Exception as e:
+      logging.debug('Could not collect %s: %s' % (self.name, e))
+      return {}
+
+
+class HistogramValue(object):
+  __slots__ = ('counts', 'sum', 'count', 'max')
+
+  def __init__(self, buckets):
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0
+    self.count = 0
+    self.max = 0
+
+
+class Histogram(Metric):
+  kind = 'histogram'
+
+  def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    super().__init__(name, help, labels)
+    self.buckets = tuple(buckets)
+
+  def observe(self, value, **labels):
+    key = self._key(labels)
+    with self.lock:
+      histogram = self.values.get(key)
+      if histogram is None:
+        histogram = self.values[key] = HistogramValue(self.buckets)
+      histogram.counts[bisect_left(self.buckets, value)] += 1
+      histogram.sum += value
+      histogram.count += 1
+      histogram.max = max(histogram.max, value)
+
+  @contextmanager
+  def time(self, **labels):
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - started, **labels)
+
+  def get_values(self):
+    with self.lock:
+      return {
+          key: (list(value.counts), value.sum, value.count, value.max)
+          for key, value in self.values.items()
+      }
+
+  def render(self):
+    lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s %s' % (self.name, self.kind)]
+    for key, (counts, total, count, _) in sorted(self.get_values().items()):
+      cumulative = 0
+      for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+        cumulative += bucket_count
+        lines.append('%s_bucket%s %d' % (self.name,
+                                          _format_labels(self.labels, key,
+                                                         ('le', _format_value(bound))), cumulative))
+      labels = _format_labels(self.labels, key)
+      lines.append('%s_sum%s %r' % (self.name, labels, float(total)))
+      lines.append('%s_count%s %d' % (self.name, labels, count))
+    return lines
+
+  def get_snapshot(self):
+    snapshot = {}
+    for key, (_, total, count, largest) in sorted(self.get_values().items()):
+      snapshot[_format_key(self.labels, key)] = {
+          'count': count,
+          'sum': round(total, 6),
+          'max': round(largest, 6),
+      }
+    if not self.labels:
+      return snapshot.get('', {'count': 0, 'sum': 0, 'max': 0})
+    return snapshot
+
+
+def _register(metric):
+  with _metrics_lock:
+    existing = _metrics.get(metric.name)
+    if existing is not None:
+      if type(existing) is not type(metric) or existing.labels != metric.labels:
+        raise Exception('Metric %s is already registered differently' % metric.name)
+      return existing
+    _metrics[metric.name] = metric
+    return metric
+
+
+def counter(name, help, labels=()):
+  return _register(Counter(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+  return _register(Histogram(name, help, labels, buckets))
+
+
+def collected(name, help, kind, labels, collect):
+  return _register(CollectedMetric(name, help, kind, labels, collect))
+
+
+# The stages a frame's data and pixels go through
+FETCH_SECONDS = histogram('fetch_seconds', 'Time to fetch a response, by endpoint', ['endpoint'])
+FETCH_ERRORS = counter('fetch_errors_total', 'Failed fetches, by endpoint', ['endpoint'])
+PARSE_SECONDS = histogram('parse_seconds', 'Time to turn a response into models, by payload',
+                          ['payload'])
+RENDER_SECONDS = histogram('render_seconds', 'Time to prepare a display, by display',
+                           ['display'])
+TRANSITION_FRAME_SECONDS = histogram('transition_frame_seconds',
+                                     'Time to generate a transition frame, by transition',
+                                     ['transition'])
+PRESENT_SECONDS = histogram('present_seconds', 'Time to hand a frame to the outputs')
+FRAMES = counter('frames_total', 'Frames by result: presented, late (also presented) or dropped',
+                 ['result'])
+
+# Polling
+RATE_LIMIT_WAIT_SECONDS = histogram('rate_limit_wait_seconds',
+                                    'Time requests waited on the rate limiter, by endpoint',
+                                    ['endpoint'])
+POLLS = counter('polls_total', 'Polls, by endpoint', ['endpoint'])
+POLL_ERRORS = counter('poll_errors_total', 'Failed live polls, by endpoint', ['endpoint'])
+POLL_BUDGET_EXHAUSTED = counter('poll_budget_exhausted_total',
+                                'Times live polls were held back by the request budget')
+
+
+def watch_thread(thread):
+  # Reported as alive or not for as long as the process runs, so a thread that died shows up as 0
+  # rather than disappearing
+  with _metrics_lock:
+    _threads[thread.name] = thread
+
+
+def heartbeat(name):
+  _heartbeats[name] = time.monotonic()
+
+
+# get_stats returns the cache's stats as a dict of counts, like SWRCache.get_stats
+def watch_cache(name, get_stats):
+  _caches[name] = get_stats
+
+
+def _collect_caches(usage):
+  values = {}
+  for name, get_stats in list(_caches.items()):
+    for stat, value in get_stats().items():
+      if usage and stat in CACHE_USAGE_STATS:
+        values[(name, CACHE_USAGE_STATS[stat])] = value
+      elif not usage and stat not in CACHE_USAGE_STATS:
+        values[(name, stat)] = value
+  return values
+
+
+collected('cache_events_total', 'Cache events (hits, misses, evictions...), by cache', 'counter',
+          ['cache', 'event'], lambda: _collect_caches(usage=False))
+collected('cache_usage', 'What caches hold, by cache and unit (entries or bytes)', 'gauge',
+          ['cache', 'unit'], lambda: _collect_caches(usage=True))
+collected('thread_alive', 'Whether a watched thread is still running', 'gauge', ['thread'],
+          lambda: {(name,): int(thread.is_alive()) for name, thread in list(_threads.items())})
+collected('heartbeat_age_seconds', 'Seconds since a loop last made progress', 'gauge', ['loop'],
+          lambda: {(name,): round(time.monotonic() - beat, 3)
+                   for name, beat in list(_heartbeats.items())})
+collected('threads', 'Threads running in the process', 'gauge', [],
+          lambda: {(): threading.active_count()})
+
+
+def get_metrics():
+  with _metrics_lock:
+    return [_metrics[name] for name in sorted(_metrics)]
+
+
+def render_prometheus():
+  lines = []
+  for metric in get_metrics():
+    lines.extend(metric.render())
+  return '\n'.join(lines) + '\n'
+
+
+def get_snapshot():
+  return {metric.name[len(PREFIX):]: metric.get_snapshot() for metric in get_metrics()}
+
+
+# Other pages can be served alongside the metrics. handler takes the parsed query string and
+# returns (content type, body).
+def add_route(path, handler):
+  _routes[path] = handler
+
+
+add_route('/metrics', lambda query: ('text/plain; version=0.0.4', render_prometheus()))
+add_route('/metrics.json', lambda query: ('application/json', json.dumps(get_snapshot())))
+
+
+def _handle_request(request):
+  from urllib.parse import parse_qs, urlparse
+  url = urlparse(request.path)
+  handler = _routes.get(url.path)
+  if handler is None:
+    request.send_error(404)
+    return
+  try:
+    content_type, body = handler(parse_qs(url.query))
+  except Exception as e:
+    logging.debug('Serving %s failed: %s' % (url.path, e))
+    request.send_error(500, str(e))
+    return
+  if isinstance(body, str):
+    body = body.encode()
+  request.send_response(200)
+  request.send_header('Content-Type', content_type)
+  request.send_header('Content-Length', str(len(body)))
+  request.end_headers()
+  request.wfile.write(body)
+
+
+def serve(port, host=DEFAULT_HOST):
+  # http.server is only imported when the endpoint is turned on, it is slow to import
+  from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+  class MetricsRequestHandler(BaseHTTPRequestHandler):
+    do_GET = _handle_request
+
+    def log_message(self, format, *args):
+      logging.debug('Metrics request: %s' % (format % args))
+
+  try:
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+  except OSError as e:
+    logging.warning('Could not serve metrics on %s:%d: %s' % (host, port, e))
+    return None
+  server.daemon_threads = True
+  thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+  thread.start()
+  watch_thread(thread)
+  logging.info('Serving metrics on http://%s:%d/metrics' % (host, server.server_port))
+  return server
+
+
+def log_periodically(interval):
+
+  def log():
+    while True:
+      time.sleep(interval)
+      logging.info('Metrics: %s' % json.dumps(get_snapshot(), sort_keys=True))
+
+  thread = threading.Thread(target=log, name='metrics-log', daemon=True)
+  thread.start()
+  watch_thread(thread)
+  return thread
+
+
+# Starts whatever config.py asks for
+def start():
+  port = getattr(config, 'METRICS_PORT', DEFAULT_PORT)
+  if port:
+    serve(port, getattr(config, 'METRICS_HOST', DEFAULT_HOST))
+  log_secs = getattr(config, 'METRICS_LOG_SECS', 0)
+  if log_secs:
+    log_periodically(log_secs)
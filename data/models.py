@@ -0,0 +1,120 @@
+# Compact records for the games and play-by-play actions the feeds return. Fields are parsed once
+# when a response is converted, rather than every time a display or poll needs them.
+from data.teams import get_team_by_abbreviation
+from datetime import datetime, timezone
+from enum import IntEnum
+
+_local_timezone = timezone.utc
+
+# Actions after which the game clock stays stopped until the ball is inbounded again. Shared by the
+# poll schedule and the clock model, so they agree on when the clock is stopped.
+STOPPED_CLOCK_ACTIONS = {
+    'foul', 'freethrow', 'violation', 'substitution', 'timeout', 'instantreplay', 'ejection'
+}
+# Turnovers that leave the ball live, so the clock keeps running
+LIVE_BALL_TURNOVERS = {'bad pass', 'lost ball'}
+
+
+def set_local_timezone(tz):
+  global _local_timezone
+  _local_timezone = tz
+
+
+def parse_utc_time(text):
+  # The feeds use a couple of fixed formats, which strptime parses far faster than dateutil
+  for time_format in ('%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%dT%H:%M:%S.%fZ'):
+    try:
+      return datetime.strptime(text, time_format).replace(tzinfo=timezone.utc)
+    except ValueError:
+      pass
+  from dateutil import parser
+  return parser.parse(text).replace(tzinfo=timezone.utc)
+
+
+def parse_clock(clock_text):
+  # e.g. PT05M32.00S
+  if not clock_text or not clock_text.startswith('PT'):
+    return None
+  try:
+    mins, secs = clock_text[2:].rstrip('S').split('M')
+    return int(mins) * 60 + float(secs)
+  except ValueError:
+    return None
+
+
+class GameStatus(IntEnum):
+  SCHEDULED = 1
+  LIVE = 2
+  FINAL = 3
+
+  # Codes the feeds rarely use (e.g. for a postponed or suspended game) are shown as not started,
+  # rather than failing the whole scoreboard
+  @classmethod
+  def _missing_(cls, value):
+    return cls.SCHEDULED
+
+
+class Team(object):
+  __slots__ = ('id', 'tricode', 'name', 'city', 'score', 'info')
+
+  def __init__(self, data):
+    self.id = data.get('teamId')
+    self.tricode = data['teamTricode']
+    self.name = data.get('teamName')
+    self.city = data.get('teamCity')
+    self.score = int(data.get('score') or 0)
+    # The shared registry record, for logos and names
+    self.info = get_team_by_abbreviation(self.tricode)
+
+
+class Game(object):
+  __slots__ = ('id', 'status', 'status_text', 'period', 'clock', 'clock_seconds', 'tipoff_utc',
+               'tipoff_local', 'away_team', 'home_team')
+
+  def __init__(self, data):
+    self.id = data['gameId']
+    self.status_text = data.get('gameStatusText', '')
+    # Overtime finals read "Final/OT"
+    if data.get('gameStatus') == 3 or self.status_text.startswith('Final'):
+      self.status = GameStatus.FINAL
+    else:
+      self.status = GameStatus(data.get('gameStatus', 1))
+    self.period = data.get('period', 0)
+    self.clock = data.get('gameClock', '')
+    self.clock_seconds = parse_clock(self.clock)
+    self.tipoff_utc = parse_utc_time(data['gameTimeUTC'])
+    self.tipoff_local = self.tipoff_utc.astimezone(_local_timezone)
+    self.away_team = Team(data['awayTeam'])
+    self.home_team = Team(data['homeTeam'])
+
+  @property
+  def teams(self):
+    return [self.away_team, self.home_team]
+
+  def __repr__(self):
+    return '<Game %s %s @ %s: %s>' % (self.id, self.away_team.tricode, self.home_team.tricode,
+                                      self.status_text)
+
+
+class Action(object):
+  __slots__ = ('number', 'period', 'clock', 'clock_seconds', 'time_actual', 'action_type',
+               'sub_type', 'shot_result', 'team_tricode', 'score_away', 'score_home', 'edited',
+               'description')
+
+  def __init__(self, data):
+    self.number = data['actionNumber']
+    self.period = data.get('period', 0)
+    self.clock = data.get('clock', '')
+    self.clock_seconds = parse_clock(self.clock)
+    self.time_actual = data.get('timeActual')
+    self.action_type = data.get('actionType')
+    self.sub_type = data.get('subType')
+    self.shot_result = data.get('shotResult')
+    self.team_tricode = data.get('teamTricode')
+    self.score_away = int(data.get('scoreAway') or 0)
+    self.score_home = int(data.get('scoreHome') or 0)
+    self.edited = data.get('edited')
+    self.description = data.get('description')
+
+  def __repr__(self):
+    return '<Action %s Q%s %s %s>' % (self.number, self.period, self.clock, self.action_type)
@@ -0,0 +1,184 @@
+# nba_api (which brings in pandas) and requests are imported on first use, off the render thread,
+# as they are most of the time it takes to start up
+from data.metrics import FETCH_ERRORS, FETCH_SECONDS, RATE_LIMIT_WAIT_SECONDS, watch_thread
+from PIL import Image
+import asyncio
+import threading
+import time
+
+PLAYBYPLAY_URL = 'https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_%s.json'
+
+
+class TokenBucket(object):
+
+  def __init__(self, max_calls, period):
+    self.capacity = max_calls
+    self.rate = max_calls / period
+    self.tokens = max_calls
+    self.updated = time.monotonic()
+
+  async def acquire(self):
+    # Only ever used from the client's event loop, so there is no await between checking and
+    # taking a token. Waiting yields to other requests instead of sleeping the thread.
+    waited = 0
+    while True:
+      now = time.monotonic()
+      self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+      self.updated = now
+      if self.tokens >= 1:
+        self.tokens -= 1
+        return waited
+      wait = (1 - self.tokens) / self.rate
+      await asyncio.sleep(wait)
+      waited += wait
+
+
+def _fetch_game(game_id):
+  from nba_api.live.nba.endpoints import boxscore
+  return boxscore.BoxScore(str(game_id)).game.get_dict()
+
+
+def _fetch_games_for_today():
+  from nba_api.live.nba.endpoints import scoreboard
+  return scoreboard.ScoreBoard().games.get_dict()
+
+
+def _fetch_playbyplay(game_id):
+  from nba_api.live.nba.endpoints import playbyplay
+  return playbyplay.PlayByPlay(str(game_id)).get_dict()['game']
+
+
+def _fetch_playbyplay_if_modified(session, game_id, etag=None, last_modified=None):
+  headers = {}
+  if etag:
+    headers['If-None-Match'] = etag
+  if last_modified:
+    headers['If-Modified-Since'] = last_modified
+  response = session.get(PLAYBYPLAY_URL % game_id, headers=headers, timeout=10)
+  if response.status_code == 304:
+    return None
+  response.raise_for_status()
+  return response
+
+
+def _fetch_standings():
+  from nba_api.stats.endpoints.leaguestandings import LeagueStandings
+  return LeagueStandings().standings.get_dict()['data']
+
+
+def _fetch_image(url):
+  import requests
+  image_response = requests.get(url, stream=True, timeout=10)  # stream is required for response.raw
+  image_response.raise_for_status()
+  with Image.open(image_response.raw) as img:
+    img.load()
+    return img
+
+
+class AsyncNBAClient(object):
+
+  def __init__(self, executor=None):
+    self.executor = executor
+    self._session = None
+    self.rate_limits = {
+        'boxscore': TokenBucket(max_calls=1, period=5),
+        'scoreboard': TokenBucket(max_calls=1, period=5),
+        'playbyplay': TokenBucket(max_calls=1, period=5),
+        'standings': TokenBucket(max_calls=1, period=5),
+        'logo': TokenBucket(max_calls=5, period=10),
+    }
+
+  @property
+  def session(self):
+    if self._session is None:
+      import requests
+      self._session = requests.Session()
+    return self._session
+
+  async def _fetch(self, endpoint, func, *args):
+    RATE_LIMIT_WAIT_SECONDS.observe(await self.rate_limits[endpoint].acquire(), endpoint=endpoint)
+    started = time.perf_counter()
+    try:
+      return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    except Exception:
+      FETCH_ERRORS.inc(endpoint=endpoint)
+      raise
+    finally:
+      FETCH_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+  async def get_game(self, game_id):
+    return await self._fetch('boxscore', _fetch_game, game_id)
+
+  async def get_games_for_today(self):
+    return await self._fetch('scoreboard', _fetch_games_for_today)
+
+  async def get_playbyplay(self, game_id):
+    return await self._fetch('playbyplay', _fetch_playbyplay, game_id)
+
+  # Returns None when the feed hasn't changed since the given ETag/Last-Modified, otherwise the
+  # raw response so the caller can parse it and keep its validators
+  async def get_playbyplay_if_modified(self, game_id, etag=None, last_modified=None):
+    return await self._fetch('playbyplay', _fetch_playbyplay_if_modified, self.session, game_id,
+                             etag, last_modified)
+
+  async def get_standings(self):
+    return await self._fetch('standings', _fetch_standings)
+
+  async def get_image(self, url):
+    return await self._fetch('logo', _fetch_image, url)
+
+
+# Synchronous facade over AsyncNBAClient that runs its event loop on a background thread, so
+# blocking code can migrate to the async client gradually
+class NBAClient(object):
+
+  def __init__(self, async_client=None):
+    self.async_client = async_client or AsyncNBAClient()
+    self.loop = asyncio.new_event_loop()
+    self.thread = threading.Thread(target=self.loop.run_forever, name='nba-client', daemon=True)
+    self.thread.start()
+    watch_thread(self.thread)
+
+  # Returns a concurrent.futures.Future instead of waiting for the result
+  def submit(self, coro):
+    return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+  def get_game(self, game_id):
+    return self.submit(self.async_client.get_game(game_id)).result()
+
+  def get_games_for_today(self):
+    return self.submit(self.async_client.get_games_for_today()).result()
+
+  def get_playbyplay(self, game_id):
+    return self.submit(self.async_client.get_playbyplay(game_id)).result()
+
+  def get_playbyplay_if_modified(self, game_id, etag=None, last_modified=None):
+    return self.submit(
+        self.async_client.get_playbyplay_if_modified(game_id, etag, last_modified)).result()
+
+  def get_standings(self):
+    return self.submit(self.async_client.get_standings()).result()
+
+  def get_image(self, url):
+    return self.submit(self.async_client.get_image(url)).result()
+
+  def close(self):
+    self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+  global _client
+  with _client_lock:
+    if _client is None:
+      _client = NBAClient()
+    return _client
+
+
+def set_client(client):
+  global _client
+  with _client_lock:
+    _client = client
@@ -1,47 +1,27 @@
-from datetime import datetime, timedelta, timezone
-from dateutil import parser
-from functools import lru_cache
-from nba_api.live.nba.endpoints import boxscore, playbyplay, scoreboard
-from nba_api.stats.endpoints.leaguestandings import LeagueStandings
-from nba_api.stats.static import teams
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from data.cache import swr_cache
+from data.clock import get_clock
+from data.metrics import PARSE_SECONDS
+from data.models import Game, GameStatus, set_local_timezone
+from data.nba_client import get_client
+from data.teams import find_team, get_team_by_id, get_teams
 from PIL import Image, ImageOps
-from ratelimiter import RateLimiter
 import config
 import logging
 import os
 import pytz
-import re
-import requests
 import time
 
 
-def find_team(keyword):
-  if not keyword:
-    return None
-
-  if teams.find_team_by_abbreviation(keyword.upper()):
-    return teams.find_team_by_abbreviation(keyword.upper())
-  if teams.find_teams_by_full_name(keyword):
-    return teams.find_teams_by_full_name(keyword)[0]
-  if teams.find_teams_by_nickname(keyword):
-    return teams.find_teams_by_nickname(keyword)[0]
-  if teams.find_teams_by_city(keyword):
-    return teams.find_teams_by_city(keyword)[0]
-  if teams.find_teams_by_state(keyword):
-    return teams.find_teams_by_state(keyword)[0]
-
-  return None
-
-
 def get_game_datetime(game):
-  return parser.parse(
-      game["gameTimeUTC"]).replace(tzinfo=timezone.utc).astimezone(tz=pytz.timezone(TIMEZONE))
+  return game.tipoff_local
 
 
 def game_has_started(game):
-  if datetime.now(tz=pytz.timezone(TIMEZONE)) < get_game_datetime(game):
+  if get_clock().now() < game.tipoff_utc:
     return False
-  return game['period'] > 0
+  return game.period > 0
 
 
 def game_is_live(game):
@@ -49,30 +29,18 @@ def game_is_live(game):
 
 
 def get_logo_url(team_id):
-  team = teams.find_team_name_by_id(team_id)
+  team = get_team_by_id(team_id)
   # return ('http://i.cdn.turner.com/nba/nba/.element/img/1.0/teamsites/logos/'
   #'teamlogos_500x500/%s.png' % team['abbreviation'].lower())
   team_name = '-'.join(team['full_name'].split(' ')).lower()
   return 'https://i.logocdn.com/nba/2022/%s.png' % team_name
 
 
-def get_nba_logo():
-  bg_img = Image.new('RGB', (64, 32))
-  with Image.open('assets/nba_logo.png') as logo_img:
-    logo_img = logo_img.crop(logo_img.getbbox())
-    logo_img = ImageOps.pad(logo_img, (64, 32), method=Image.HAMMING)
-    bg_img.paste(logo_img)
-    return bg_img
-
-
-def get_basketball_img(size=32):
-  with Image.open('assets/basketball.png') as basketball_img:
-    return basketball_img.resize((size, size), resample=Image.HAMMING)
-
-
-def get_important_games(favorite_teams):
+def get_important_games(favorite_teams, games=None):
+  if games is None:
+    games = get_games_for_today()
   important_games = []
-  for game in get_games_for_today():
+  for game in games:
     team_importances = [
         _get_team_importance(team, favorite_teams) for team in get_teams_from_game(game)
     ]
@@ -80,7 +48,7 @@ def get_important_games(favorite_teams):
       min_importance = min(filter(lambda i: i is not None, team_importances))
       important_games.append({'importance': min_importance, 'game': game})
 
-  important_games.sort(key=lambda entry: parser.parse(entry['game']['gameTimeUTC']))
+  important_games.sort(key=lambda entry: entry['game'].tipoff_utc)
   important_games.sort(key=lambda entry: entry['importance'])
   return list(map(lambda entry: entry['game'], important_games))
 
@@ -92,107 +60,109 @@ def _get_team_importance(team, favorite_teams):
 
 
 def get_teams_from_game(game):
-  away_team = teams.find_team_by_abbreviation(game['awayTeam']['teamTricode'])
-  home_team = teams.find_team_by_abbreviation(game['homeTeam']['teamTricode'])
-  return [away_team, home_team]
+  return [game.away_team.info, game.home_team.info]
 
 
 def get_score_from_game(game):
-  away_score = game['awayTeam']['score']
-  home_score = game['homeTeam']['score']
-  return [away_score, home_score]
+  return [game.away_team.score, game.home_team.score]
 
 
-def get_game_clock(clock_text):
-  match = re.match(r'PT(\d{2})M(\d{2}).+', clock_text)
-  mins, secs = match.group(1), match.group(2)
-  return mins, secs
+def get_game_clock(clock_seconds):
+  return divmod(int(clock_seconds or 0), 60)
 
 
-def get_game_clock_text(clock_text):
-  mins, secs = get_game_clock(clock_text)
-  return '{mins}:{secs}'.format(mins=int(mins), secs=secs)
+def get_game_clock_text(clock_seconds):
+  mins, secs = get_game_clock(clock_seconds)
+  return '{mins}:{secs:02d}'.format(mins=mins, secs=secs)
 
 
 # Functions that make url requests
 
 
-@lru_cache(maxsize=50)
-@RateLimiter(max_calls=1, period=5)
-def _get_game_by_id(game_id, ttl_hash):
-  print('Game id: %s' % game_id)
-  box = boxscore.BoxScore(str(game_id))
-  return box.game.get_dict()
+@swr_cache('boxscore', ttl=timedelta(minutes=10), max_size=50)
+def _get_game_by_id(game_id):
+  logging.debug('Fetching game %s' % game_id)
+  game = get_client().get_game(game_id)
+  with PARSE_SECONDS.time(payload='boxscore'):
+    return Game(game)
 
 
 def get_game_by_id(game_id, cache_time=timedelta(minutes=10), cache_override=False):
-  if cache_override:
-    return _get_game_by_id(game_id, -time.time())
-  return _get_game_by_id(game_id, time.time() // cache_time.total_seconds())
+  return _get_game_by_id.get(game_id, max_age=cache_time, refresh=cache_override)
 
 
 def game_has_ended(game):
-  return game['gameStatusText'] == 'Final'
+  return game.status == GameStatus.FINAL
 
 
-@lru_cache(maxsize=1)
-@RateLimiter(max_calls=1, period=5)
-def _get_games_for_today(ttl_hash):
-  games = scoreboard.ScoreBoard().games.get_dict()
+# The scoreboard is polled up to an hour apart, so it stays servable for longer than its TTL
+@swr_cache('scoreboard',
+           ttl=timedelta(minutes=10),
+           max_stale=timedelta(hours=2),
+           max_size=1,
+           persist=True)
+def _get_games_for_today():
+  games = get_client().get_games_for_today()
+  with PARSE_SECONDS.time(payload='scoreboard'):
+    games = [Game(game) for game in games]
 
   game_format = ('{gameId}: {awayTeam} vs. {homeTeam} @ {gameTimeLTZ}.'
                  ' {time} in Quarter {quarter}. Score: {awayTeamScore}-{homeTeamScore}')
   for game in games:
     logging.debug(
         game_format.format(
-            gameId=game['gameId'],
-            awayTeam=game['awayTeam']['teamName'],
-            homeTeam=game['homeTeam']['teamName'],
-            gameTimeLTZ=get_game_datetime(game),
-            time=game['gameClock'],
-            quarter=game['period'],
-            awayTeamScore=game['awayTeam']['score'],
-            homeTeamScore=game['homeTeam']['score']))
+            gameId=game.id,
+            awayTeam=game.away_team.name,
+            homeTeam=game.home_team.name,
+            gameTimeLTZ=game.tipoff_local,
+            time=game.clock,
+            quarter=game.period,
+            awayTeamScore=game.away_team.score,
+            homeTeamScore=game.home_team.score))
 
   return games
 
 
 def get_games_for_today(cache_time=timedelta(minutes=10), cache_override=False):
-  if cache_override:
-    return _get_games_for_today(-time.time())
-  return _get_games_for_today(time.time() // cache_time.total_seconds())
+  return _get_games_for_today.get(max_age=cache_time, refresh=cache_override)
 
 
-@lru_cache(maxsize=10)
-@RateLimiter(max_calls=1, period=5)
-def _get_playbyplay_for_game(game_id, ttl_hash):
-  game = get_game_by_id(game_id)
-  return playbyplay.PlayByPlay(game['gameId']).get_dict()['game']
+@swr_cache('playbyplay',
+           ttl=timedelta(seconds=5),
+           max_stale=timedelta(minutes=1),
+           max_size=10)
+def _get_playbyplay_for_game(game_id):
+  return get_client().get_playbyplay(game_id)
 
 
 def get_playbyplay_for_game(game,
                             cache_time=timedelta(seconds=5),
                             cache_override=False,
                             actions=True):
-  if cache_override:
-    pbp = _get_playbyplay_for_game(game['gameId'], -time.time())
-  else:
-    pbp = _get_playbyplay_for_game(game['gameId'], time.time() // cache_time.total_seconds())
+  pbp = _get_playbyplay_for_game.get(game.id, max_age=cache_time, refresh=cache_override)
 
   if actions:
     return pbp['actions']
   return pbp
 
 
-@lru_cache(maxsize=1)
-@RateLimiter(max_calls=1, period=5)
-def _get_standings(ttl_hash):
-  response = LeagueStandings()
+# Standings change once a day, so yesterday's are still worth showing after a restart
+@swr_cache('standings',
+           ttl=timedelta(minutes=10),
+           max_stale=timedelta(days=1),
+           max_size=1,
+           persist=True)
+def _get_standings():
+  rows = get_client().get_standings()
+  with PARSE_SECONDS.time(payload='standings'):
+    return _parse_standings(rows)
+
 
+def _parse_standings(rows):
   standings = list()
-  for team in response.standings.get_dict()['data']:
+  for team in rows:
     standings.append({
-        'team': teams.find_team_name_by_id(team[2]),
+        'team': get_team_by_id(team[2]),
         'wins': team[12],
         'losses': team[13],
         'winPercent': team[14]
@@ -211,18 +181,14 @@ def _get_standings(ttl_hash):
 
 
 def get_standings(cache_time=timedelta(minutes=10), cache_override=False):
-  if cache_override:
-    return _get_standings(-time.time())
-  return _get_standings(time.time() // cache_time.total_seconds())
+  return _get_standings.get(max_age=cache_time, refresh=cache_override)
 
 
-@lru_cache(maxsize=30)
-@RateLimiter(max_calls=5, period=10)
-def _get_team_logo(team_id, ttl_hash, width=30, height=30):
-  url = get_logo_url(team_id)
-  image_response = requests.get(url, stream=True)  # stream is required for response.raw
-  img = Image.open(image_response.raw)
+def _download_team_logo(team_id):
+  return get_client().get_image(get_logo_url(team_id))
 
+
+def _render_team_logo(img, width, height):
   black_img = Image.new("RGB", (img.width, img.height), (0, 0, 0))
   black_img.paste(img, mask=img.split()[3])
   bbox = black_img.getbbox()
@@ -236,24 +202,102 @@ def _get_team_logo(team_id, ttl_hash, width=30, height=30):
   return bg_img
 
 
+def _get_team_logo_path(team_id, width, height):
+  return os.path.join(TEAM_LOGO_DIR, '%s_%dx%d.png' % (team_id, width, height))
+
+
+def _load_team_logo(path):
+  with Image.open(path) as img:
+    return img.convert('RGB')
+
+
+def _save_team_logo(logo, path):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  tmp_path = path + '.tmp'
+  logo.save(tmp_path, format='PNG')
+  os.replace(tmp_path, path)
+
+
+@swr_cache('logo', ttl=timedelta(days=30), max_size=30)
+def _get_team_logo(team_id, width=30, height=30, max_file_age=None):
+  path = _get_team_logo_path(team_id, width, height)
+  if os.path.exists(path) and (max_file_age is None or
+                               time.time() - os.path.getmtime(path) < max_file_age):
+    return _load_team_logo(path)
+
+  try:
+    logo = _render_team_logo(_download_team_logo(team_id), width, height)
+  except Exception as e:
+    # Stay usable offline as long as the logo was stored at some point
+    if os.path.exists(path):
+      logging.debug('Using stored logo for team %s: %s' % (team_id, e))
+      return _load_team_logo(path)
+    raise
+
+  try:
+    _save_team_logo(logo, path)
+  except OSError as e:
+    logging.debug('Could not store logo for team %s: %s' % (team_id, e))
+  return logo
+
+
 def get_team_logo(team_id,
                   width=30,
                   height=30,
                   cache_time=timedelta(days=30),
                   cache_override=False):
-  if cache_override:
-    return _get_team_logo(team_id, -time.time(), width=width, height=height)
-  return _get_team_logo(
-      team_id, time.time() // cache_time.total_seconds(), width=width, height=height)
-
-
-FAVORITE_TEAMS = [find_team(team) for team in config.FAVORITE_TEAMS if team is not None]
-FAVORITE_TEAM_NAMES = [team['nickname'] for team in FAVORITE_TEAMS]
-SLEEP_TIME = config.SLEEP_TIME or None
-WAKE_TIME = config.WAKE_TIME or None
-SLEEP_DAY = config.SLEEP_DAY or None
-WAKE_DAY = config.WAKE_DAY or None
-TIMEZONE = config.TIMEZONE if config.TIMEZONE in pytz.all_timezones else 'UTC'
-os.environ['TZ'] = TIMEZONE
-if not os.name == 'nt':
-  time.tzset()
+  # The stored file's age isn't part of the key, so an override replaces the entry others read
+  max_file_age = 0 if cache_override else cache_time.total_seconds()
+  return _get_team_logo.get(team_id,
+                            width=width,
+                            height=height,
+                            max_age=cache_time,
+                            refresh=cache_override,
+                            fetch_kwargs={'max_file_age': max_file_age})
+
+
+def prewarm_team_logos(width=30, height=30, max_workers=5):
+  with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    futures = {
+        executor.submit(get_team_logo, team['id'], width=width, height=height): team
+        for team in get_teams()
+    }
+    for future in as_completed(futures):
+      try:
+        future.result()
+      except Exception as e:
+        logging.debug('Could not prewarm logo for %s: %s' % (futures[future]['abbreviation'], e))
+
+
+# Applies config.py. Called once at startup rather than on import, so importing this module has no
+# side effects on the process (like its timezone).
+def init():
+  global SLEEP_TIME, WAKE_TIME, SLEEP_DAY, WAKE_DAY, TIMEZONE
+  # Filled in place, as other modules hold on to these lists
+  FAVORITE_TEAMS[:] = [find_team(team) for team in config.FAVORITE_TEAMS if team is not None]
+  FAVORITE_TEAM_NAMES[:] = [team['nickname'] for team in FAVORITE_TEAMS]
+  SLEEP_TIME = config.SLEEP_TIME or None
+  WAKE_TIME = config.WAKE_TIME or None
+  SLEEP_DAY = config.SLEEP_DAY or None
+  WAKE_DAY = config.WAKE_DAY or None
+
+  # Looking the zone up directly avoids loading pytz's list of every zone name
+  try:
+    local_timezone = pytz.timezone(config.TIMEZONE)
+    TIMEZONE = config.TIMEZONE
+  except pytz.UnknownTimeZoneError:
+    local_timezone, TIMEZONE = pytz.utc, 'UTC'
+  set_local_timezone(local_timezone)
+  os.environ['TZ'] = TIMEZONE
+  if not os.name == 'nt':
+    time.tzset()
+
+
+TEAM_LOGO_DIR = os.path.join('cache', 'logos')
+FAVORITE_TEAMS = []
+FAVORITE_TEAM_NAMES = []
+SLEEP_TIME = None
+WAKE_TIME = None
+SLEEP_DAY = None
+WAKE_DAY = None
+TIMEZONE = 'UTC'
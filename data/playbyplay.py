@@ -0,0 +1,129 @@
+from data.metrics import PARSE_SECONDS
+from data.models import Action
+import asyncio
+import json
+import logging
+import threading
+import time
+
+
+class PlayByPlayStore(object):
+
+  def __init__(self, game_id, actions=None):
+    self.game_id = game_id
+    self.actions = list()
+    self.watermark = -1
+    self.etag = None
+    self.last_modified = None
+    self.lock = threading.Lock()
+    self._positions = {}
+    self._edited = {}
+
+    self.polls = 0
+    self.not_modified = 0
+    self.bytes_received = 0
+    self.parse_seconds = 0
+    if actions:
+      self.merge_actions(actions)
+
+  # A changed feed is still downloaded in full. Parsing it takes long enough to hold up the other
+  # requests, so it happens off the client's event loop.
+  async def sync_async(self, async_client):
+    response = await async_client.get_playbyplay_if_modified(self.game_id, self.etag,
+                                                              self.last_modified)
+    if response is None:
+      return self.apply_response(response)
+    return await asyncio.get_running_loop().run_in_executor(None, self.apply_response, response)
+
+  def apply_response(self, response):
+    self.polls += 1
+    if response is None:
+      self.not_modified += 1
+      return 0
+
+    parse_start = time.perf_counter()
+    actions = json.loads(response.content)['game']['actions']
+    self.bytes_received += len(response.content)
+    self.etag = response.headers.get('ETag')
+    self.last_modified = response.headers.get('Last-Modified')
+    changed = self.merge_actions(actions)
+    parse_seconds = time.perf_counter() - parse_start
+    self.parse_seconds += parse_seconds
+    PARSE_SECONDS.observe(parse_seconds, payload='playbyplay')
+    return changed
+
+  # Takes actions as they come from the feed. Only new and edited actions are converted to
+  # Action records.
+  def merge_actions(self, actions):
+    with self.lock:
+      changed = 0
+      for action in actions:
+        action_number = action['actionNumber']
+        if action_number > self.watermark:
+          self._positions[action_number] = len(self.actions)
+          self.actions.append(Action(action))
+          self.watermark = action_number
+          changed += 1
+        elif action.get('edited') != self._edited.get(action_number):
+          position = self._positions.get(action_number)
+          if position is None:
+            self._positions[action_number] = len(self.actions)
+            self.actions.append(Action(action))
+          else:
+            self.actions[position] = Action(action)
+          changed += 1
+        self._edited[action_number] = action.get('edited')
+
+      # Actions are occasionally removed from the feed, in which case start over from it
+      if len(self.actions) != len(actions):
+        logging.debug('Play-by-play for game %s lost actions, rebuilding.' % self.game_id)
+        self.actions = [Action(action) for action in actions]
+        self._positions = {action.number: i for i, action in enumerate(self.actions)}
+        self._edited = {action.number: action.edited for action in self.actions}
+        self.watermark = max(self._positions, default=-1)
+        changed = len(self.actions)
+      return changed
+
+  # What a restart needs to carry on from here, including the validators so that the first poll
+  # after it can come back not modified
+  def get_state(self):
+    with self.lock:
+      return {'actions': list(self.actions), 'etag': self.etag, 'lastModified': self.last_modified}
+
+  def set_state(self, state):
+    with self.lock:
+      self.actions = list(state['actions'])
+      self._positions = {action.number: i for i, action in enumerate(self.actions)}
+      self._edited = {action.number: action.edited for action in self.actions}
+      self.watermark = max(self._positions, default=-1)
+      self.etag = state['etag']
+      self.last_modified = state['lastModified']
+
+  def latest_action(self):
+    with self.lock:
+      return self.actions[-1] if self.actions else None
+
+  def get_stats(self):
+    return {
+        'polls': self.polls,
+        'notModified': self.not_modified,
+        'bytesReceived': self.bytes_received,
+        'parseSeconds': self.parse_seconds,
+        'actions': len(self.actions),
+    }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_playbyplay_store(game_id, actions=None):
+  with _stores_lock:
+    if game_id not in _stores:
+      _stores[game_id] = PlayByPlayStore(game_id, actions)
+    return _stores[game_id]
+
+
+def remove_playbyplay_store(game_id):
+  with _stores_lock:
+    _stores.pop(game_id, None)
@@ -0,0 +1,189 @@
+from collections import deque, namedtuple
+from data.clock import get_clock
+from data.game_clock import is_clock_running
+from data.metrics import POLLS
+from data.models import GameStatus
+import threading
+import time
+
+PollDecision = namedtuple('PollDecision', ['endpoint', 'delay', 'reason', 'decided_at'])
+
+# Seconds between play-by-play polls for each game state. The endpoint rate limits still apply on
+# top of these. The displayed clock counts down between polls (see data.game_clock), so a running
+# clock doesn't need polling any faster than the play-by-play rate limit allows.
+CLOCK_RUNNING_DELAY = 5
+CLOCK_STOPPED_DELAY = 3
+REVIEW_DELAY = 10
+TIMEOUT_DELAY = 15
+PERIOD_BREAK_DELAY = 20
+HALFTIME_DELAY = 60
+
+# The boxscore is only needed for the game status, so it is polled less often than play-by-play
+MIN_BOXSCORE_DELAY = 10
+BOXSCORE_DELAY_FACTOR = 5
+
+# Seconds between scoreboard polls
+SCOREBOARD_LIVE_DELAY = 60
+SCOREBOARD_TIPOFF_DELAY = 60
+SCOREBOARD_SOON_DELAY = 10 * 60
+SCOREBOARD_IDLE_DELAY = 60 * 60
+
+
+def _get_seconds_to_tipoff(game, now=None):
+  now = now or get_clock().now()
+  return (game.tipoff_utc - now).total_seconds()
+
+
+class PollScheduler(object):
+
+  def __init__(self, history=500):
+    self.decisions = deque(maxlen=history)
+    self.polls = {}
+    self.lock = threading.Lock()
+
+  def next_live_poll(self, game, latest_action=None):
+    delay, reason = self._get_playbyplay_delay(game, latest_action)
+    if delay is None:
+      self._record_decision('playbyplay', None, reason)
+      self._record_decision('boxscore', None, reason)
+      return None, None
+
+    if latest_action and latest_action.action_type == 'period' and game.period >= 4:
+      # The game may be about to go final, which only the boxscore tells us
+      game_delay, game_reason = delay, 'possible end of game'
+    else:
+      game_delay, game_reason = max(delay * BOXSCORE_DELAY_FACTOR, MIN_BOXSCORE_DELAY), reason
+    self._record_decision('playbyplay', delay, reason)
+    self._record_decision('boxscore', game_delay, game_reason)
+    return delay, game_delay
+
+  def _get_playbyplay_delay(self, game, latest_action):
+    if game.status == GameStatus.FINAL:
+      return None, 'final'
+
+    seconds_to_tipoff = _get_seconds_to_tipoff(game)
+    if game.period == 0 or game.status == GameStatus.SCHEDULED:
+      if seconds_to_tipoff > 60 * 60:
+        return SCOREBOARD_SOON_DELAY, 'tip-off in over an hour'
+      if seconds_to_tipoff > 10 * 60:
+        return 2 * 60, 'tip-off in under an hour'
+      return PERIOD_BREAK_DELAY, 'tip-off imminent'
+
+    if game.status_text == 'Half':
+      return HALFTIME_DELAY, 'halftime'
+    if not latest_action:
+      return CLOCK_RUNNING_DELAY, 'no play-by-play yet'
+
+    action_type = latest_action.action_type
+    if action_type == 'period' and latest_action.sub_type == 'end':
+      if latest_action.period == 2:
+        return HALFTIME_DELAY, 'halftime'
+      return PERIOD_BREAK_DELAY, 'end of period'
+    if latest_action.clock_seconds == 0:
+      return PERIOD_BREAK_DELAY, 'period clock expired'
+    if action_type == 'timeout':
+      return TIMEOUT_DELAY, 'timeout'
+    if action_type == 'instantreplay':
+      return REVIEW_DELAY, 'instant replay'
+    if not is_clock_running(latest_action):
+      return CLOCK_STOPPED_DELAY, 'clock stopped (%s)' % action_type
+    return CLOCK_RUNNING_DELAY, 'clock running'
+
+  def next_scoreboard_poll(self, games):
+    delay, reason = self._get_scoreboard_delay(games)
+    self._record_decision('scoreboard', delay, reason)
+    return delay
+
+  def _get_scoreboard_delay(self, games):
+    if any(game.status == GameStatus.LIVE for game in games):
+      return SCOREBOARD_LIVE_DELAY, 'game in progress'
+
+    upcoming = [
+        _get_seconds_to_tipoff(game) for game in games if game.status == GameStatus.SCHEDULED
+    ]
+    if not upcoming:
+      return SCOREBOARD_IDLE_DELAY, 'no games left today'
+
+    seconds_to_tipoff = min(upcoming)
+    if seconds_to_tipoff <= 15 * 60:
+      return SCOREBOARD_TIPOFF_DELAY, 'tip-off within 15 minutes'
+    if seconds_to_tipoff <= 2 * 60 * 60:
+      return SCOREBOARD_SOON_DELAY, 'tip-off within 2 hours'
+    # Wake up in time to catch the next tip-off
+    return min(SCOREBOARD_IDLE_DELAY, seconds_to_tipoff - 15 * 60), 'next tip-off hours away'
+
+  def record_poll(self, endpoint):
+    POLLS.inc(endpoint=endpoint)
+    now = time.monotonic()
+    with self.lock:
+      polls = self.polls.setdefault(endpoint, deque())
+      polls.append(now)
+      while polls and polls[0] < now - 3600:
+        polls.popleft()
+
+  def requests_per_hour(self):
+    now = time.monotonic()
+    with self.lock:
+      return {
+          endpoint: len([poll for poll in polls if poll >= now - 3600])
+          for endpoint, polls in self.polls.items()
+      }
+
+  def get_latest_decisions(self):
+    with self.lock:
+      latest = {}
+      for decision in self.decisions:
+        latest[decision.endpoint] = decision
+      return latest
+
+  def get_report(self):
+    return {
+        'requestsPerHour': self.requests_per_hour(),
+        'decisions': {
+            endpoint: {
+                'delay': decision.delay,
+                'reason': decision.reason
+            } for endpoint, decision in self.get_latest_decisions().items()
+        },
+    }
+
+  def _record_decision(self, endpoint, delay, reason):
+    with self.lock:
+      self.decisions.append(PollDecision(endpoint, delay, reason, time.time()))
+
+
+class RequestBudget(object):
+
+  def __init__(self, max_requests, period):
+    self.max_requests = max_requests
+    self.period = period
+    self.requests = deque()
+    self.lock = threading.Lock()
+
+  def try_spend(self):
+    now = time.monotonic()
+    with self.lock:
+      self._prune(now)
+      if len(self.requests) >= self.max_requests:
+        return False
+      self.requests.append(now)
+      return True
+
+  def seconds_until_available(self):
+    now = time.monotonic()
+    with self.lock:
+      self._prune(now)
+      if len(self.requests) < self.max_requests:
+        return 0
+      return self.requests[0] + self.period - now
+
+  def _prune(self, now):
+    while self.requests and self.requests[0] <= now - self.period:
+      self.requests.popleft()
+
+
+_scheduler = PollScheduler()
+
+
+def get_poll_scheduler():
+  return _scheduler
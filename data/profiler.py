@@ -0,0 +1,123 @@
+# A sampling profiler for a board that is already running, for stutters that go away when it is
+# restarted under cProfile. Every few milliseconds it records what each thread is doing (the render
+# loop, the live poller, the client's event loop...), then writes the samples as collapsed stacks:
+# one "thread;outermost;...;innermost count" line per distinct stack, which flamegraph.pl and
+# speedscope read directly. Sampling only looks at the threads' frames, so the board runs as usual.
+#
+# Start one with kill -USR1 <pid> (for DEFAULT_SECS), or from the metrics endpoint with
+# http://localhost:METRICS_PORT/profile?seconds=N, which also returns the stacks.
+from collections import Counter
+from data.metrics import add_route
+from datetime import datetime
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+PROFILE_DIR = 'profiles'
+DEFAULT_SECS = 30
+MAX_SECS = 600
+# 100 samples a second is plenty to find a stutter, for a couple of percent of one core
+SAMPLE_INTERVAL_SECS = 0.01
+
+_running = threading.Lock()
+
+
+def _get_code_name(code):
+  return '%s (%s)' % (getattr(code, 'co_qualname', code.co_name),
+                      os.path.basename(code.co_filename))
+
+
+class SamplingProfiler(object):
+
+  def __init__(self, interval=SAMPLE_INTERVAL_SECS):
+    self.interval = interval
+    self.samples = Counter()
+    self.sample_count = 0
+    self.frame_names = {}
+
+  def run(self, seconds):
+    own_thread = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    next_sample = time.monotonic()
+    while next_sample < deadline:
+      thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+      for thread_id, frame in sys._current_frames().items():
+        if thread_id == own_thread:
+          continue
+        stack = self._get_stack(frame)
+        stack.append(thread_names.get(thread_id, str(thread_id)))
+        self.samples[';'.join(reversed(stack))] += 1
+      self.sample_count += 1
+      # Sampled on a fixed schedule, so a slow sample doesn't skew the rest
+      next_sample += self.interval
+      time.sleep(max(next_sample - time.monotonic(), 0))
+    return self.samples
+
+  # Innermost frame first
+  def _get_stack(self, frame):
+    names = []
+    while frame is not None:
+      code = frame.f_code
+      name = self.frame_names.get(code)
+      if name is None:
+        name = self.frame_names[code] = _get_code_name(code)
+      names.append(name)
+      frame = frame.f_back
+    return names
+
+  def get_collapsed_stacks(self):
+    return ''.join('%s %d\n' % (stack, count) for stack, count in self.samples.most_common())
+
+
+def _write_profile(profiler):
+  os.makedirs(PROFILE_DIR, exist_ok=True)
+  path = os.path.join(PROFILE_DIR, 'profile-%s.txt' % datetime.now().strftime('%Y%m%d-%H%M%S'))
+  with open(path, 'w') as f:
+    f.write(profiler.get_collapsed_stacks())
+  return path
+
+
+# Profiles for the given number of seconds, then writes the stacks to PROFILE_DIR. Returns the
+# profiler, or None if another profile is already being taken.
+def profile(seconds=DEFAULT_SECS):
+  if not _running.acquire(blocking=False):
+    logging.warning('A profile is already being taken')
+    return None
+  try:
+    seconds = min(max(float(seconds), 0), MAX_SECS)
+    logging.info('Profiling for %gs' % seconds)
+    profiler = SamplingProfiler()
+    profiler.run(seconds)
+    path = _write_profile(profiler)
+    logging.info('Wrote %d samples to %s' % (profiler.sample_count, path))
+    return profiler
+  finally:
+    _running.release()
+
+
+def profile_in_background(seconds=DEFAULT_SECS):
+  thread = threading.Thread(target=profile, args=(seconds,), name='profiler', daemon=True)
+  thread.start()
+  return thread
+
+
+def _serve_profile(query):
+  profiler = profile(query.get('seconds', [DEFAULT_SECS])[0])
+  if profiler is None:
+    raise Exception('A profile is already being taken')
+  return 'text/plain', profiler.get_collapsed_stacks()
+
+
+add_route('/profile', _serve_profile)
+
+
+# Must be called from the main thread. Signals are unavailable on Windows, where only the metrics
+# endpoint can start a profile.
+def install_signal_handler(signum=getattr(signal, 'SIGUSR1', None)):
+  if signum is None:
+    return
+  # The handler runs on the main thread, so the profile itself runs on a thread of its own
+  signal.signal(signum, lambda signum, frame: profile_in_background())
@@ -0,0 +1,177 @@
+# Replays a recorded game through the normal client API, so the live path can be exercised (and
+# sped up) without a game on or a network. Recordings are directories in the format written by
+# benchmarks.record_fixtures.
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from copy import deepcopy
+from data.clock import VirtualClock
+from data.metrics import FETCH_SECONDS
+from data.nba_client import NBAClient
+from datetime import timedelta
+from dateutil import parser
+from PIL import Image, ImageDraw
+import asyncio
+import json
+import logging
+import os
+import zlib
+
+MAX_SPEED = 100
+
+# The parts of a requests.Response that PlayByPlayStore reads
+ReplayResponse = namedtuple('ReplayResponse', ['content', 'headers'])
+
+
+class GameRecording(object):
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.boxscore = self._load('boxscore.json')['game']
+    self.game_id = self.boxscore['gameId']
+    scoreboard = self._load('scoreboard.json', {'scoreboard': {'games': []}})
+    self.games = scoreboard['scoreboard']['games']
+    standings = self._load('standings.json', {'resultSets': []})
+    self.standing_rows = next(
+        (result['rowSet'] for result in standings['resultSets'] if result['name'] == 'Standings'),
+        [])
+
+    actions = self._load('playbyplay.json')['game']['actions']
+    timed = sorted(((parser.parse(action['timeActual']), action) for action in actions),
+                   key=lambda timed_action: timed_action[0])
+    self.times = [time.timestamp() for time, _ in timed]
+    self.actions = [action for _, action in timed]
+    self.tipoff = parser.parse(self.boxscore['gameTimeUTC'])
+    # Starts with the game live, as the pregame displays would use up most of a sped up replay. A
+    # negative start offset shows the pregame.
+    first_action = timed[0][0] if timed else self.tipoff
+    self.start = max(self.tipoff, first_action)
+    self.end = self.times[-1] if self.times else self.start.timestamp()
+
+  def _load(self, name, default=None):
+    path = os.path.join(self.directory, name)
+    if default is not None and not os.path.exists(path):
+      return default
+    with open(path) as f:
+      return json.load(f)
+
+  def get_actions(self, now):
+    return self.actions[:bisect_right(self.times, now)]
+
+  def is_finished(self, now):
+    return now >= self.end
+
+  # The boxscore as it would have looked at the given time
+  def get_game(self, now):
+    game = deepcopy(self.boxscore)
+    actions = self.get_actions(now)
+    if not actions:
+      game.update({
+          'gameStatus': 1,
+          'gameStatusText': self.tipoff.strftime('%I:%M %p ET'),
+          'period': 0,
+          'gameClock': '',
+      })
+      game['awayTeam']['score'] = 0
+      game['homeTeam']['score'] = 0
+      return game
+
+    latest_action = actions[-1]
+    game['period'] = latest_action['period']
+    game['gameClock'] = latest_action['clock']
+    game['awayTeam']['score'] = int(latest_action['scoreAway'])
+    game['homeTeam']['score'] = int(latest_action['scoreHome'])
+    if self.is_finished(now) and self.boxscore['gameStatus'] == 3:
+      game['gameStatus'], game['gameStatusText'] = 3, 'Final'
+    elif latest_action['actionType'] == 'period' and latest_action['subType'] == 'end':
+      game['gameStatus'] = 2
+      game['gameStatusText'] = 'Half' if game['period'] == 2 else 'End Q%d' % game['period']
+    else:
+      mins, secs = latest_action['clock'][2:].rstrip('S').split('M')
+      game['gameStatus'] = 2
+      game['gameStatusText'] = 'Q%d %d:%02d' % (game['period'], int(mins), float(secs))
+    return game
+
+  def get_games(self, now):
+    game = self.get_game(now)
+    if not any(other['gameId'] == self.game_id for other in self.games):
+      return [game] + self.games
+    return [game if other['gameId'] == self.game_id else other for other in self.games]
+
+  def get_logo(self, url):
+    path = os.path.join(self.directory, 'logos', os.path.basename(url))
+    if os.path.exists(path):
+      with Image.open(path) as img:
+        img.load()
+        return img
+    return get_placeholder_logo(url)
+
+
+class AsyncReplayClient(object):
+
+  def __init__(self, recording, clock, latency=0):
+    self.recording = recording
+    self.clock = clock
+    # Seconds each request takes, to reproduce slow responses
+    self.latency = latency
+    self.requests = Counter()
+
+  async def _request(self, endpoint):
+    self.requests[endpoint] += 1
+    with FETCH_SECONDS.time(endpoint=endpoint):
+      if self.latency:
+        await asyncio.sleep(self.latency)
+    return self.clock.time()
+
+  async def get_game(self, game_id):
+    now = await self._request('boxscore')
+    if game_id != self.recording.game_id:
+      return next(game for game in self.recording.games if game['gameId'] == game_id)
+    return self.recording.get_game(now)
+
+  async def get_games_for_today(self):
+    return self.recording.get_games(await self._request('scoreboard'))
+
+  async def get_playbyplay(self, game_id):
+    now = await self._request('playbyplay')
+    return {'gameId': game_id, 'actions': self.recording.get_actions(now)}
+
+  async def get_playbyplay_if_modified(self, game_id, etag=None, last_modified=None):
+    now = await self._request('playbyplay')
+    actions = self.recording.get_actions(now)
+    replay_etag = '"%d"' % len(actions)
+    if etag == replay_etag:
+      return None
+    content = json.dumps({'game': {'gameId': game_id, 'actions': actions}}).encode()
+    return ReplayResponse(content, {'ETag': replay_etag})
+
+  async def get_standings(self):
+    await self._request('standings')
+    return self.recording.standing_rows
+
+  async def get_image(self, url):
+    await self._request('logo')
+    return self.recording.get_logo(url)
+
+
+class ReplayClient(NBAClient):
+
+  def __init__(self, directory, speed=1, start_offset=0, latency=0):
+    if not 1 <= speed <= MAX_SPEED:
+      raise Exception('Replay speed must be between 1 and %d' % MAX_SPEED)
+    self.recording = GameRecording(directory)
+    self.clock = VirtualClock(self.recording.start + timedelta(seconds=start_offset), speed)
+    super().__init__(AsyncReplayClient(self.recording, self.clock, latency))
+    logging.info('Replaying game %s from %s at %gx' %
+                 (self.recording.game_id, self.clock.now(), speed))
+
+  def get_team_tricodes(self):
+    return [self.recording.boxscore[team]['teamTricode'] for team in ('awayTeam', 'homeTeam')]
+
+
+def get_placeholder_logo(name, size=200):
+  # A logo-sized image in a color derived from the name, for teams without a recorded logo
+  color = zlib.crc32(name.encode()) & 0xffffff
+  img = Image.new('RGBA', (size, size))
+  ImageDraw.Draw(img).ellipse((size // 10, size // 10, size * 9 // 10, size * 9 // 10),
+                              fill=(color >> 16, (color >> 8) & 0xff, color & 0xff, 255))
+  return img
@@ -0,0 +1,78 @@
+# Keeps the latest response for each cached endpoint in SQLite, so that after a restart the board
+# can show the last known data straight away and revalidate it in the background, instead of
+# waiting on a run of rate-limited requests.
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+STORE_PATH = os.path.join('cache', 'responses.sqlite3')
+# Bump whenever the cached records change shape, so rows written by older code are ignored
+SCHEMA_VERSION = 1
+# Rows this old are of no use to a restart
+MAX_ROW_AGE = 7 * 24 * 60 * 60
+
+
+class ResponseStore(object):
+
+  def __init__(self, path=STORE_PATH):
+    if os.path.dirname(path):
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+    self.path = path
+    self.lock = threading.Lock()
+    # Writes come from whichever thread fetched the response
+    self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    self.connection.execute('PRAGMA journal_mode=WAL')
+    self.connection.execute('PRAGMA synchronous=NORMAL')
+    self.connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                            'cache TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL, '
+                            'fetched_at REAL NOT NULL, value BLOB NOT NULL, '
+                            'PRIMARY KEY (cache, key))')
+    self.prune()
+
+  def load(self, cache, key):
+    with self.lock:
+      row = self.connection.execute(
+          'SELECT fetched_at, value FROM responses WHERE cache = ? AND key = ? AND version = ?',
+          (cache, repr(key), SCHEMA_VERSION)).fetchone()
+    if row is None:
+      return None
+    try:
+      return pickle.loads(row[1]), row[0]
+    except Exception as e:
+      logging.debug('Could not read stored %s %s: %s' % (cache, key, e))
+      return None
+
+  def save(self, cache, key, value, fetched_at=None):
+    try:
+      blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+      logging.debug('Could not store %s %s: %s' % (cache, key, e))
+      return
+    with self.lock:
+      self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                              (cache, repr(key), SCHEMA_VERSION, fetched_at or time.time(), blob))
+
+  def prune(self, max_age=MAX_ROW_AGE):
+    with self.lock:
+      self.connection.execute('DELETE FROM responses WHERE fetched_at < ? OR version != ?',
+                              (time.time() - max_age, SCHEMA_VERSION))
+
+  def close(self):
+    with self.lock:
+      self.connection.close()
+
+
+# No store unless one is set, so replays and benchmarks never read or write real responses
+_store = None
+
+
+def get_response_store():
+  return _store
+
+
+def set_response_store(store):
+  global _store
+  _store = store
@@ -0,0 +1,51 @@
+# All team lookups, indexed once at import. nba_api's own lookups scan the team list with a regex
+# on every call and build a new dict for every match.
+from nba_api.stats.static import teams as static_teams
+import re
+
+# One record per team, shared by every lookup
+TEAMS = tuple(static_teams.get_teams())
+
+# The order find_team tries these in
+_SEARCH_FIELDS = ('abbreviation', 'full_name', 'nickname', 'city', 'state')
+
+
+def _build_index(field):
+  index = {}
+  for team in TEAMS:
+    # First team wins, as it would in a scan, e.g. the Clippers for Los Angeles
+    index.setdefault(str(team[field]).casefold(), team)
+  return index
+
+
+_TEAMS_BY_ID = {str(team['id']): team for team in TEAMS}
+_INDEXES = {field: _build_index(field) for field in _SEARCH_FIELDS}
+
+
+def get_teams():
+  return TEAMS
+
+
+def get_team_by_id(team_id):
+  return _TEAMS_BY_ID.get(str(team_id))
+
+
+def get_team_by_abbreviation(abbreviation):
+  return _INDEXES['abbreviation'].get(abbreviation.casefold())
+
+
+def find_team(keyword):
+  if not keyword:
+    return None
+
+  key = keyword.casefold()
+  for field in _SEARCH_FIELDS:
+    if key in _INDEXES[field]:
+      return _INDEXES[field][key]
+
+  # Partial names (e.g. "Cavalier") still need a scan, but only ever come from the config
+  for field in _SEARCH_FIELDS[1:]:
+    for team in TEAMS:
+      if re.search(re.escape(keyword), str(team[field]), flags=re.I):
+        return team
+  return None
@@ -0,0 +1,228 @@
+# Every image asset the displays use, prepared once at the sizes they are drawn at (including each
+# angle the basketball is drawn at during a BallTransition) and kept in a single pack file. The
+# pack is memory mapped, so the displays get ready-to-paste images and arrays without any file
+# reads or resampling, and it is rebuilt whenever an asset changes.
+from functools import lru_cache
+from PIL import Image, ImageOps
+import json
+import logging
+import mmap
+import numpy as np
+import os
+import struct
+import threading
+
+ASSET_DIR = 'assets'
+PACK_PATH = os.path.join('cache', 'assets.pack')
+# Bump whenever the variants below change, so older packs are rebuilt
+PACK_VERSION = 1
+PACK_MAGIC = b'NBAPACK1'
+# Modes PIL can wrap around the pack's memory rather than copying
+SHARED_MODES = ('L', 'RGBA')
+
+# The sizes the displays draw these at, on a 64x32 matrix
+MATRIX_SIZE = (64, 32)
+BALL_SIZE = 32
+BALL_TRANSITION_DURATION = 15
+
+SOURCE_FILES = ('nba_logo.png', 'basketball.png', 'vmask1.png', 'vmask2.png', 'hmask1.png',
+                'hmask2.png')
+
+
+def get_ball_angles(duration):
+  # The angle BallTransition draws the ball at on each frame
+  return {i: -360 // duration * i for i in range(duration, -duration // 2, -1)}
+
+
+def render_nba_logo(size=MATRIX_SIZE):
+  bg_img = Image.new('RGB', size)
+  with Image.open(os.path.join(ASSET_DIR, 'nba_logo.png')) as logo_img:
+    logo_img = logo_img.crop(logo_img.getbbox())
+    logo_img = ImageOps.pad(logo_img, size, method=Image.HAMMING)
+    bg_img.paste(logo_img)
+    return bg_img
+
+
+def render_basketball(size=BALL_SIZE):
+  with Image.open(os.path.join(ASSET_DIR, 'basketball.png')) as basketball_img:
+    return basketball_img.resize((size, size), resample=Image.HAMMING)
+
+
+def render_mask(name):
+  with Image.open(os.path.join(ASSET_DIR, '%s.png' % name)) as mask:
+    return mask.getchannel('A')
+
+
+def _get_ball_variant_name(size, angle):
+  return 'basketball/%d/%d' % (size, angle)
+
+
+def _render_variants():
+  variants = {'nba_logo': render_nba_logo()}
+  basketball_img = render_basketball(BALL_SIZE)
+  variants['basketball/%d' % BALL_SIZE] = basketball_img
+  for angle in set(get_ball_angles(BALL_TRANSITION_DURATION).values()):
+    variants[_get_ball_variant_name(BALL_SIZE, angle)] = basketball_img.rotate(angle)
+  for name in ('vmask1', 'vmask2', 'hmask1', 'hmask2'):
+    variants['mask/' + name] = render_mask(name)
+  return variants
+
+
+def _get_source_signature():
+  signature = {'version': PACK_VERSION}
+  for name in SOURCE_FILES:
+    stat = os.stat(os.path.join(ASSET_DIR, name))
+    signature[name] = [stat.st_size, stat.st_mtime_ns]
+  return signature
+
+
+def build_pack(signature):
+  # Layout: magic, header length, JSON header (signature and an index of every variant), then the
+  # raw pixels of each variant back to back
+  index, chunks, offset = {}, [], 0
+  for name, img in _render_variants().items():
+    data = img.tobytes()
+    index[name] = [img.mode, img.width, img.height, offset, len(data)]
+    chunks.append(data)
+    offset += len(data)
+  header = json.dumps({'signature': signature, 'index': index}).encode()
+  return b''.join([PACK_MAGIC, struct.pack('<I', len(header)), header] + chunks)
+
+
+class AssetPack(object):
+
+  def __init__(self, path=PACK_PATH):
+    self.path = path
+    self.buffer = self._open()
+    header_length, = struct.unpack_from('<I', self.buffer, len(PACK_MAGIC))
+    header_start = len(PACK_MAGIC) + 4
+    header = json.loads(bytes(self.buffer[header_start:header_start + header_length]))
+    self.index = header['index']
+    self.data_start = header_start + header_length
+    self.images = {}
+    self.arrays = {}
+    self.lock = threading.Lock()
+
+  def _open(self):
+    signature = _get_source_signature()
+    buffer = self._map()
+    if buffer is not None and self._read_signature(buffer) == signature:
+      return buffer
+
+    pack = build_pack(signature)
+    try:
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      tmp_path = self.path + '.tmp'
+      with open(tmp_path, 'wb') as f:
+        f.write(pack)
+      os.replace(tmp_path, self.path)
+    except OSError as e:
+      # Still works from memory, it just gets rebuilt on every start
+      logging.debug('Could not write asset pack: %s' % e)
+      return pack
+    return self._map() or pack
+
+  def _map(self):
+    try:
+      with open(self.path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+      return None
+
+  def _read_signature(self, buffer):
+    try:
+      if buffer[:len(PACK_MAGIC)] != PACK_MAGIC:
+        return None
+      header_length, = struct.unpack_from('<I', buffer, len(PACK_MAGIC))
+      header_start = len(PACK_MAGIC) + 4
+      return json.loads(bytes(buffer[header_start:header_start + header_length]))['signature']
+    except (struct.error, ValueError, KeyError):
+      return None
+
+  def __contains__(self, name):
+    return name in self.index
+
+  # A read-only view of the variant's pixels, shaped (height, width[, channels])
+  def get_array(self, name):
+    with self.lock:
+      if name not in self.arrays:
+        mode, width, height, offset, length = self.index[name]
+        array = np.frombuffer(self.buffer, dtype=np.uint8, count=length,
+                              offset=self.data_start + offset)
+        channels = Image.getmodebands(mode)
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        self.arrays[name] = array.reshape(shape)
+      return self.arrays[name]
+
+  # Images share the pack's memory where PIL allows it (copied once otherwise). Shared images are
+  # read only, so anything that draws on one gets a copy.
+  def get_image(self, name):
+    with self.lock:
+      if name not in self.images:
+        mode, width, height, offset, length = self.index[name]
+        start = self.data_start + offset
+        data = memoryview(self.buffer)[start:start + length]
+        if mode in SHARED_MODES:
+          img = Image.frombuffer(mode, (width, height), data, 'raw', mode, 0, 1)
+        else:
+          img = Image.frombytes(mode, (width, height), bytes(data))
+        self.images[name] = img
+      return self.images[name]
+
+
+_pack = None
+_pack_lock = threading.Lock()
+
+
+def get_asset_pack():
+  global _pack
+  with _pack_lock:
+    if _pack is None:
+      _pack = AssetPack()
+    return _pack
+
+
+def get_nba_logo():
+  # A copy, as it becomes a display's image and those may be drawn on
+  return get_asset_pack().get_image('nba_logo').copy()
+
+
+@lru_cache(maxsize=8)
+def get_basketball_img(size=BALL_SIZE):
+  name = 'basketball/%d' % size
+  pack = get_asset_pack()
+  if name in pack:
+    return pack.get_image(name)
+  return render_basketball(size)
+
+
+# The ball at each frame of a BallTransition, keyed by frame index
+@lru_cache(maxsize=4)
+def get_basketball_rotations(size=BALL_SIZE, duration=BALL_TRANSITION_DURATION):
+  pack = get_asset_pack()
+  basketball_img = get_basketball_img(size)
+  rotations = {}
+  for i, angle in get_ball_angles(duration).items():
+    name = _get_ball_variant_name(size, angle)
+    rotations[i] = pack.get_image(name) if name in pack else basketball_img.rotate(angle)
+  return rotations
+
+
+# The same as arrays, which come straight from the pack without a copy
+@lru_cache(maxsize=4)
+def get_basketball_rotation_arrays(size=BALL_SIZE, duration=BALL_TRANSITION_DURATION):
+  pack = get_asset_pack()
+  images = get_basketball_rotations(size, duration)
+  rotations = {}
+  for i, angle in get_ball_angles(duration).items():
+    name = _get_ball_variant_name(size, angle)
+    rotations[i] = pack.get_array(name) if name in pack else np.asarray(images[i])
+  return rotations
+
+
+def get_mask(name):
+  return get_asset_pack().get_image('mask/' + name)
+
+
+def get_mask_array(name):
+  return get_asset_pack().get_array('mask/' + name)
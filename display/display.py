@@ -1,49 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from data.metrics import (FRAMES, PRESENT_SECONDS, RENDER_SECONDS, TRANSITION_FRAME_SECONDS,
+                          heartbeat)
 from datetime import datetime, timedelta, timezone
-from PIL import Image, ImageTk
+from PIL import Image
 import logging
+import numpy as np
+import queue
 import sys
+import threading
 import time
 import traceback
 import random
 
+# How long a cold boot may take to show game data before it is logged as too slow, with some room
+# for slower Pis
+FIRST_FRAME_BUDGET_SECS = 15
+# The next displays are worked out while the last one shows, which can take hours for a live game.
+# Older than this, they are worked out again, as is the scoreboard they came from.
+MAX_PREFETCHED_DISPLAYS_AGE_SECS = 60
+
 
 class DisplayManager(object):
   _SECONDS_IN_DAY = 86400
 
-  def __init__(self, width=64, height=32):
+  def __init__(self, width=64, height=32, started_at=None):
     self.width = width
     self.height = height
+    # For the time to the first frame that shows game data, which is what a restart is judged by
+    self.started_at = started_at or time.monotonic()
+    self.first_frame_secs = None
     self.scheduled_actions = []
     self.start_time, self.stop_time = None, None
     self.start_day, self.stop_day = None, None
     self.time_zone = timezone.utc
     self.rgb_matrix = self.create_rgb_matrix()
-    self.debug_label = self.create_debug_label()
+    self.sink = self.create_sink(self.rgb_matrix)
     self.transitions = []
 
   def start(self):
-    while True:
-      self._sleep_if_necessary()
-      self._run_scheduled_actions()
-      displays_to_show = self.get_displays_to_show()
-      for index, display in enumerate(displays_to_show):
-        try:
-          display.show(self.rgb_matrix, self.debug_label)
-          if self.transitions and len(displays_to_show) > 1 and index != len(displays_to_show) - 1:
-            self.show_transition(
-                display.current_image,
-                displays_to_show[index + 1].get_pre_image(self.rgb_matrix, self.debug_label))
-        except KeyboardInterrupt:
-          sys.exit()
-        except Exception as e:
-          traceback.print_exc()
-          logging.debug(e)
+    # Displays are prepared (data fetched, pre-image rendered) on a worker thread while the
+    # previous display is on screen
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='display-prepare')
+    next_displays = None
+    try:
+      while True:
+        self._sleep_if_necessary()
+        self._run_scheduled_actions()
+        displays_to_show = None
+        if next_displays is not None:
+          try:
+            displays_to_show, fetched_at = next_displays.result()
+            if time.monotonic() - fetched_at > MAX_PREFETCHED_DISPLAYS_AGE_SECS:
+              displays_to_show = None
+          except Exception as e:
+            traceback.print_exc()
+            logging.debug(e)
+        if displays_to_show is None:
+          displays_to_show = self.get_displays_to_show()
+        next_displays = self._show_displays(displays_to_show, executor)
+    finally:
+      # However the loop is left, so recordings are written out
+      self.sink.close()
+
+  def _show_displays(self, displays_to_show, executor):
+    next_displays = None
+    prepared = [None] * len(displays_to_show)
+    if displays_to_show:
+      prepared[0] = executor.submit(self._prepare, displays_to_show[0])
+
+    for index, display in enumerate(displays_to_show):
+      next_display = displays_to_show[index + 1] if index + 1 < len(displays_to_show) else None
+      try:
+        if prepared[index]:
+          prepared[index].result()
+        if next_display:
+          prepared[index + 1] = executor.submit(self._prepare, next_display)
+        else:
+          next_displays = executor.submit(self._prefetch_displays)
+
+        if self.first_frame_secs is None and display.shows_data:
+          self.first_frame_secs = time.monotonic() - self.started_at
+          logging.info('First meaningful frame %.2fs after start' % self.first_frame_secs)
+          if self.first_frame_secs > FIRST_FRAME_BUDGET_SECS:
+            logging.warning('Startup took longer than its %ds budget' % FIRST_FRAME_BUDGET_SECS)
+        display.show(self.rgb_matrix, self.sink)
+        logging.debug('%s: %s' % (type(display).__name__, display.pacer.get_stats()))
+        if self.transitions and next_display:
+          prepared[index + 1].result()
+          self.show_transition(display.current_image,
+                               next_display.get_prepared_image(self.rgb_matrix, self.sink))
+      except KeyboardInterrupt:
+        sys.exit()
+      except Exception as e:
+        traceback.print_exc()
+        logging.debug(e)
+    return next_displays
+
+  def _prefetch_displays(self):
+    return self.get_displays_to_show(), time.monotonic()
+
+  def _prepare(self, display):
+    with RENDER_SECONDS.time(display=type(display).__name__):
+      return display.prepare(self.rgb_matrix)
 
   def create_rgb_matrix(self):
     raise NotImplementedError("create_rgb_matrix must be implemented by the subclass")
 
-  def create_debug_label(self):
-    raise NotImplementedError("create_debug_label must be implemented by the subclass")
+  # Where frames go, see display.sinks
+  def create_sink(self, matrix):
+    raise NotImplementedError("create_sink must be implemented by the subclass")
 
   def get_displays_to_show():
     raise NotImplementedError("get_displays_to_show must be implemented by the subclass")
@@ -120,73 +185,193 @@ class DisplayManager(object):
     else:
       transition_class = self.transitions[transition_num]
       transition = transition_class(start_img, end_img)
-    transition.show(self.rgb_matrix, self.debug_label)
+    transition.show(self.rgb_matrix, self.sink)
+
+
+# How far past its deadline a frame can be shown before it counts as late
+LATE_FRAME_SECS = 0.005
+# How often the sink gets a chance to do housekeeping while a frame is held
+IDLE_INTERVAL_SECS = 0.1
+
+
+class FramePacer(object):
+
+  def __init__(self, realtime=True):
+    # Without realtime, frames are only accounted for, never waited on (e.g. for benchmarks)
+    self.realtime = realtime
+    self.deadline = None
+    self.started, self.finished = None, None
+    self.presented = 0
+    self.late = 0
+    self.dropped = 0
+    self._dropped_last = False
+
+  # Frames are scheduled against absolute deadlines on the monotonic clock, so the time spent
+  # rendering a frame comes out of its own slot instead of being added on top of it. Returns
+  # whether the frame should be presented; a droppable frame whose whole slot has already passed
+  # is skipped, but never two in a row so that a slow renderer still makes progress.
+  def begin_frame(self, duration, droppable=False):
+    now = time.monotonic()
+    if self.deadline is None:
+      self.deadline = now
+      self.started = now
+
+    lateness = now - self.deadline
+    if droppable and lateness > duration and not self._dropped_last:
+      self.dropped += 1
+      FRAMES.inc(result='dropped')
+      self.deadline += duration
+      self._dropped_last = True
+      return False
+    self._dropped_last = False
+    if lateness > LATE_FRAME_SECS:
+      self.late += 1
+      FRAMES.inc(result='late')
+      if lateness > duration:
+        # Too far behind to catch up (e.g. something else was shown in between), so start over.
+        # Animation frames don't wait out their slot, the next frame is already due.
+        self.deadline = now - duration if droppable else now
+    self.presented += 1
+    FRAMES.inc(result='presented')
+    return True
+
+  def end_frame(self, duration, sink):
+    self.deadline += duration
+    while self.realtime:
+      remaining = self.deadline - time.monotonic()
+      if remaining <= 0:
+        break
+      time.sleep(min(remaining, IDLE_INTERVAL_SECS))
+      sink.idle()
+    self.finished = max(time.monotonic(), self.deadline) if self.realtime else self.deadline
+
+  def reset(self):
+    self.deadline = None
+    self._dropped_last = False
+
+  def get_stats(self):
+    elapsed = (self.finished - self.started) if self.started is not None else 0
+    return {
+        'fps': self.presented / elapsed if elapsed > 0 else None,
+        'presented': self.presented,
+        'late': self.late,
+        'dropped': self.dropped,
+    }
 
 
 class Display(object):
+  # Shared by every display unless overridden, e.g. FramePacer(realtime=False) to render as fast
+  # as possible
+  pacer_factory = FramePacer
+  # False for displays that don't depend on any data, like the screensaver
+  shows_data = True
 
   def __init__(self):
-    pass
+    self.prepared_image = None
+    self.pacer = self.pacer_factory()
 
-  def get_pre_image(self, matrix, debug_label):
+  def get_pre_image(self, matrix, sink):
     raise NotImplementedError("Subclasses must implement get_pre_image()")
 
-  def show(self, matrix, debug_label):
-    raise NotImplementedError("Subclasses must implement show()")
-
-  def _update(self, debug_label):
-    debug_label.master.update_idletasks()
-    debug_label.master.update()
+  # Fetches whatever the display needs and renders its pre-image ahead of time. This runs on a
+  # worker thread, so it must not touch the sink.
+  def prepare(self, matrix):
+    self.prepared_image = self.get_pre_image(matrix, None)
+    return self.prepared_image
 
-  def _debug_image(self, image, debug_label):
-    # image.save('assets/testing/%d.png' % time.time())
-    big_img = image.resize((image.width * 10, image.height * 10), resample=Image.NONE)
-    photo = ImageTk.PhotoImage(big_img)
-    debug_label.config(image=photo)
-    debug_label.image = photo  # keep a reference
-    debug_label.pack()
+  # The pre-image is shared by the transition into the display and the display itself
+  def get_prepared_image(self, matrix, sink):
+    if self.prepared_image is None:
+      return self.prepare(matrix)
+    return self.prepared_image
 
-    self._update(debug_label)
+  def show(self, matrix, sink):
+    raise NotImplementedError("Subclasses must implement show()")
 
-  def _display_image(self, image, display_secs, matrix, debug_label):
+  # Shows the image until display_secs after the previous image's slot ended. Returns False if
+  # the image was dropped for being too late.
+  def _display_image(self, image, display_secs, matrix, sink, droppable=False):
+    if not self.pacer.begin_frame(display_secs, droppable):
+      return False
     self.current_image = image
-    self._debug_image(image, debug_label)
-
-    display_full_secs = int(display_secs // 1)
-    display_part_secs = display_secs - display_full_secs
-
-    for _ in range(0, display_full_secs):
-      for _ in range(10):
-        time.sleep(0.1)
-        self._update(debug_label)
-    time.sleep(display_part_secs)
-    self._update(debug_label)
+    with PRESENT_SECONDS.time():
+      sink.present(image)
+    heartbeat('display')
+    self.pacer.end_frame(display_secs, sink)
+    return True
 
 
 class Animation(Display):
 
-  def __init__(self, framerate=30):
+  def __init__(self, framerate=30, streaming=True, prefetch=2):
     super().__init__()
     self.framerate = framerate
+    # When streaming, frames are rendered as they are shown instead of all up front. Frames that
+    # have already been rendered (e.g. the pre-image) are kept in self.frames.
+    self.streaming = streaming
+    self.prefetch = prefetch
     self.frames = list()
-
-  def get_pre_image(self, matrix, debug_label):
+    self.post_image = None
+    # Streamed frames aren't kept, so once shown the animation ends on the last frame it yielded
+    self.last_frame = None
+    self._frame_sources = list()
+
+  def get_pre_image(self, matrix, sink):
+    if not self.frames:
+      self._render_next_frame()
     return self.frames[0]
 
-  def get_post_image(self, matrix, debug_label):
+  def get_post_image(self, matrix, sink):
+    if self.post_image is not None:
+      return self.post_image
+    if self.last_frame is not None:
+      return self.last_frame
+    while self._frame_sources:
+      self._render_next_frame()
     return self.frames[-1]
 
-  def show(self, matrix, debug_label):
-    if len(self.frames) == 0:
+  def show(self, matrix, sink):
+    frames = self.iter_frames()
+    if self.streaming and self.prefetch:
+      frames = prefetch_frames(frames, self.prefetch)
+
+    self.pacer.reset()
+    frame = None
+    for frame in frames:
+      shown = self._display_image(frame, 1 / self.framerate, matrix, sink, droppable=True)
+    if frame is None:
       raise NotImplementedError("Subclasses must define at least one frame")
-    for frame in self.frames:
-      self._display_image(frame, 1 / self.framerate, matrix, debug_label)
+    if not shown:
+      # Always end on the last frame, even when running behind
+      self._display_image(frame, 0, matrix, sink)
+    logging.debug('%s: %s' % (type(self).__name__, self.pacer.get_stats()))
+
+  def iter_frames(self):
+    for frame in self._iter_frames():
+      self.last_frame = frame
+      yield frame
+
+  def _iter_frames(self):
+    yield from self.frames
+    while self._frame_sources:
+      yield from self._frame_sources.pop(0)
 
   def add_frame(self, frame):
-    self.frames.append(frame)
+    self.add_frames([frame])
 
   def add_frames(self, frames):
-    self.frames.extend(list(frames))
+    if self.streaming:
+      self._frame_sources.append(iter(frames))
+    else:
+      self.frames.extend(list(frames))
+
+  def _render_next_frame(self):
+    while self._frame_sources:
+      frame = next(self._frame_sources[0], None)
+      if frame is not None:
+        self.frames.append(frame)
+        return
+      self._frame_sources.pop(0)
 
 
 class Transition(Animation):
@@ -195,7 +380,136 @@ class Transition(Animation):
     super().__init__(framerate=framerate)
     self.start_img = start_img
     self.end_img = end_img
-    self.add_frames(self.get_transition_frames())
+    self.post_image = end_img
+    self.add_frames(time_frames(self.get_transition_frames(), type(self).__name__))
+
+  def get_transition_frames(self):
+    raise NotImplementedError("Subclasses must implement get_transition_frames()")
+
+
+# Times how long each frame takes to generate, as it is asked for
+def time_frames(frames, transition):
+  frames = iter(frames)
+  while True:
+    started = time.perf_counter()
+    frame = next(frames, None)
+    if frame is None:
+      return
+    TRANSITION_FRAME_SECONDS.observe(time.perf_counter() - started, transition=transition)
+    yield frame
+
+
+_END_OF_FRAMES = object()
+
+
+def prefetch_frames(frames, size=2):
+  # Renders frames on a background thread, staying at most `size` frames ahead of the consumer
+  frame_queue = queue.Queue(maxsize=size)
+  stopped = threading.Event()
+
+  def put(item):
+    while not stopped.is_set():
+      try:
+        frame_queue.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def produce():
+    try:
+      for frame in frames:
+        if not put((frame, None)):
+          return
+      put((_END_OF_FRAMES, None))
+    except Exception as e:
+      put((_END_OF_FRAMES, e))
+
+  producer = threading.Thread(target=produce, daemon=True)
+  producer.start()
+  try:
+    while True:
+      frame, error = frame_queue.get()
+      if frame is _END_OF_FRAMES:
+        if error is not None:
+          raise error
+        return
+      yield frame
+  finally:
+    stopped.set()
+
+
+class ArrayTransition(Transition):
+  # Set to False to build frames with PIL paste operations instead of NumPy array operations
+  use_arrays = True
 
   def get_transition_frames(self):
-    raise NotImplementedError("Subclasses must implement get_transition_frames()")
\ No newline at end of file
+    if not self.use_arrays:
+      yield from self.get_pil_transition_frames()
+      return
+
+    start = as_rgba_array(self.start_img)
+    end = as_rgba_array(self.end_img)
+    frames = np.zeros((self.get_frame_count(),) + start.shape, dtype=np.uint8)
+    self.fill_frame_stack(frames, start, end)
+    size = (start.shape[1], start.shape[0])
+    # The frames share memory with the frame stack rather than copying it
+    for frame in frames:
+      yield Image.frombuffer('RGBA', size, frame, 'raw', 'RGBA', 0, 1)
+
+  def get_frame_count(self):
+    raise NotImplementedError("Subclasses must implement get_frame_count()")
+
+  def fill_frame_stack(self, frames, start, end):
+    raise NotImplementedError("Subclasses must implement fill_frame_stack()")
+
+  def get_pil_transition_frames(self):
+    raise NotImplementedError("Subclasses must implement get_pil_transition_frames()")
+
+
+def as_rgba_array(img):
+  if img.mode != 'RGBA':
+    img = img.convert('RGBA')
+  return np.asarray(img)
+
+
+def _div255(values):
+  # Same rounding PIL uses when blending with a mask
+  values += 128
+  values += values >> 8
+  values >>= 8
+  return values
+
+
+def get_select_mask(mask):
+  # Binary masks can use a masked select instead of a blend
+  mask = np.asarray(mask)
+  if np.isin(mask, (0, 255)).all():
+    return mask == 255
+  return mask
+
+
+def blend_arrays(base, overlay, weights, out):
+  weights = weights.astype(np.uint32)
+  out[...] = _div255(base * (255 - weights) + overlay * weights)
+
+
+def paste_array(dest, src, box=(0, 0), mask=None):
+  x, y = box
+  left, top = max(x, 0), max(y, 0)
+  right, bottom = min(x + src.shape[1], dest.shape[1]), min(y + src.shape[0], dest.shape[0])
+  if left >= right or top >= bottom:
+    return
+
+  src = src[top - y:bottom - y, left - x:right - x]
+  if mask is None:
+    dest[top:bottom, left:right] = src
+  elif mask.dtype == bool:
+    # Select whole RGBA pixels at once by viewing them as 32-bit values
+    mask = mask[top - y:bottom - y, left - x:right - x]
+    np.copyto(dest[top:bottom, left:right].view(np.uint32)[..., 0],
+              src.view(np.uint32)[..., 0],
+              where=mask)
+  else:
+    mask = mask[top - y:bottom - y, left - x:right - x, np.newaxis]
+    blend_arrays(dest[top:bottom, left:right], src, mask, out=dest[top:bottom, left:right])
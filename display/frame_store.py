@@ -0,0 +1,104 @@
+# Compact storage for animation frames that are kept around, e.g. by the render cache. A stack of
+# frames is held in one contiguous buffer: as palette indices (a byte per pixel) when the frames
+# use at most 256 colors between them, which the mostly black scoreboard frames nearly always do,
+# or as RGB otherwise. Alpha is dropped, as the matrix ignores it anyway.
+#
+# Frames are decoded into a small ring of reused RGB images, so playing a stack back allocates
+# nothing per frame and hands the sink the mode it needs. A decoded frame is only valid until the
+# ring comes back round to it. Copy it to keep it any longer.
+from data.metrics import collected
+from PIL import Image
+import numpy as np
+import threading
+import weakref
+
+# Enough for the frame on screen, the frames prefetched ahead of it and the one being decoded
+RING_SIZE = 4
+MAX_PALETTE_SIZE = 256
+
+_stacks = weakref.WeakSet()
+_stacks_lock = threading.Lock()
+
+
+def _as_rgb_array(frame):
+  if isinstance(frame, Image.Image):
+    if frame.mode != 'RGB':
+      frame = frame.convert('RGB')
+    return np.asarray(frame)
+  return np.asarray(frame)[..., :3]
+
+
+class FrameStack(object):
+
+  def __init__(self, frames):
+    frames = [_as_rgb_array(frame) for frame in frames]
+    if not frames:
+      raise Exception('A frame stack needs at least one frame')
+    pixels = np.stack(frames)
+    self.height, self.width = pixels.shape[1:3]
+
+    # Colors packed into one integer each, to find the palette in a single pass
+    packed = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | \
+        pixels[..., 2]
+    colors, indices = np.unique(packed, return_inverse=True)
+    if len(colors) <= MAX_PALETTE_SIZE:
+      self.palette = np.stack([(colors >> 16) & 0xff, (colors >> 8) & 0xff, colors & 0xff],
+                              axis=1).astype(np.uint8)
+      self.pixels = indices.astype(np.uint8).reshape(packed.shape)
+    else:
+      self.palette = None
+      self.pixels = np.ascontiguousarray(pixels)
+
+    self._ring = None
+    self._scratch = None
+    self._next = 0
+    self.lock = threading.Lock()
+    with _stacks_lock:
+      _stacks.add(self)
+
+  def __len__(self):
+    return len(self.pixels)
+
+  def __iter__(self):
+    for i in range(len(self)):
+      yield self.decode(i)
+
+  @property
+  def nbytes(self):
+    return self.pixels.nbytes + (self.palette.nbytes if self.palette is not None else 0)
+
+  # Decodes a frame into the next image of the ring
+  def decode(self, i):
+    with self.lock:
+      if self._ring is None:
+        self._ring = [Image.new('RGB', (self.width, self.height)) for _ in range(RING_SIZE)]
+        if self.palette is not None:
+          self._scratch = np.empty((self.height, self.width, 3), dtype=np.uint8)
+      image = self._ring[self._next]
+      self._next = (self._next + 1) % RING_SIZE
+      if self.palette is not None:
+        np.take(self.palette, self.pixels[i], axis=0, out=self._scratch)
+        image.frombytes(self._scratch)
+      else:
+        image.frombytes(self.pixels[i])
+      return image
+
+  # Decodes a frame into an image of its own
+  def get_image(self, i):
+    return self.decode(i).copy()
+
+
+def get_frame_store_stats():
+  with _stacks_lock:
+    stacks = list(_stacks)
+  return {
+      'stacks': len(stacks),
+      'frames': sum(len(stack) for stack in stacks),
+      'bytes': sum(stack.nbytes for stack in stacks),
+      'paletted': sum(1 for stack in stacks if stack.palette is not None),
+  }
+
+
+collected('frame_store', 'Frames kept in frame stacks (stacks, frames, bytes, paletted)', 'gauge',
+          ['measure'],
+          lambda: {(measure,): value for measure, value in get_frame_store_stats().items()})
@@ -1,5 +1,22 @@
-from data.nba_data import *
-from display.display import Animation, Display, DisplayManager, Transition
+from data.cache import get_cache_stats
+from data.clock import get_clock
+from data.live_poller import LivePoller
+from data.metrics import watch_cache, watch_thread
+from data.nba_data import (FAVORITE_TEAM_NAMES, game_has_ended, game_has_started, game_is_live,
+                           get_game_clock_text, get_game_datetime, get_games_for_today,
+                           get_important_games, get_score_from_game, get_standings, get_team_logo,
+                           get_teams_from_game, prewarm_team_logos)
+from data.polling import get_poll_scheduler
+from datetime import timedelta
+from display.assets import (get_basketball_img, get_basketball_rotation_arrays,
+                            get_basketball_rotations, get_mask, get_mask_array, get_nba_logo)
+from display.display import (Animation, ArrayTransition, Display, DisplayManager, Transition,
+                             blend_arrays, get_select_mask, paste_array)
+from display.frame_store import FrameStack, get_frame_store_stats
+from display.render_cache import get_render_cache
+from display.sinks import (FakeRGBMatrix, MultiSink, NullSink, RecorderSink, RGBMatrixSink,
+                           TkPreviewSink)
+from functools import lru_cache, partial
 from PIL import Image, ImageColor, ImageDraw, ImageFont
 import config
 import logging
@@ -8,23 +25,18 @@ import numpy as np
 import os
 import sys
 import threading
-import tkinter as tk
+import time
 import traceback
 import random
 
-if os.name == 'nt':
-
-  class RGBMatrix:
-
-    def __init__(self, options=None):
-      self.options = options
-      self.width = 64
-      self.height = 32
+try:
+  from rgbmatrix import RGBMatrix, RGBMatrixOptions
+except ImportError:
+  # Not on a Pi, frames sent to the matrix go nowhere but can still be previewed or recorded
+  RGBMatrix = FakeRGBMatrix
 
   class RGBMatrixOptions:
     pass
-else:
-  from rgbmatrix import RGBMatrix, RGBMatrixOptions
 
 
 class ImagePlacement:
@@ -59,41 +71,101 @@ class ImagePlacement:
     return ImagePlacement(self.width, self.height, offset=offset)
 
 
-FIVE_PX_FONT = ImageFont.truetype('assets/5px font.ttf', size=5)
-SEVEN_PX_FONT = ImageFont.truetype('assets/7px font.ttf', size=12)
-SEVEN_PX_FONT_BOLD = ImageFont.truetype('assets/7px font bold.ttf', size=12)
+# Fonts are loaded on first use. Each getter always returns the same font object, which the text
+# sprite cache relies on.
+@lru_cache(maxsize=None)
+def _get_font(path, size):
+  return ImageFont.truetype(path, size=size)
+
+
+def get_five_px_font():
+  return _get_font('assets/5px font.ttf', 5)
+
+
+def get_seven_px_font():
+  return _get_font('assets/7px font.ttf', 12)
+
+
+def get_seven_px_font_bold():
+  return _get_font('assets/7px font bold.ttf', 12)
 
 
-def draw_text(img, *args, **kwargs):
+TEXT_SPRITE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=TEXT_SPRITE_CACHE_SIZE)
+def _get_text_sprite(text, font=None, fill=None, spacing=4, align='left', anchor=None):
+  kwargs = dict(font=font, fill=fill, spacing=spacing, align=align, anchor=anchor)
+
+  # Size a canvas that fits the text, with a pixel of margin in case the ink overhangs the bbox
+  left, top, right, bottom = ImageDraw.Draw(Image.new('RGB', (1, 1))).textbbox(
+      (0, 0), text, font=font, spacing=spacing, align=align, anchor=anchor)
+  left, top = math.floor(left), math.floor(top)
+  origin = (1 - left, 1 - top)
+  size = (math.ceil(right) - left + 2, math.ceil(bottom) - top + 2)
+
   # Get the bounding box for the text
-  black_bg = Image.new('RGB', (img.width, img.height))
+  black_bg = Image.new('RGB', size)
   black_draw = ImageDraw.Draw(black_bg)
-  black_draw.text(*args, **kwargs)
+  black_draw.text(origin, text, **kwargs)
   bounding_box = black_bg.getbbox()
+  if bounding_box is None:
+    return None
 
   # Make a translucent gray background that is the same size as and overlaid by the text
-  gray_bg = Image.new('RGBA', (img.width, img.height), color='#00000080')
+  gray_bg = Image.new('RGBA', size, color='#00000080')
   gray_draw = ImageDraw.Draw(gray_bg)
-  gray_draw.text(*args, **kwargs)
+  gray_draw.text(origin, text, **kwargs)
   text_img = gray_bg.crop(bounding_box)
 
-  # Transparent image
-  clear_bg = Image.new('RGBA', (img.width, img.height), color='#00000000')
-  clear_bg.paste(text_img, bounding_box)
+  return text_img, (bounding_box[0] - origin[0], bounding_box[1] - origin[1])
+
+
+def get_text_sprite_cache_info():
+  return _get_text_sprite.cache_info()
+
+
+def _get_text_sprite_cache_stats():
+  info = get_text_sprite_cache_info()
+  return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
 
-  # Paste the text with background on the base image
-  return Image.alpha_composite(img, clear_bg)
+watch_cache('text_sprite', _get_text_sprite_cache_stats)
+
+
+def draw_text(img, xy, text, **kwargs):
+  image = img.copy()
+  sprite = _get_text_sprite(text, **kwargs)
+  if sprite is None:
+    return image
+
+  # Paste the text with background on the base image, clipped to its edges
+  text_img, (left, top) = sprite
+  x, y = xy[0] + left, xy[1] + top
+  if x >= image.width or y >= image.height or x + text_img.width <= 0 or y + text_img.height <= 0:
+    return image
+  image.alpha_composite(text_img, dest=(max(x, 0), max(y, 0)), source=(max(-x, 0), max(-y, 0)))
+  return image
+
+
+LIVE_GAME_ROTATION_SECS = 20
 
 
 class NBADisplayManager(DisplayManager):
 
-  def __init__(self, favorite_teams, width=64, height=32):
-    super().__init__(width=width, height=height)
+  def __init__(self, favorite_teams, width=64, height=32, started_at=None):
+    super().__init__(width=width, height=height, started_at=started_at)
     self.favorite_teams = favorite_teams
-    self.live_game_times = {}
+    self.games = None
+    self.scoreboard_delay = 0
+    self.live_poller = LivePoller()
+    self.live_poller.start()
+    watch_thread(self.live_poller)
     self.transitions = [
         FadeTransition, PushTransition, CoverTransition, ShredTransition, BallTransition
     ]
+    # Fill the logo store up front so displays don't have to wait on the logo CDN
+    threading.Thread(target=prewarm_team_logos, daemon=True).start()
 
   def create_rgb_matrix(self):
     options = RGBMatrixOptions()
@@ -102,19 +174,48 @@ class NBADisplayManager(DisplayManager):
     options.hardware_mapping = 'adafruit-hat'
     return RGBMatrix(options=options)
 
-  def create_debug_label(self):
-    debug_tk = tk.Tk()
-    debug_tk.title('Debug display')
-    debug_tk.geometry('%dx%d' % (self.width * 10, self.height * 10))
-    debug_label = tk.Label(debug_tk)
-    return debug_label
+  def create_sink(self, matrix):
+    sinks = []
+    for output in getattr(config, 'OUTPUTS', ['matrix']):
+      if output == 'matrix':
+        if isinstance(matrix, FakeRGBMatrix):
+          logging.warning('rgbmatrix is not installed, nothing will be shown on the matrix.')
+        sinks.append(RGBMatrixSink(matrix))
+      elif output == 'preview':
+        sinks.append(TkPreviewSink(self.width, self.height))
+      elif output in ('record', 'gif'):
+        sinks.append(RecorderSink(format='gif' if output == 'gif' else 'png'))
+      elif output == 'null':
+        sinks.append(NullSink())
+      else:
+        raise Exception('Unknown output: %s' % output)
+    if len(sinks) == 1:
+      return sinks[0]
+    return MultiSink(sinks)
 
   def get_displays_to_show(self):
+    logging.debug('Text sprite cache: %s' % (get_text_sprite_cache_info(),))
+    logging.debug('Output: %s' % self.sink.get_stats())
+    logging.debug('Caches: %s' % get_cache_stats())
+    logging.debug('Render cache: %s, frames: %s' %
+                  (get_render_cache().get_stats(), get_frame_store_stats()))
     try:
-      for game in get_important_games(self.favorite_teams):
-        if game_is_live(game):
-          return [LiveGame(game, get_playbyplay_for_game(game), manager=self)]
-      return list(self._get_idle_displays(get_games_for_today()))
+      games = self.get_games_for_today()
+      live_games = [
+          game for game in get_important_games(self.favorite_teams, games) if game_is_live(game)
+      ]
+      # All live games are followed by one poller, so rotating between them costs no extra fetches
+      self.live_poller.set_tracked_games(live_games)
+      if live_games:
+        # Games the poller has seen go final are over, whatever the scoreboard says
+        final_games = {game.id: self.live_poller.get_final_game(game.id) for game in live_games}
+        still_live = [game for game in live_games if final_games[game.id] is None]
+        display_secs = LIVE_GAME_ROTATION_SECS if len(still_live) > 1 else None
+        return [
+            AfterGame(final_games[game.id]) if final_games[game.id] else
+            LiveGame(game, manager=self, display_secs=display_secs) for game in live_games
+        ]
+      return list(self._get_idle_displays(games))
     except KeyboardInterrupt:
       sys.exit()
     except Exception as e:
@@ -122,6 +223,18 @@ class NBADisplayManager(DisplayManager):
       logging.debug(e)
       return [ScreenSaver()]
 
+  def get_games_for_today(self):
+    # Poll the scoreboard based on what today's games are doing rather than on a fixed TTL. Only
+    # the first poll blocks, after that the cache refreshes the scoreboard in the background.
+    games = get_games_for_today(cache_time=timedelta(seconds=self.scoreboard_delay))
+    if games is not self.games:
+      scheduler = get_poll_scheduler()
+      self.games = games
+      scheduler.record_poll('scoreboard')
+      self.scoreboard_delay = scheduler.next_scoreboard_poll(games) / get_clock().speed
+      logging.debug('Polling: %s' % scheduler.get_report())
+    return self.games
+
   def _get_idle_displays(self, games):
     yield ScreenSaver()
     for game in games:
@@ -134,27 +247,6 @@ class NBADisplayManager(DisplayManager):
     for standing in get_standings():
       yield Standings(standing)
 
-  def get_corrected_game_clock_text(self, game_id, mins, secs):
-    if config.CLOCK_COUNTDOWN:
-      last_time, game_mins, game_secs = self.live_game_times.setdefault(game_id, (0, 0, 0))
-      if game_mins == mins and game_secs == secs:
-        elapsed_seconds = int(time.time() - last_time)
-        secs -= elapsed_seconds
-        while secs < 0 and mins > 0:
-          secs += 60
-          mins -= 1
-        if mins < 0:
-          mins = 0
-        if secs < 0:
-          secs = 0
-      else:
-        self.live_game_times[game_id] = (time.time(), mins, secs)
-    secs = str(secs)
-    if len(secs) == 1:
-      secs = f'0{secs}'
-    return f'{mins}:{secs}'
-
-
 # ============= DISPLAYS =============
 
 
@@ -163,28 +255,45 @@ class BeforeGame(Display):
   def __init__(self, game):
     super().__init__()
     self.game = game
+    self.logos = None
 
-  def get_pre_image(self, matrix, debug_label):
+  def get_pre_image(self, matrix, sink):
     return Image.new("RGBA", (matrix.width, matrix.height), color='#000')
 
-  def show(self, matrix, debug_label):
-    image = Image.new("RGBA", (matrix.width, matrix.height), color='#000')
+  def prepare(self, matrix):
+    self.logos = [get_team_logo(team['id']) for team in get_teams_from_game(self.game)]
+    return super().prepare(matrix)
+
+  def show(self, matrix, sink):
+    teams = get_teams_from_game(self.game)
+    version = ([team['id'] for team in teams], get_game_datetime(self.game), matrix.width,
+               matrix.height)
+    # The slides are the same every pass until the game's teams or tip-off change
+    *slides, image = get_render_cache().get(('BeforeGame', self.game.id), version,
+                                            partial(self._render, matrix, sink))
+    for frames in slides:
+      slide = Animation()
+      slide.add_frames(frames)
+      slide.show(matrix, sink)
+    self._display_image(image, 10, matrix, sink)
+
+  def _render(self, matrix, sink):
+    image = self.get_prepared_image(matrix, sink)
     ip = ImagePlacement(matrix.width, matrix.height)
-    draw = ImageDraw.Draw(image)
 
     # Team logos
     teams = get_teams_from_game(self.game)
-    logos = [get_team_logo(team['id']) for team in teams]
+    logos = self.logos or [get_team_logo(team['id']) for team in teams]
 
     slide_logo1 = SlideAnimation(
         logos[0], ip.with_v_offset().get(-0.25, 0), base_image=image, steps=20)
-    slide_logo1.show(matrix, debug_label)
-    image = slide_logo1.get_post_image(matrix, debug_label)
+    slide_frames1 = FrameStack(slide_logo1.iter_frames())
+    image = slide_logo1.get_post_image(matrix, sink)
 
     slide_logo2 = SlideAnimation(
         logos[1], ip.with_v_offset().get(0.78, 0), base_image=image, steps=20)
-    slide_logo2.show(matrix, debug_label)
-    image = slide_logo2.get_post_image(matrix, debug_label)
+    slide_frames2 = FrameStack(slide_logo2.iter_frames())
+    image = slide_logo2.get_post_image(matrix, sink)
 
     if os.name == 'nt':
       format_str = '@%I:%M'
@@ -204,12 +313,11 @@ class BeforeGame(Display):
         ip.center(),
         display_text,
         fill=ImageColor.getrgb('#fff'),
-        font=SEVEN_PX_FONT,
+        font=get_seven_px_font(),
         anchor='mm',
         spacing=-2,
         align='center')
-
-    self._display_image(image, 10, matrix, debug_label)
+    return slide_frames1, slide_frames2, image
 
 
 class AfterGame(Display):
@@ -218,7 +326,14 @@ class AfterGame(Display):
     super().__init__()
     self.game = game
 
-  def get_pre_image(self, matrix, debug_label):
+  def get_pre_image(self, matrix, sink):
+    teams = get_teams_from_game(self.game)
+    version = ([team['id'] for team in teams], get_score_from_game(self.game), matrix.width,
+               matrix.height)
+    return get_render_cache().get(('AfterGame', self.game.id), version,
+                                  partial(self._render_pre_image, matrix))
+
+  def _render_pre_image(self, matrix):
     image = Image.new("RGBA", (matrix.width, matrix.height), color='#000')
     ip = ImagePlacement(matrix.width, matrix.height)
     draw = ImageDraw.Draw(image)
@@ -237,7 +352,7 @@ class AfterGame(Display):
         ip.center(),
         ' \nVS.\n \n{score}'.format(score=score_text),
         fill=ImageColor.getrgb('#fff'),
-        font=SEVEN_PX_FONT,
+        font=get_seven_px_font(),
         anchor='mm',
         spacing=-2,
         align='center')
@@ -249,7 +364,7 @@ class AfterGame(Display):
         ip.center(),
         '{team1_name}\n \n \n '.format(team1_name=teams[0]['abbreviation']),
         fill=ImageColor.getrgb('#070' if first_team_won else '#f00'),
-        font=SEVEN_PX_FONT,
+        font=get_seven_px_font(),
         anchor='mm',
         spacing=-2,
         align='center')
@@ -260,14 +375,14 @@ class AfterGame(Display):
         ip.center(),
         ' \n \n{team2_name}\n '.format(team2_name=teams[1]['abbreviation']),
         fill=ImageColor.getrgb('#f00' if first_team_won else '#070'),
-        font=SEVEN_PX_FONT,
+        font=get_seven_px_font(),
         anchor='mm',
         spacing=-2,
         align='center')
     return image
 
-  def show(self, matrix, debug_label):
-    image = self.get_pre_image(matrix, debug_label)
+  def show(self, matrix, sink):
+    image = self.get_prepared_image(matrix, sink)
 
     teams = get_teams_from_game(self.game)
     team_1_name = teams[0]['nickname']
@@ -275,19 +390,22 @@ class AfterGame(Display):
 
     if team_1_name in FAVORITE_TEAM_NAMES or team_2_name in FAVORITE_TEAM_NAMES:
       flash = FlashAnimation(image)
-      flash.show(matrix, debug_label)
-    self._display_image(image, 10, matrix, debug_label)
+      flash.show(matrix, sink)
+    self._display_image(image, 10, matrix, sink)
 
 
 class LiveGame(Display):
 
-  def __init__(self, game, game_playbyplay=None, manager=None):
+  # With a manager, the game is followed live through the manager's shared poller. display_secs
+  # limits how long it is shown so the manager can rotate between several live games.
+  def __init__(self, game, game_playbyplay=None, manager=None, display_secs=None):
     super().__init__()
     self.game = game
     self.game_playbyplay = game_playbyplay
     self.manager = manager
+    self.display_secs = display_secs
 
-  def get_pre_image(self, matrix, debug_label):
+  def get_pre_image(self, matrix, sink):
     image = Image.new("RGBA", (matrix.width, matrix.height), color='#000')
     ip = ImagePlacement(matrix.width, matrix.height)
 
@@ -295,7 +413,7 @@ class LiveGame(Display):
     team_1_name = teams[0]['abbreviation']
     team_2_name = teams[1]['abbreviation']
 
-    if not self.game_playbyplay:
+    if not self.manager:
       team_1_score, team_2_score = get_score_from_game(self.game)
 
       # Team text
@@ -305,7 +423,7 @@ class LiveGame(Display):
           '{team_1_name}\n{team_1_score}'.format(
               team_1_name=team_1_name, team_1_score=team_1_score),
           fill=ImageColor.getrgb('#fff'),
-          font=SEVEN_PX_FONT_BOLD,
+          font=get_seven_px_font_bold(),
           anchor='mm',
           spacing=6,
           align='center' if team_1_score < 100 else 'left')
@@ -315,7 +433,7 @@ class LiveGame(Display):
           '{team_2_name}\n{team_2_score}'.format(
               team_2_name=team_2_name, team_2_score=team_2_score),
           fill=ImageColor.getrgb('#fff'),
-          font=SEVEN_PX_FONT_BOLD,
+          font=get_seven_px_font_bold(),
           anchor='mm',
           spacing=6,
           align='center' if team_2_score < 100 else 'right')
@@ -326,81 +444,100 @@ class LiveGame(Display):
         ip.center(),
         'LIVE\n \n ',
         fill=ImageColor.getrgb('#f00'),
-        font=FIVE_PX_FONT,
+        font=get_five_px_font(),
         anchor='mm',
         spacing=6,
         align='center')
     return image
 
-  def show(self, matrix, debug_label):
-    image = self.get_pre_image(matrix, debug_label)
+  def show(self, matrix, sink):
+    image = self.get_prepared_image(matrix, sink)
     ip = ImagePlacement(matrix.width, matrix.height)
 
-    if self.game_playbyplay:
-      with PlayByPlayUpdateThread(self.game, self.game_playbyplay) as update_thread:
-        teams = get_teams_from_game(self.game)
-        team_1_name = teams[0]['abbreviation']
-        team_2_name = teams[1]['abbreviation']
-
-        while not game_has_ended(update_thread.game):
-          image_copy = image.copy()
-
-          team_1_score = int(update_thread.playbyplay[-1]['scoreAway'])
-          team_2_score = int(update_thread.playbyplay[-1]['scoreHome'])
-
-          # Team text
-          image_copy = draw_text(
-              image_copy,
-              ip.with_h_offset().get(1 / 6, 0.5),
-              '{team_1_name}\n{team_1_score}'.format(
-                  team_1_name=team_1_name, team_1_score=team_1_score),
-              fill=ImageColor.getrgb('#fff'),
-              font=SEVEN_PX_FONT_BOLD,
-              anchor='mm',
-              spacing=6,
-              align='center')
-          image_copy = draw_text(
-              image_copy,
-              ip.with_h_offset(-1).get(5 / 6, 0.5),
-              '{team_2_name}\n{team_2_score}'.format(
-                  team_2_name=team_2_name, team_2_score=team_2_score),
-              fill=ImageColor.getrgb('#fff'),
-              font=SEVEN_PX_FONT_BOLD,
-              anchor='mm',
-              spacing=6,
-              align='center')
-
-          period = update_thread.playbyplay[-1]['period']
-          mins, secs = get_game_clock(update_thread.playbyplay[-1]['clock'])
-          game_clock = self.manager.get_corrected_game_clock_text(update_thread.game['gameId'],
-                                                                  int(mins), int(secs))
-
-          image_copy = draw_text(
-              image_copy,
-              ip.center(),
-              ' \nQ{period}\n{clock}'.format(period=period, clock=game_clock),
-              fill=ImageColor.getrgb('#fff'),
-              font=FIVE_PX_FONT,
-              anchor='mm',
-              spacing=6,
-              align='center')
-          self._display_image(image_copy, 1, matrix, debug_label)
-
-        update_thread.exitSignal = 1
+    if self.manager:
+      poller = self.manager.live_poller
+      poller.track(self.game, self.game_playbyplay)
+      teams = get_teams_from_game(self.game)
+      team_1_name = teams[0]['abbreviation']
+      team_2_name = teams[1]['abbreviation']
+      stop_time = time.monotonic() + self.display_secs if self.display_secs else None
+
+      snapshot = poller.get_snapshot(self.game.id)
+      if snapshot is None:
+        # No longer followed, e.g. the scoreboard dropped the game since this display was made
+        self._display_image(image, 1, matrix, sink)
+      while snapshot:
+        image_copy = image.copy()
+
+        latest_action = snapshot.latest_action
+        if latest_action:
+          team_1_score = latest_action.score_away
+          team_2_score = latest_action.score_home
+          period = latest_action.period
+          clock_seconds = latest_action.clock_seconds
+        else:
+          team_1_score, team_2_score = get_score_from_game(snapshot.game)
+          period = snapshot.game.period
+          clock_seconds = snapshot.game.clock_seconds
+
+        # Team text
+        image_copy = draw_text(
+            image_copy,
+            ip.with_h_offset().get(1 / 6, 0.5),
+            '{team_1_name}\n{team_1_score}'.format(
+                team_1_name=team_1_name, team_1_score=team_1_score),
+            fill=ImageColor.getrgb('#fff'),
+            font=get_seven_px_font_bold(),
+            anchor='mm',
+            spacing=6,
+            align='center')
+        image_copy = draw_text(
+            image_copy,
+            ip.with_h_offset(-1).get(5 / 6, 0.5),
+            '{team_2_name}\n{team_2_score}'.format(
+                team_2_name=team_2_name, team_2_score=team_2_score),
+            fill=ImageColor.getrgb('#fff'),
+            font=get_seven_px_font_bold(),
+            anchor='mm',
+            spacing=6,
+            align='center')
+
+        estimate = snapshot.clock.estimate()
+        if config.CLOCK_COUNTDOWN and estimate and estimate.period == period:
+          clock_seconds = estimate.seconds
+        game_clock = get_game_clock_text(clock_seconds)
+
+        image_copy = draw_text(
+            image_copy,
+            ip.center(),
+            ' \nQ{period}\n{clock}'.format(period=period, clock=game_clock),
+            fill=ImageColor.getrgb('#fff'),
+            font=get_five_px_font(),
+            anchor='mm',
+            spacing=6,
+            align='center')
+        self._display_image(image_copy, 1, matrix, sink)
+
+        # A final snapshot is shown once, after which the manager shows the game as finished
+        if game_has_ended(snapshot.game) or (stop_time and time.monotonic() >= stop_time):
+          break
+        snapshot = poller.get_snapshot(self.game.id)
+      if snapshot:
+        logging.debug('Game clock for %s: %s' % (self.game.id, snapshot.clock.get_stats()))
 
     else:
-      period = self.game['period']
-      game_clock = get_game_clock_text(self.game['gameClock'])
+      period = self.game.period
+      game_clock = get_game_clock_text(self.game.clock_seconds)
       image = draw_text(
           image,
           ip.center(),
           ' \nQ{period}\n{clock}'.format(period=period, clock=game_clock),
           fill=ImageColor.getrgb('#fff'),
-          font=FIVE_PX_FONT,
+          font=get_five_px_font(),
           anchor='mm',
           spacing=6,
           align='center')
-      self._display_image(image, 10, matrix, debug_label)
+      self._display_image(image, 10, matrix, sink)
 
 
 class Standings(Display):
@@ -409,7 +546,14 @@ class Standings(Display):
     super().__init__()
     self.standing = standing
 
-  def get_pre_image(self, matrix, debug_label):
+  def get_pre_image(self, matrix, sink):
+    standing = self.standing
+    version = (standing['rank'], standing['wins'], standing['losses'], matrix.width,
+               matrix.height)
+    return get_render_cache().get(('Standings', standing['team']['id']), version,
+                                  partial(self._render_pre_image, matrix))
+
+  def _render_pre_image(self, matrix):
     image = Image.new("RGBA", (matrix.width, matrix.height), color='#000')
     ip = ImagePlacement(matrix.width, matrix.height)
     draw = ImageDraw.Draw(image)
@@ -429,22 +573,26 @@ class Standings(Display):
         ip.get(0.75, 0.5),
         display_text,
         fill=ImageColor.getrgb('#fff'),
-        font=SEVEN_PX_FONT_BOLD,
+        font=get_seven_px_font_bold(),
         anchor='mm',
         spacing=0,
         align='center')
 
     return image
 
-  def show(self, matrix, debug_label):
-    image = self.get_pre_image(matrix, debug_label)
-    self._display_image(image, 5, matrix, debug_label)
+  def show(self, matrix, sink):
+    image = self.get_prepared_image(matrix, sink)
+    self._display_image(image, 5, matrix, sink)
 
 
 class ScreenSaver(Display):
+  shows_data = False
 
-  def show(self, matrix, debug_label):
-    self._display_image(get_nba_logo(), 10, matrix, debug_label)
+  def get_pre_image(self, matrix, sink):
+    return get_nba_logo()
+
+  def show(self, matrix, sink):
+    self._display_image(self.get_prepared_image(matrix, sink), 10, matrix, sink)
 
 
 # ============= ANIMATIONS =============
@@ -460,20 +608,24 @@ class SlideAnimation(Animation):
                framerate=30):
     super().__init__(framerate=framerate)
     self.add_frames(self.get_animation_frames(image, final_loc, base_image, steps))
+    self.post_image = self.get_animation_frame(image, final_loc, base_image, steps, steps)
 
   def get_animation_frames(self, image, final_loc, base_image, steps):
+    for step in range(steps + 1):
+      yield self.get_animation_frame(image, final_loc, base_image, steps, step)
+
+  def get_animation_frame(self, image, final_loc, base_image, steps, step):
     ip = ImagePlacement(base_image.width, base_image.height)
     start_loc = ip.with_offset((-image.width // 2, -image.height // 2)).center()
     dx = (final_loc[0] - start_loc[0]) / steps
     dy = (final_loc[1] - start_loc[1]) / steps
 
-    for step in range(steps + 1):
-      paste_x = math.floor(start_loc[0] + step * dx)
-      paste_y = math.floor(start_loc[1] + step * dy)
+    paste_x = math.floor(start_loc[0] + step * dx)
+    paste_y = math.floor(start_loc[1] + step * dy)
 
-      frame = base_image.copy()
-      frame.paste(image, (paste_x, paste_y))
-      yield frame
+    frame = base_image.copy()
+    frame.paste(image, (paste_x, paste_y))
+    return frame
 
 
 class FlashAnimation(Animation):
@@ -481,6 +633,7 @@ class FlashAnimation(Animation):
   def __init__(self, image, flash_rate=3, flash_count=3, framerate=30):
     super().__init__(framerate=framerate)
     self.add_frames(self.get_animation_frames(image, flash_rate, flash_count))
+    self.post_image = image
 
   def get_animation_frames(self, image, flash_rate, flash_count):
     black_screen = Image.new("RGBA", (image.width, image.height), color='#000')
@@ -496,13 +649,25 @@ class FlashAnimation(Animation):
 # ============= TRANSITIONS =============
 
 
-class FadeTransition(Transition):
+class FadeTransition(ArrayTransition):
 
   def __init__(self, start_img, end_img, duration=14, framerate=30):
     self.duration = duration
     super().__init__(start_img, end_img, framerate=framerate)
 
-  def get_transition_frames(self):
+  def get_frame_count(self):
+    return int(self.duration / 2) * 2
+
+  def fill_frame_stack(self, frames, start, end):
+    half = int(self.duration / 2)
+    delta = 255 / (self.duration / 2)
+    weights = np.array([int(delta * i) for i in range(1, half + 1)]).reshape(-1, 1, 1, 1)
+    black = np.zeros_like(start)
+    black[..., 3] = 255
+    blend_arrays(start, black, weights, out=frames[:half])
+    blend_arrays(black, end, weights, out=frames[half:])
+
+  def get_pil_transition_frames(self):
     delta = 255 / (self.duration / 2)
     for i in range(1, int(self.duration / 2 + 1)):
       img = self.start_img.copy()
@@ -520,7 +685,7 @@ class FadeTransition(Transition):
       yield img
 
 
-class PushTransition(Transition):
+class PushTransition(ArrayTransition):
 
   def __init__(self,
                start_img,
@@ -540,13 +705,28 @@ class PushTransition(Transition):
     self.duration = duration
     super().__init__(start_img, end_img, framerate=framerate)
 
-  def get_transition_frames(self):
+  def _get_start_pos_and_delta(self):
     ip = ImagePlacement(self.start_img.width, self.start_img.height)
     start_pos_x, start_pos_y = ip.with_offset(
         (self.x_direction, self.y_direction)).get(self.x_direction, self.y_direction)
 
     delta_x = int(-start_pos_x / self.duration)
     delta_y = int(-start_pos_y / self.duration)
+    return start_pos_x, start_pos_y, delta_x, delta_y
+
+  def get_frame_count(self):
+    return self.duration + 1
+
+  def fill_frame_stack(self, frames, start, end):
+    start_pos_x, start_pos_y, delta_x, delta_y = self._get_start_pos_and_delta()
+    frames[:-1, ..., 3] = 255
+    for i in range(0, self.duration):
+      paste_array(frames[i], start, box=(delta_x * i, delta_y * i))
+      paste_array(frames[i], end, box=(start_pos_x + delta_x * i, start_pos_y + delta_y * i))
+    frames[-1] = end
+
+  def get_pil_transition_frames(self):
+    start_pos_x, start_pos_y, delta_x, delta_y = self._get_start_pos_and_delta()
 
     for i in range(0, self.duration):
       image = Image.new("RGBA", (self.start_img.width, self.start_img.height), color='#000')
@@ -556,7 +736,7 @@ class PushTransition(Transition):
     yield self.end_img
 
 
-class CoverTransition(Transition):
+class CoverTransition(ArrayTransition):
 
   def __init__(self,
                start_img,
@@ -576,13 +756,27 @@ class CoverTransition(Transition):
     self.duration = duration
     super().__init__(start_img, end_img, framerate=framerate)
 
-  def get_transition_frames(self):
+  def _get_start_pos_and_delta(self):
     ip = ImagePlacement(self.start_img.width, self.start_img.height)
     start_pos_x, start_pos_y = ip.with_offset(
         (self.x_direction, self.y_direction)).get(self.x_direction, self.y_direction)
 
     delta_x = int(-start_pos_x / self.duration)
     delta_y = int(-start_pos_y / self.duration)
+    return start_pos_x, start_pos_y, delta_x, delta_y
+
+  def get_frame_count(self):
+    return self.duration + 1
+
+  def fill_frame_stack(self, frames, start, end):
+    start_pos_x, start_pos_y, delta_x, delta_y = self._get_start_pos_and_delta()
+    frames[:-1] = start
+    for i in range(0, self.duration):
+      paste_array(frames[i], end, box=(start_pos_x + delta_x * i, start_pos_y + delta_y * i))
+    frames[-1] = end
+
+  def get_pil_transition_frames(self):
+    start_pos_x, start_pos_y, delta_x, delta_y = self._get_start_pos_and_delta()
 
     for i in range(0, self.duration):
       image = self.start_img.copy()
@@ -595,7 +789,7 @@ class ZoomTransition(Transition):
   pass
 
 
-class ShredTransition(Transition):
+class ShredTransition(ArrayTransition):
 
   def __init__(self, start_img, end_img, framerate=30, direction=None, duration=20):
     if direction is None:
@@ -604,19 +798,39 @@ class ShredTransition(Transition):
     self.duration = duration
     super().__init__(start_img, end_img, framerate=framerate)
 
+  def _get_deltas(self):
+    if self.direction == 0:
+      return 0, int(self.start_img.height / (self.duration / 2))
+    return int(self.start_img.width / (self.duration / 2)), 0
+
   def get_transition_frames(self):
     if self.start_img.width != 64 or self.start_img.height != 32:
       return []
+    return super().get_transition_frames()
+
+  def get_frame_count(self):
+    return self.duration // 2 * 2 + 1
+
+  def fill_frame_stack(self, frames, start, end):
+    delta_x, delta_y = self._get_deltas()
+    mask1, mask2 = _get_shred_masks(self.direction)
+
+    half = self.duration // 2
+    frames[:-1, ..., 3] = 255
+    for frame, i in zip(frames[:half], range(0, half)):
+      paste_array(frame, start, box=(delta_x * i, delta_y * i), mask=mask1)
+      paste_array(frame, start, box=(-delta_x * i, -delta_y * i), mask=mask2)
+    for frame, i in zip(frames[half:], range(half, 0, -1)):
+      paste_array(frame, end, box=(delta_x * i, delta_y * i), mask=mask1)
+      paste_array(frame, end, box=(-delta_x * i, -delta_y * i), mask=mask2)
+    frames[-1] = end
+
+  def get_pil_transition_frames(self):
     if self.direction == 0:
-      mask1 = Image.open('assets/vmask1.png')
-      mask2 = Image.open('assets/vmask2.png')
-      delta_x = 0
-      delta_y = int(self.start_img.height / (self.duration / 2))
+      mask1, mask2 = get_mask('vmask1'), get_mask('vmask2')
     else:
-      mask1 = Image.open('assets/hmask1.png')
-      mask2 = Image.open('assets/hmask2.png')
-      delta_x = int(self.start_img.width / (self.duration / 2))
-      delta_y = 0
+      mask1, mask2 = get_mask('hmask1'), get_mask('hmask2')
+    delta_x, delta_y = self._get_deltas()
 
     for i in range(0, self.duration // 2):
       image = Image.new("RGBA", (self.start_img.width, self.start_img.height), color='#000')
@@ -633,14 +847,36 @@ class ShredTransition(Transition):
     yield self.end_img
 
 
-class BallTransition(Transition):
+class BallTransition(ArrayTransition):
 
   def __init__(self, start_img, end_img, framerate=30, duration=15):
     self.duration = duration
     super().__init__(start_img, end_img, framerate)
 
-  def get_transition_frames(self):
+  def get_frame_count(self):
+    return len(range(self.duration, -self.duration // 2, -1)) + 1
+
+  def fill_frame_stack(self, frames, start, end):
+    basketball_arrays, basketball_mask = _get_basketball_arrays(start.shape[0], self.duration)
+    basketball_offset = basketball_mask.shape[1] // 2
+    width = start.shape[1]
+    ip = ImagePlacement(width, start.shape[0])
+
+    delta_x = 1 / self.duration
+
+    frames[:-1, ..., 3] = 255
+    for frame, i in zip(frames, range(self.duration, -self.duration // 2, -1)):
+      x = ip.h(delta_x * i)
+      if 0 < x:
+        frame[:, :x + basketball_offset] = start[:, :x + basketball_offset]
+      if x + basketball_offset < width:
+        frame[:, max(x + basketball_offset, 0):] = end[:, max(x + basketball_offset, 0):]
+      paste_array(frame, basketball_arrays[i], box=(x, 0), mask=basketball_mask)
+    frames[-1] = end
+
+  def get_pil_transition_frames(self):
     basketball_img = get_basketball_img(size=self.start_img.height)
+    rotations = get_basketball_rotations(self.start_img.height, self.duration)
     basketball_offset = basketball_img.width // 2
     ip = ImagePlacement(self.start_img.width, self.start_img.height)  #.with_h_offset(-basketball_offset)
 
@@ -656,33 +892,19 @@ class BallTransition(Transition):
             self.end_img.crop((x + basketball_offset, 0, self.end_img.width, self.end_img.height)),
             box=(x + basketball_offset, 0))
 
-      rot_basketball_img = basketball_img.rotate(-360 // self.duration * i)
-      image.paste(rot_basketball_img, box=(x, 0), mask=basketball_img)
+      image.paste(rotations[i], box=(x, 0), mask=basketball_img)
       yield image
     yield self.end_img
 
 
-class PlayByPlayUpdateThread(threading.Thread):
-
-  def __init__(self, game, playbyplay):
-    super().__init__()
-    self.game = game
-    self.exitSignal = 0
-    self.playbyplay = playbyplay
-
-  def run(self):
-    while not self.exitSignal:
-      self.playbyplay = get_playbyplay_for_game(self.game, cache_override=True)
-      self.game = get_game_by_id(self.game['gameId'], cache_override=True)
-      time.sleep(1)
-    logging.debug('Thread for game %s exited.' % self.game['gameId'])
-
-  def stop(self):
-    self.exitSignal = 1
+@lru_cache(maxsize=4)
+def _get_shred_masks(direction):
+  names = ('vmask1', 'vmask2') if direction == 0 else ('hmask1', 'hmask2')
+  return [get_select_mask(get_mask_array(name)) for name in names]
 
-  def __enter__(self):
-    self.start()
-    return self
 
-  def __exit__(self, *args, **kwargs):
-    self.stop()
\ No newline at end of file
+@lru_cache(maxsize=4)
+def _get_basketball_arrays(size, duration):
+  basketball_img = get_basketball_img(size=size)
+  return (get_basketball_rotation_arrays(size, duration),
+          np.asarray(basketball_img.getchannel('A')))
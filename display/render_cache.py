@@ -0,0 +1,84 @@
+# Keeps what displays render between passes through the carousel. Entries are keyed by a slot (the
+# display type and what it is about, e.g. a team's standing) and a version of the data it was
+# rendered from, so a screen is only rendered again once its data actually changes. A newer version
+# replaces the slot's old entry, and the least recently used entries go once over the memory cap.
+from collections import OrderedDict
+from data.metrics import watch_cache
+from display.frame_store import FrameStack
+from PIL import Image
+import config
+import threading
+
+# The default for config.FRAME_MEMORY_MB. Frames kept anywhere else only live for as long as they
+# are on screen, so this bounds the memory that frames take up overall.
+DEFAULT_MEMORY_MB = 16
+
+
+def get_rendered_size(value):
+  if isinstance(value, Image.Image):
+    return value.width * value.height * len(value.getbands())
+  if isinstance(value, FrameStack):
+    return value.nbytes
+  if isinstance(value, (list, tuple)):
+    return sum(get_rendered_size(item) for item in value)
+  return 0
+
+
+class RenderCache(object):
+
+  def __init__(self, max_bytes=None):
+    if max_bytes is None:
+      max_bytes = int(getattr(config, 'FRAME_MEMORY_MB', DEFAULT_MEMORY_MB) * 1024 * 1024)
+    self.max_bytes = max_bytes
+    self.entries = OrderedDict()  # slot -> (version, value, size)
+    self.size = 0
+    self.lock = threading.Lock()
+    self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+  def get(self, slot, version, render):
+    with self.lock:
+      entry = self.entries.get(slot)
+      if entry and entry[0] == version:
+        self.entries.move_to_end(slot)
+        self.stats['hits'] += 1
+        return entry[1]
+      self.stats['misses'] += 1
+
+    # Rendered outside the lock, so other displays can be prepared in the meantime
+    value = render()
+    size = get_rendered_size(value)
+    with self.lock:
+      old_entry = self.entries.pop(slot, None)
+      if old_entry:
+        self.size -= old_entry[2]
+        if old_entry[0] != version:
+          self.stats['invalidations'] += 1
+      if size <= self.max_bytes:
+        self.entries[slot] = (version, value, size)
+        self.size += size
+        self._evict()
+    return value
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+      self.size = 0
+
+  def get_stats(self):
+    with self.lock:
+      return dict(self.stats, entries=len(self.entries), bytes=self.size)
+
+  # Must be called with the lock held
+  def _evict(self):
+    while self.size > self.max_bytes:
+      _, (_, _, size) = self.entries.popitem(last=False)
+      self.size -= size
+      self.stats['evictions'] += 1
+
+
+_render_cache = RenderCache()
+watch_cache('render', _render_cache.get_stats)
+
+
+def get_render_cache():
+  return _render_cache
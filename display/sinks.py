@@ -0,0 +1,254 @@
+from datetime import datetime
+from PIL import Image
+import logging
+import numpy as np
+import os
+import time
+
+
+class FrameSink(object):
+
+  def present(self, image):
+    raise NotImplementedError("Subclasses must implement present()")
+
+  # Called regularly while a frame is held on screen
+  def idle(self):
+    pass
+
+  def close(self):
+    pass
+
+  def get_stats(self):
+    return {}
+
+
+# Above this fraction of changed pixels, the whole frame is sent instead of the changed rows
+FULL_UPDATE_FRACTION = 0.5
+
+
+def get_dirty_rects(frame, previous):
+  # Bounding boxes of each run of changed rows, or None if nothing changed
+  changed = (frame != previous).any(axis=2)
+  changed_rows = changed.any(axis=1)
+  if not changed_rows.any():
+    return None
+
+  rects = []
+  edges = np.flatnonzero(np.diff(np.concatenate(([0], changed_rows.view(np.int8), [0]))))
+  for top, bottom in zip(edges[::2], edges[1::2]):
+    columns = np.flatnonzero(changed[top:bottom].any(axis=0))
+    rects.append((int(columns[0]), int(top), int(columns[-1]) + 1, int(bottom)))
+  return rects
+
+
+class RGBMatrixSink(FrameSink):
+
+  def __init__(self, matrix):
+    self.matrix = matrix
+    self.canvas = matrix.CreateFrameCanvas()
+    # What is on the canvas being drawn (back) and the one being shown (front). The canvases
+    # alternate on every swap, so the back canvas holds the frame from two swaps ago.
+    self.back, self.front = None, None
+
+    self.frames = 0
+    self.skipped = 0
+    self.partial = 0
+    self.pixels_sent = 0
+
+  def present(self, image):
+    self.frames += 1
+    if image.mode != 'RGB':
+      image = image.convert('RGB')
+    frame = np.asarray(image)
+    if self.front is not None and np.array_equal(frame, self.front):
+      self.skipped += 1
+      return
+
+    rects = get_dirty_rects(frame, self.back) if self.back is not None else None
+    changed = sum((right - left) * (bottom - top) for left, top, right, bottom in rects or [])
+    # Draw offscreen, then swap it in on the next vsync
+    if rects is not None and changed <= frame.shape[0] * frame.shape[1] * FULL_UPDATE_FRACTION:
+      for left, top, right, bottom in rects:
+        self.canvas.SetImage(image.crop((left, top, right, bottom)), left, top)
+      self.partial += 1
+      self.pixels_sent += changed
+    elif rects is not None or self.back is None:
+      self.canvas.SetImage(image)
+      self.pixels_sent += frame.shape[0] * frame.shape[1]
+    self.canvas = self.matrix.SwapOnVSync(self.canvas)
+    self.back, self.front = self.front, frame
+
+  def get_stats(self):
+    return {
+        'frames': self.frames,
+        'skipped': self.skipped,
+        'partial': self.partial,
+        'pixelsSent': self.pixels_sent,
+    }
+
+
+class NullSink(FrameSink):
+
+  def __init__(self, copy_frames=False):
+    self.copy_frames = copy_frames
+    self.frame_count = 0
+    self.buffer = None
+
+  def present(self, image):
+    self.frame_count += 1
+    if self.copy_frames:
+      # Pay for the pixel copy a real sink would make, without any output
+      frame = np.asarray(image)
+      if self.buffer is None or self.buffer.shape != frame.shape:
+        self.buffer = np.empty_like(frame)
+      np.copyto(self.buffer, frame)
+
+  def get_stats(self):
+    return {'frames': self.frame_count}
+
+
+class TkPreviewSink(FrameSink):
+
+  def __init__(self, width, height, scale=10, max_fps=15):
+    # Only imported when a preview is actually wanted
+    import tkinter as tk
+    from PIL import ImageTk
+    self._photo_image = ImageTk.PhotoImage
+
+    self.scale = scale
+    self.min_interval = 1 / max_fps if max_fps else 0
+    self.last_shown = 0
+    self.pending = None
+
+    root = tk.Tk()
+    root.title('Debug display')
+    root.geometry('%dx%d' % (width * scale, height * scale))
+    self.label = tk.Label(root)
+    self.label.pack()
+
+  def present(self, image):
+    self.pending = image
+    self.idle()
+
+  def idle(self):
+    if self.pending is not None and time.monotonic() - self.last_shown >= self.min_interval:
+      image, self.pending = self.pending, None
+      big_img = image.resize((image.width * self.scale, image.height * self.scale),
+                             resample=Image.NONE)
+      photo = self._photo_image(big_img)
+      self.label.config(image=photo)
+      self.label.image = photo  # keep a reference
+      self.last_shown = time.monotonic()
+
+    self.label.master.update_idletasks()
+    self.label.master.update()
+
+  def close(self):
+    self.label.master.destroy()
+
+
+# Gifs are written in parts of at most this many frames, so a long recording doesn't pile up in
+# memory. About 20 minutes of a live game, or a few minutes of animations.
+MAX_GIF_FRAMES = 1200
+
+
+class RecorderSink(FrameSink):
+
+  def __init__(self, directory='recordings', format='png', max_gif_frames=MAX_GIF_FRAMES):
+    self.format = format.lower()
+    self.directory = os.path.join(directory, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(self.directory, exist_ok=True)
+    self.max_gif_frames = max_gif_frames
+    self.frame_count = 0
+    self.gif_count = 0
+    self.frames = []
+    self.timestamps = []
+
+  def present(self, image):
+    self.frame_count += 1
+    if self.format == 'gif':
+      if len(self.frames) >= self.max_gif_frames:
+        self._save_gif(end=time.monotonic())
+      self.frames.append(image.convert('RGB'))
+      self.timestamps.append(time.monotonic())
+    else:
+      image.save(os.path.join(self.directory, '%06d.png' % self.frame_count))
+
+  def get_stats(self):
+    return {'frames': self.frame_count}
+
+  def close(self):
+    if self.format == 'gif':
+      self._save_gif(end=time.monotonic())
+
+  def _save_gif(self, end):
+    if not self.frames:
+      return
+    # Each frame lasts until the next one was presented
+    durations = [
+        max(int((stop - start) * 1000), 10)
+        for start, stop in zip(self.timestamps, self.timestamps[1:] + [end])
+    ]
+    self.gif_count += 1
+    path = os.path.join(self.directory, 'recording-%03d.gif' % self.gif_count)
+    self.frames[0].save(
+        path, save_all=True, append_images=self.frames[1:], duration=durations, loop=0)
+    logging.info('Saved %d frames to %s' % (len(self.frames), path))
+    self.frames, self.timestamps = [], []
+
+
+class MultiSink(FrameSink):
+
+  def __init__(self, sinks):
+    self.sinks = sinks
+
+  def present(self, image):
+    for sink in self.sinks:
+      sink.present(image)
+
+  def idle(self):
+    for sink in self.sinks:
+      sink.idle()
+
+  def close(self):
+    for sink in self.sinks:
+      sink.close()
+
+  def get_stats(self):
+    return {type(sink).__name__: sink.get_stats() for sink in self.sinks}
+
+
+# Stands in for rgbmatrix.RGBMatrix where the library isn't available, e.g. on a desktop
+class FakeRGBMatrix(object):
+
+  def __init__(self, options=None, width=64, height=32):
+    self.options = options
+    self.width = getattr(options, 'cols', width)
+    self.height = getattr(options, 'rows', height)
+    self.swap_count = 0
+    self.displayed_canvas = FakeFrameCanvas(self.width, self.height)
+
+  def CreateFrameCanvas(self):
+    return FakeFrameCanvas(self.width, self.height)
+
+  def SwapOnVSync(self, canvas):
+    self.swap_count += 1
+    canvas, self.displayed_canvas = self.displayed_canvas, canvas
+    return canvas
+
+
+class FakeFrameCanvas(object):
+
+  def __init__(self, width, height):
+    self.width = width
+    self.height = height
+    self.image = Image.new('RGB', (width, height))
+
+  def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+    self.image.paste(image, (offset_x, offset_y))
+
+  def SetPixel(self, x, y, red, green, blue):
+    self.image.putpixel((x, y), (red, green, blue))
+
+  def Clear(self):
+    self.image.paste((0, 0, 0), (0, 0, self.width, self.height))
@@ -1,6 +1,21 @@
-from data.nba_data import *
+import startup
+
+# Times the imports below, which are a good part of startup
+startup.begin()
+
+from data import metrics, nba_data, profiler
+from data.clock import set_clock
+from data.nba_client import set_client
+from data.nba_data import (FAVORITE_TEAM_NAMES, FAVORITE_TEAMS, find_team, get_game_by_id,
+                           get_playbyplay_for_game, get_standings)
+from data.store import ResponseStore, set_response_store
 from display.nba_display import AfterGame, BeforeGame, LiveGame, NBADisplayManager, ScreenSaver, Standings
+import argparse
 import logging
+import signal
+import sys
+
+startup.end()
 
 MAIN_LOG_LEVEL = logging.DEBUG  # DEBUG, INFO, WARNING, ERROR, CRITICAL
 
@@ -9,12 +24,44 @@ def main():
   logging.basicConfig()
   logging.getLogger().setLevel(MAIN_LOG_LEVEL)
 
-  show_display()
+  arg_parser = argparse.ArgumentParser(description='NBA LED scoreboard')
+  arg_parser.add_argument('--replay', metavar='DIR', help='replay a recorded game from DIR')
+  arg_parser.add_argument('--speed', type=float, default=1, help='replay speed, from 1 to 100')
+  arg_parser.add_argument('--skip',
+                          type=float,
+                          default=0,
+                          help='replay from SKIP minutes after the first recorded play-by-play '
+                          'action, negative to include the pregame')
+  args = arg_parser.parse_args()
+
+  nba_data.init()
+  metrics.start()
+  profiler.install_signal_handler()
+  # Stopping the service exits like Ctrl+C does, so the outputs are closed and recordings saved
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+  logging.info('Startup: %s' % startup.get_report())
+  if args.replay:
+    replay_display(args.replay, args.speed, args.skip)
+  else:
+    show_display()
   # test_display()
 
 
 def show_display():
-  dm = NBADisplayManager(FAVORITE_TEAMS)
+  # Start from the last responses seen, refreshing them in the background
+  set_response_store(ResponseStore())
+  dm = NBADisplayManager(FAVORITE_TEAMS, started_at=startup.STARTED_AT)
+  dm.start()
+
+
+# Plays back a recorded game, e.g. python main.py --replay benchmarks/fixtures --speed 20
+def replay_display(directory, speed=1, skip_minutes=0):
+  from data.replay import ReplayClient
+  client = ReplayClient(directory, speed=speed, start_offset=skip_minutes * 60)
+  set_client(client)
+  set_clock(client.clock)
+  dm = NBADisplayManager([find_team(tricode) for tricode in client.get_team_tricodes()],
+                         started_at=startup.STARTED_AT)
   dm.start()
 
 
@@ -33,7 +80,7 @@ def test_display():
   screensaver = ScreenSaver()
 
   for display in [before, after, live, live_important, standing, screensaver]:
-    display.show(dm.rgb_matrix, dm.debug_label)
+    display.show(dm.rgb_matrix, dm.sink)
 
 
 class Matrix(object):
@@ -0,0 +1,73 @@
+# Times startup, which matters on slower Pis: how long each module takes to import (not counting
+# the modules it imports in turn), and how long until the first frame. Import main through this,
+# i.e. call begin() before any other import.
+import importlib.abc
+import sys
+import time
+
+STARTED_AT = time.monotonic()
+SLOWEST_IMPORTS = 10
+
+_import_secs = {}
+_import_stack = []
+
+
+class _TimedLoader(importlib.abc.Loader):
+
+  def __init__(self, loader):
+    self.loader = loader
+
+  def create_module(self, spec):
+    return self.loader.create_module(spec)
+
+  def exec_module(self, module):
+    _import_stack.append(0)
+    started = time.perf_counter()
+    try:
+      self.loader.exec_module(module)
+    finally:
+      elapsed = time.perf_counter() - started
+      nested = _import_stack.pop()
+      if _import_stack:
+        _import_stack[-1] += elapsed
+      _import_secs[module.__name__] = elapsed - nested
+
+  def __getattr__(self, name):
+    return getattr(self.loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+
+  def find_spec(self, name, path, target=None):
+    for finder in sys.meta_path:
+      if finder is self or not hasattr(finder, 'find_spec'):
+        continue
+      spec = finder.find_spec(name, path, target)
+      if spec is not None:
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+          spec.loader = _TimedLoader(spec.loader)
+        return spec
+    return None
+
+
+_finder = _TimingFinder()
+
+
+def begin():
+  if _finder not in sys.meta_path:
+    sys.meta_path.insert(0, _finder)
+
+
+def end():
+  if _finder in sys.meta_path:
+    sys.meta_path.remove(_finder)
+
+
+def get_report():
+  slowest = sorted(_import_secs.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_IMPORTS]
+  return {
+      'secsSinceStart': round(time.monotonic() - STARTED_AT, 3),
+      'importSecs': round(sum(_import_secs.values()), 3),
+      'modulesImported': len(_import_secs),
+      'slowestImports': {name: round(secs, 3) for name, secs in slowest},
+  }
@@ -0,0 +1,13 @@
+# The tests import and load files the way the board does, from the repository root
+import os
+import pytest
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+  sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _run_from_root(monkeypatch):
+  monkeypatch.chdir(ROOT)
@@ -0,0 +1,44 @@
+from display.display import Animation
+from PIL import Image
+import pytest
+
+
+def make_frames(count):
+  return [Image.new('RGB', (64, 32), (i, i, i)) for i in range(count)]
+
+
+@pytest.fixture(params=[True, False], ids=['streaming', 'materialized'])
+def animation(request):
+  frames = make_frames(5)
+  animation = Animation(streaming=request.param)
+  animation.add_frames(iter(frames))
+  return animation, frames
+
+
+def test_post_image_is_the_last_frame(animation):
+  animation, frames = animation
+  assert animation.get_post_image(None, None) is frames[-1]
+  assert list(animation.iter_frames()) == frames
+
+
+def test_post_image_after_streaming_is_the_last_frame(animation):
+  animation, frames = animation
+  assert animation.get_pre_image(None, None) is frames[0]
+  assert list(animation.iter_frames()) == frames
+  assert animation.get_post_image(None, None) is frames[-1]
+
+
+def test_post_image_after_a_cut_short_stream_is_the_last_frame_shown(animation):
+  animation, frames = animation
+  shown = animation.iter_frames()
+  next(shown)
+  next(shown)
+  assert animation.get_post_image(None, None) is frames[1]
+
+
+def test_set_post_image_wins():
+  animation = Animation()
+  animation.add_frames(iter(make_frames(3)))
+  animation.post_image = Image.new('RGB', (64, 32), '#fff')
+  list(animation.iter_frames())
+  assert animation.get_post_image(None, None) is animation.post_image
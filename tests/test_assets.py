@@ -0,0 +1,76 @@
+from display import assets
+from display.assets import AssetPack
+import mmap
+import numpy as np
+import os
+import pytest
+
+
+@pytest.fixture
+def pack_path(tmp_path):
+  return os.path.join(str(tmp_path), 'cache', 'assets.pack')
+
+
+def test_pack_is_built_and_memory_mapped(pack_path):
+  pack = AssetPack(pack_path)
+  assert os.path.exists(pack_path)
+  assert isinstance(pack.buffer, mmap.mmap)
+  assert 'nba_logo' in pack
+  assert 'mask/vmask1' in pack
+
+
+def test_variants_round_trip_through_the_pack(pack_path):
+  AssetPack(pack_path)
+  pack = AssetPack(pack_path)
+  assert np.array_equal(np.asarray(pack.get_image('nba_logo')),
+                        np.asarray(assets.render_nba_logo()))
+  basketball = assets.render_basketball()
+  assert np.array_equal(pack.get_array('basketball/%d' % assets.BALL_SIZE), np.asarray(basketball))
+  for angle in set(assets.get_ball_angles(assets.BALL_TRANSITION_DURATION).values()):
+    name = 'basketball/%d/%d' % (assets.BALL_SIZE, angle)
+    assert np.array_equal(pack.get_array(name), np.asarray(basketball.rotate(angle)))
+  assert np.array_equal(pack.get_array('mask/hmask2'), np.asarray(assets.render_mask('hmask2')))
+
+
+def test_shared_variants_are_read_only(pack_path):
+  pack = AssetPack(pack_path)
+  array = pack.get_array('mask/vmask1')
+  assert not array.flags.writeable
+  assert pack.get_image('mask/vmask1') is pack.get_image('mask/vmask1')
+  with pytest.raises(ValueError):
+    array[0, 0] = 0
+
+
+def test_unchanged_pack_is_not_rebuilt(pack_path, monkeypatch):
+  AssetPack(pack_path)
+
+  def build_pack(signature):
+    raise AssertionError('rebuilt')
+
+  monkeypatch.setattr(assets, 'build_pack', build_pack)
+  assert 'nba_logo' in AssetPack(pack_path)
+
+
+def test_pack_is_rebuilt_when_its_version_changes(pack_path, monkeypatch):
+  AssetPack(pack_path)
+  version = assets.PACK_VERSION + 1
+  monkeypatch.setattr(assets, 'PACK_VERSION', version)
+  pack = AssetPack(pack_path)
+  assert pack._read_signature(pack.buffer)['version'] == version
+
+
+def test_corrupt_pack_is_rebuilt(pack_path):
+  os.makedirs(os.path.dirname(pack_path))
+  with open(pack_path, 'wb') as f:
+    f.write(b'not a pack')
+  pack = AssetPack(pack_path)
+  assert np.array_equal(pack.get_array('mask/vmask2'), np.asarray(assets.render_mask('vmask2')))
+
+
+def test_unwritable_pack_works_from_memory(tmp_path):
+  blocker = os.path.join(str(tmp_path), 'cache')
+  with open(blocker, 'w') as f:
+    f.write('a file where the directory should be')
+  pack = AssetPack(os.path.join(blocker, 'assets.pack'))
+  assert isinstance(pack.buffer, bytes)
+  assert np.array_equal(pack.get_array('mask/vmask1'), np.asarray(assets.render_mask('vmask1')))
@@ -0,0 +1,129 @@
+from data.cache import SWRCache
+from data.store import ResponseStore, set_response_store
+import os
+import pytest
+
+
+class CountingFetch(object):
+
+  def __init__(self):
+    self.calls = []
+
+  def __call__(self, *args, **kwargs):
+    self.calls.append((args, kwargs))
+    return len(self.calls)
+
+
+def _key(*args, **kwargs):
+  return (args, tuple(sorted(kwargs.items())))
+
+
+def _age(cache, seconds, *args, **kwargs):
+  cache.entries[_key(*args, **kwargs)].fetched_at -= seconds
+
+
+def _wait_for_refresh(cache, *args, **kwargs):
+  future = cache.in_flight.get(_key(*args, **kwargs))
+  if future is not None:
+    future.result(timeout=5)
+
+
+@pytest.fixture
+def response_store(tmp_path):
+  store = ResponseStore(os.path.join(str(tmp_path), 'responses.sqlite3'))
+  set_response_store(store)
+  yield store
+  set_response_store(None)
+  store.close()
+
+
+def test_fresh_value_is_served_from_the_cache():
+  fetch = CountingFetch()
+  cache = SWRCache('test', fetch, ttl=60)
+  assert cache.get('a') == 1
+  assert cache.get('a') == 1
+  assert len(fetch.calls) == 1
+  assert cache.get_stats()['hits'] == 1
+
+
+def test_stale_value_is_served_while_it_refreshes():
+  fetch = CountingFetch()
+  cache = SWRCache('test', fetch, ttl=60, max_stale=60)
+  cache.get('a')
+  _age(cache, 90, 'a')
+
+  assert cache.get('a') == 1
+  _wait_for_refresh(cache, 'a')
+  assert cache.get('a') == 2
+  assert cache.get_stats()['stale'] == 1
+  assert cache.get_stats()['refreshes'] == 1
+
+
+def test_value_past_max_stale_is_fetched_inline():
+  fetch = CountingFetch()
+  cache = SWRCache('test', fetch, ttl=60, max_stale=60)
+  cache.get('a')
+  _age(cache, 150, 'a')
+  assert cache.get('a') == 2
+
+
+def test_refresh_replaces_the_entry():
+  fetch = CountingFetch()
+  cache = SWRCache('test', fetch, ttl=60)
+  cache.get('a')
+  assert cache.get('a', refresh=True) == 2
+  assert cache.get('a') == 2
+
+
+def test_fetch_kwargs_are_not_part_of_the_key():
+  fetch = CountingFetch()
+  cache = SWRCache('test', fetch, ttl=60)
+  cache.get('a', size=1, fetch_kwargs={'max_file_age': 100})
+  assert cache.get('a', size=1, refresh=True, fetch_kwargs={'max_file_age': 0}) == 2
+  assert fetch.calls[-1] == (('a',), {'size': 1, 'max_file_age': 0})
+  # Later reads see what the refresh fetched
+  assert cache.get('a', size=1, fetch_kwargs={'max_file_age': 100}) == 2
+  assert list(cache.entries) == [_key('a', size=1)]
+
+
+def test_least_recently_used_entries_are_evicted():
+  cache = SWRCache('test', lambda key: key, ttl=60, max_size=2)
+  cache.get('a')
+  cache.get('b')
+  cache.get('a')
+  cache.get('c')
+  assert list(cache.entries) == [_key('a'), _key('c')]
+  assert cache.get_stats()['evictions'] == 1
+
+
+def test_failed_fetch_is_raised_and_not_cached():
+  calls = []
+
+  def fetch(key):
+    calls.append(key)
+    if len(calls) == 1:
+      raise ValueError('offline')
+    return key
+
+  cache = SWRCache('test', fetch, ttl=60)
+  with pytest.raises(ValueError):
+    cache.get('a')
+  assert cache.get('a') == 'a'
+  assert cache.get_stats()['errors'] == 1
+
+
+def test_persisted_values_are_restored_after_a_restart(response_store):
+  SWRCache('test', CountingFetch(), ttl=60, persist=True).get('a')
+
+  fetch = CountingFetch()
+  restarted = SWRCache('test', fetch, ttl=60, persist=True)
+  assert restarted.get('a') == 1
+  assert not fetch.calls
+  assert restarted.get_stats()['restored'] == 1
+
+
+def test_evicted_keys_are_forgotten_by_the_restore(response_store):
+  cache = SWRCache('test', lambda key: key, ttl=60, max_size=2, persist=True)
+  for key in 'abcde':
+    cache.get(key)
+  assert cache.restored == {_key('d'), _key('e')}
@@ -0,0 +1,74 @@
+from display import display
+from display.display import Display, DisplayManager
+from display.sinks import FakeRGBMatrix, NullSink
+from PIL import Image
+import pytest
+
+
+class Blank(Display):
+  shows_data = False
+
+  def __init__(self, shown):
+    super().__init__()
+    self.shown = shown
+
+  def get_pre_image(self, matrix, sink):
+    return Image.new('RGB', (matrix.width, matrix.height))
+
+  def show(self, matrix, sink):
+    self.shown.append(self)
+
+
+class ClosingSink(NullSink):
+
+  def __init__(self):
+    super().__init__()
+    self.closed = 0
+
+  def close(self):
+    self.closed += 1
+
+
+class Manager(DisplayManager):
+
+  def __init__(self, max_fetches):
+    self.max_fetches = max_fetches
+    self.fetches = 0
+    self.shown = []
+    super().__init__()
+
+  def create_rgb_matrix(self):
+    return FakeRGBMatrix()
+
+  def create_sink(self, matrix):
+    return ClosingSink()
+
+  def get_displays_to_show(self):
+    self.fetches += 1
+    if self.fetches > self.max_fetches:
+      raise KeyboardInterrupt
+    return [Blank(self.shown)]
+
+
+def test_prefetched_displays_are_used():
+  manager = Manager(max_fetches=3)
+  with pytest.raises(KeyboardInterrupt):
+    manager.start()
+  # Every list after the first was worked out while the previous one showed
+  assert len(manager.shown) == 3
+
+
+def test_stale_prefetched_displays_are_worked_out_again(monkeypatch):
+  monkeypatch.setattr(display, 'MAX_PREFETCHED_DISPLAYS_AGE_SECS', -1)
+  manager = Manager(max_fetches=3)
+  with pytest.raises(KeyboardInterrupt):
+    manager.start()
+  # The second list was too old by the time it was needed, so a third took its place
+  assert len(manager.shown) == 2
+
+
+def test_sink_is_closed_however_the_loop_ends():
+  manager = Manager(max_fetches=0)
+  with pytest.raises(KeyboardInterrupt):
+    manager.start()
+  assert manager.sink.closed == 1
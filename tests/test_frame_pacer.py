@@ -0,0 +1,114 @@
+from display import display
+from display.display import FramePacer
+from display.sinks import NullSink
+from types import SimpleNamespace
+import pytest
+
+
+class FakeClock(object):
+
+  def __init__(self):
+    self.now = 100.0
+
+  def monotonic(self):
+    return self.now
+
+  def sleep(self, secs):
+    self.now += secs
+
+
+class IdleCountingSink(NullSink):
+
+  def __init__(self):
+    super().__init__()
+    self.idles = 0
+
+  def idle(self):
+    self.idles += 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  clock = FakeClock()
+  monkeypatch.setattr(display, 'time', SimpleNamespace(monotonic=clock.monotonic,
+                                                       sleep=clock.sleep))
+  return clock
+
+
+def play(pacer, clock, render_secs, frames, duration, droppable=True):
+  sink = IdleCountingSink()
+  shown = []
+  for frame in range(frames):
+    if pacer.begin_frame(duration, droppable):
+      clock.now += render_secs
+      shown.append(frame)
+    pacer.end_frame(duration, sink)
+  return shown, sink
+
+
+def test_frames_that_keep_up_are_presented_on_schedule(clock):
+  pacer = FramePacer()
+  start = clock.now
+  shown, sink = play(pacer, clock, 0.01, 30, 1 / 30)
+  assert shown == list(range(30))
+  # Render time comes out of each frame's slot instead of adding to it
+  assert clock.now - start == pytest.approx(1)
+  assert sink.idles == 30
+  stats = pacer.get_stats()
+  assert (stats['presented'], stats['late'], stats['dropped']) == (30, 0, 0)
+  assert stats['fps'] == pytest.approx(30)
+
+
+def test_long_holds_idle_the_sink_while_waiting(clock, monkeypatch):
+  monkeypatch.setattr(display, 'IDLE_INTERVAL_SECS', 0.25)
+  pacer = FramePacer()
+  sink = IdleCountingSink()
+  pacer.begin_frame(1)
+  pacer.end_frame(1, sink)
+  assert sink.idles == 4
+  assert clock.now == 101
+
+
+def test_slow_frames_are_late_and_droppable_ones_are_dropped(clock):
+  pacer = FramePacer()
+  # Every frame takes twice its slot, so one in three is skipped to catch up
+  shown, _ = play(pacer, clock, 0.125, 10, 0.0625)
+  assert shown == [0, 1, 3, 4, 6, 7, 9]
+  stats = pacer.get_stats()
+  assert (stats['presented'], stats['late'], stats['dropped']) == (7, 3, 3)
+
+
+def test_frames_are_never_dropped_twice_in_a_row(clock):
+  pacer = FramePacer()
+  shown, _ = play(pacer, clock, 1, 6, 0.0625)
+  assert shown == [0, 2, 4]
+  assert pacer.get_stats()['dropped'] == 3
+
+
+def test_held_frames_are_late_but_never_dropped(clock):
+  pacer = FramePacer()
+  shown, _ = play(pacer, clock, 0.125, 5, 0.0625, droppable=False)
+  assert shown == list(range(5))
+  stats = pacer.get_stats()
+  assert (stats['presented'], stats['late'], stats['dropped']) == (5, 4, 0)
+
+
+def test_reset_starts_a_new_schedule(clock):
+  pacer = FramePacer()
+  play(pacer, clock, 0, 2, 0.05)
+  # Something else was on screen for a while
+  clock.now += 10
+  pacer.reset()
+  shown, _ = play(pacer, clock, 0, 2, 0.05)
+  assert shown == [0, 1]
+  assert pacer.get_stats()['late'] == 0
+
+
+def test_without_realtime_frames_are_only_accounted_for(clock):
+  pacer = FramePacer(realtime=False)
+  start = clock.now
+  shown, sink = play(pacer, clock, 0, 30, 1 / 30)
+  assert shown == list(range(30))
+  assert clock.now == start
+  assert sink.idles == 0
+  assert pacer.get_stats()['fps'] == pytest.approx(30)
@@ -0,0 +1,68 @@
+from display import frame_store
+from display.frame_store import FrameStack, get_frame_store_stats
+from PIL import Image
+import numpy as np
+import pytest
+
+
+def make_frames(count, colors):
+  rng = np.random.default_rng(3)
+  palette = rng.integers(0, 256, size=(colors, 3), dtype=np.uint8)
+  return [palette[rng.integers(0, colors, size=(32, 64))] for _ in range(count)]
+
+
+def test_few_colors_are_stored_as_palette_indices():
+  frames = make_frames(5, 40)
+  stack = FrameStack(frames)
+  assert stack.palette is not None
+  assert stack.pixels.dtype == np.uint8
+  assert stack.pixels.shape == (5, 32, 64)
+  for i, frame in enumerate(frames):
+    assert np.array_equal(np.asarray(stack.get_image(i)), frame)
+
+
+def test_many_colors_are_stored_as_rgb():
+  frames = make_frames(3, 1000)
+  stack = FrameStack(frames)
+  assert stack.palette is None
+  for i, frame in enumerate(frames):
+    assert np.array_equal(np.asarray(stack.get_image(i)), frame)
+
+
+def test_images_are_stored_without_alpha():
+  image = Image.new('RGBA', (64, 32), (10, 20, 30, 128))
+  stack = FrameStack([image])
+  decoded = stack.get_image(0)
+  assert decoded.mode == 'RGB'
+  assert decoded.getpixel((0, 0)) == (10, 20, 30)
+
+
+def test_decoded_frames_reuse_the_ring():
+  frames = make_frames(frame_store.RING_SIZE + 1, 8)
+  stack = FrameStack(frames)
+  decoded = list(stack)
+  assert decoded[0] is decoded[frame_store.RING_SIZE]
+  # Only the latest decode into a ring image is valid
+  assert np.array_equal(np.asarray(decoded[0]), frames[-1])
+  assert np.array_equal(np.asarray(decoded[1]), frames[1])
+
+
+def test_copied_frames_are_kept():
+  frames = make_frames(frame_store.RING_SIZE + 1, 8)
+  stack = FrameStack(frames)
+  kept = stack.get_image(0)
+  list(stack)
+  assert np.array_equal(np.asarray(kept), frames[0])
+
+
+def test_a_stack_needs_frames():
+  with pytest.raises(Exception):
+    FrameStack([])
+
+
+def test_stacks_are_counted_while_alive():
+  before = get_frame_store_stats()
+  stack = FrameStack(make_frames(2, 8))
+  stats = get_frame_store_stats()
+  assert stats['frames'] - before['frames'] == 2
+  assert stats['bytes'] - before['bytes'] == stack.nbytes
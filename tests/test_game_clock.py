@@ -0,0 +1,168 @@
+from data import game_clock
+from data.clock import SystemClock, set_clock
+from data.game_clock import GameClockModel, is_clock_running
+from data.models import Action
+from datetime import datetime, timezone
+import pytest
+
+START = datetime(2023, 1, 5, 1, 0, tzinfo=timezone.utc).timestamp()
+
+
+class FakeClock(object):
+  speed = 1
+
+  def __init__(self):
+    self.elapsed = 0
+
+  def time(self):
+    return START + self.elapsed
+
+  def monotonic(self):
+    return self.elapsed
+
+  def now(self):
+    return datetime.fromtimestamp(self.time(), timezone.utc)
+
+
+@pytest.fixture
+def clock():
+  clock = FakeClock()
+  set_clock(clock)
+  yield clock
+  set_clock(SystemClock())
+
+
+def make_action(number, clock_text, action_type='rebound', sub_type=None, period=1,
+                happened=0, shot_result=None):
+  happened_at = datetime.fromtimestamp(START + happened, timezone.utc)
+  return Action({
+      'actionNumber': number,
+      'period': period,
+      'clock': clock_text,
+      'timeActual': happened_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+      'actionType': action_type,
+      'subType': sub_type,
+      'shotResult': shot_result,
+  })
+
+
+@pytest.mark.parametrize('action_type, sub_type, running', [
+    ('rebound', 'defensive', True),
+    ('jumpball', 'recovered', True),
+    ('foul', 'personal', False),
+    ('timeout', 'full', False),
+    ('turnover', 'bad pass', True),
+    ('turnover', 'out-of-bounds', False),
+    ('period', 'start', False),
+])
+def test_clock_running_after_action(action_type, sub_type, running):
+  assert is_clock_running(make_action(1, 'PT10M00.00S', action_type, sub_type)) == running
+
+
+def test_made_shots_stop_the_clock_late_in_the_fourth():
+  assert is_clock_running(make_action(1, 'PT05M00.00S', '2pt', period=4, shot_result='Made'))
+  assert not is_clock_running(make_action(1, 'PT01M30.00S', '2pt', period=4,
+                                          shot_result='Made'))
+  assert is_clock_running(make_action(1, 'PT01M30.00S', '2pt', period=4, shot_result='Missed'))
+
+
+def test_running_clock_counts_down_between_actions(clock):
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S'))
+  clock.elapsed = 5
+  estimate = model.estimate()
+  assert estimate.period == 1
+  assert estimate.seconds == pytest.approx(595)
+  assert estimate.running
+
+
+def test_feed_delay_is_taken_off_the_clock(clock):
+  clock.elapsed = 3
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S', happened=0))
+  assert model.estimate().seconds == pytest.approx(597)
+
+
+def test_long_feed_delays_keep_the_clock_running(clock):
+  clock.elapsed = 30
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S', happened=0))
+  estimate = model.estimate()
+  assert estimate.seconds == pytest.approx(570)
+  assert estimate.running
+  assert estimate.error == game_clock.BASE_ERROR_SECS
+  clock.elapsed = 40
+  assert model.estimate().seconds == pytest.approx(560)
+  assert model.estimate().running
+
+
+def test_clock_stops_counting_after_a_delayed_action(clock):
+  clock.elapsed = 30
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S', happened=0))
+  clock.elapsed = 200
+  estimate = model.estimate()
+  assert estimate.seconds == pytest.approx(570 - game_clock.MAX_INTERPOLATION_SECS)
+  assert not estimate.running
+
+
+def test_feed_delay_is_capped(clock):
+  clock.elapsed = 1000
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S', happened=0))
+  assert model.estimate().seconds == pytest.approx(600 - game_clock.MAX_FEED_LAG_SECS)
+
+
+def test_stopped_clock_holds(clock):
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT04M12.00S', 'foul', 'personal'))
+  clock.elapsed = 30
+  estimate = model.estimate()
+  assert estimate.seconds == 4 * 60 + 12
+  assert not estimate.running
+
+
+def test_clock_stops_counting_without_new_actions(clock):
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S'))
+  clock.elapsed = 100
+  estimate = model.estimate()
+  assert estimate.seconds == pytest.approx(600 - game_clock.MAX_INTERPOLATION_SECS)
+  assert not estimate.running
+
+
+def test_error_grows_until_the_next_action(clock):
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S'))
+  assert model.estimate().error == game_clock.BASE_ERROR_SECS
+  clock.elapsed = 8
+  assert model.estimate().error == pytest.approx(game_clock.BASE_ERROR_SECS +
+                                                 8 * game_clock.ERROR_PER_SEC)
+  assert model.get_stats()['estimatedError'] == pytest.approx(model.estimate().error)
+
+
+def test_new_actions_correct_the_estimate(clock):
+  model = GameClockModel()
+  model.observe(make_action(1, 'PT10M00.00S'))
+  clock.elapsed = 10
+  # The clock actually stopped two seconds in
+  model.observe(make_action(2, 'PT09M58.00S', 'foul', 'personal', happened=10))
+  stats = model.get_stats()
+  assert stats['corrections'] == 1
+  assert stats['maxCorrection'] == pytest.approx(8)
+  assert model.estimate().seconds == 598
+
+
+def test_the_same_action_is_only_observed_once(clock):
+  model = GameClockModel()
+  action = make_action(1, 'PT10M00.00S')
+  model.observe(action)
+  clock.elapsed = 5
+  model.observe(action)
+  assert model.estimate().seconds == pytest.approx(595)
+  assert model.get_stats()['corrections'] == 0
+
+
+def test_no_estimate_without_actions():
+  assert GameClockModel().estimate() is None
+  assert GameClockModel().get_stats()['estimatedError'] is None
@@ -0,0 +1,82 @@
+from concurrent.futures import Future
+from data.live_poller import LivePoller
+from data.models import Game
+from data.playbyplay import remove_playbyplay_store
+from display import nba_display
+from display.display import Display, FramePacer
+from display.nba_display import AfterGame, LiveGame, NBADisplayManager
+from display.sinks import FakeRGBMatrix, NullSink
+from functools import partial
+import pytest
+
+GAME_ID = '0022200555'
+OTHER_GAME_ID = '0022200556'
+
+
+def make_game_data(game_id=GAME_ID, status=2, status_text='Q4 0:30'):
+  return {
+      'gameId': game_id,
+      'gameStatus': status,
+      'gameStatusText': status_text,
+      'period': 4,
+      'gameClock': 'PT00M30.00S',
+      'gameTimeUTC': '2023-01-05T00:30:00Z',
+      'awayTeam': {'teamTricode': 'MIL', 'score': 100},
+      'homeTeam': {'teamTricode': 'CHI', 'score': 98},
+  }
+
+
+def finish(poller, game_id=GAME_ID):
+  future = Future()
+  future.set_result(Game(make_game_data(game_id, status=3, status_text='Final')))
+  poller._on_poll_done(poller.tracked[game_id], 'boxscore', future)
+
+
+@pytest.fixture(autouse=True)
+def playbyplay_stores():
+  yield
+  remove_playbyplay_store(GAME_ID)
+  remove_playbyplay_store(OTHER_GAME_ID)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+  # Just what get_displays_to_show and LiveGame use, without starting the poller or the logo
+  # prewarm
+  manager = NBADisplayManager.__new__(NBADisplayManager)
+  manager.favorite_teams = []
+  manager.live_poller = LivePoller()
+  manager.sink = NullSink()
+  monkeypatch.setattr(Display, 'pacer_factory', partial(FramePacer, realtime=False))
+  return manager
+
+
+def use_scoreboard(monkeypatch, manager, games):
+  monkeypatch.setattr(manager, 'get_games_for_today', lambda: games, raising=False)
+  monkeypatch.setattr(nba_display, 'get_important_games', lambda favorite_teams, games: games)
+
+
+def test_final_game_is_shown_as_finished_while_the_scoreboard_lags(monkeypatch, manager):
+  scoreboard = [Game(make_game_data()), Game(make_game_data(OTHER_GAME_ID))]
+  use_scoreboard(monkeypatch, manager, scoreboard)
+  manager.get_displays_to_show()
+  finish(manager.live_poller)
+
+  # The scoreboard still says both are live
+  displays = manager.get_displays_to_show()
+  assert [type(display) for display in displays] == [AfterGame, LiveGame]
+  assert displays[0].game.status_text == 'Final'
+  # Only one game is left to rotate through
+  assert displays[1].display_secs is None
+
+
+def test_final_snapshot_is_shown_once(manager):
+  game = Game(make_game_data())
+  manager.live_poller.track(game)
+  finish(manager.live_poller)
+
+  display = LiveGame(game, manager=manager)
+  display.show(FakeRGBMatrix(), manager.sink)
+  assert manager.sink.frame_count == 1
+  assert display.current_image is not None
+
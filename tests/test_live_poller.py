@@ -0,0 +1,167 @@
+from concurrent.futures import Future
+from data import live_poller
+from data.live_poller import LivePoller
+from data.models import Game, GameStatus
+from data.playbyplay import get_playbyplay_store, remove_playbyplay_store
+from data.store import ResponseStore, set_response_store
+import asyncio
+import gc
+import os
+import pytest
+import threading
+
+GAME_ID = '0022200555'
+
+
+def make_game_data(status=2, status_text='Q4 0:30'):
+  return {
+      'gameId': GAME_ID,
+      'gameStatus': status,
+      'gameStatusText': status_text,
+      'period': 4,
+      'gameClock': 'PT00M30.00S',
+      'gameTimeUTC': '2023-01-05T00:30:00Z',
+      'awayTeam': {'teamTricode': 'MIL', 'score': 100},
+      'homeTeam': {'teamTricode': 'CHI', 'score': 98},
+  }
+
+
+def make_action(number):
+  return {'actionNumber': number, 'period': 4, 'clock': 'PT00M30.00S', 'actionType': 'rebound'}
+
+
+def poll_done(poller, endpoint, result):
+  future = Future()
+  future.set_result(result)
+  poller._on_poll_done(poller.tracked[GAME_ID], endpoint, future)
+
+
+@pytest.fixture(autouse=True)
+def playbyplay_store():
+  yield
+  remove_playbyplay_store(GAME_ID)
+
+
+@pytest.fixture
+def response_store(tmp_path):
+  store = ResponseStore(os.path.join(str(tmp_path), 'responses.sqlite3'))
+  set_response_store(store)
+  yield store
+  set_response_store(None)
+  store.close()
+
+
+def test_tracked_game_is_published_straight_away():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  assert poller.get_tracked_game_ids() == [GAME_ID]
+  assert poller.get_snapshot(GAME_ID).game.status == GameStatus.LIVE
+
+
+def test_final_game_stops_being_polled():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  poll_done(poller, 'boxscore', Game(make_game_data(status=3, status_text='Final')))
+  assert poller.get_tracked_game_ids() == []
+  assert poller.get_snapshot(GAME_ID).game.status == GameStatus.FINAL
+
+
+def test_final_game_is_not_tracked_again_while_the_scoreboard_lags():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  poll_done(poller, 'boxscore', Game(make_game_data(status=3, status_text='Final')))
+
+  # The scoreboard still says live
+  poller.track(Game(make_game_data()))
+  poller.set_tracked_games([Game(make_game_data())])
+  assert poller.get_tracked_game_ids() == []
+  assert poller.get_snapshot(GAME_ID).game.status == GameStatus.FINAL
+
+
+def test_untracked_games_are_dropped():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  poller.set_tracked_games([])
+  assert poller.get_tracked_game_ids() == []
+  assert poller.get_snapshot(GAME_ID) is None
+
+
+def test_restart_carries_on_from_the_stored_game(response_store):
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  store = get_playbyplay_store(GAME_ID)
+  store.merge_actions([make_action(1), make_action(2)])
+  store.etag = '"2"'
+  poll_done(poller, 'playbyplay', 2)
+  poll_done(poller, 'boxscore', Game(make_game_data(status_text='Q4 0:12')))
+  poller._save()
+
+  remove_playbyplay_store(GAME_ID)
+  restarted = LivePoller()
+  restarted.track(Game(make_game_data()))
+  snapshot = restarted.get_snapshot(GAME_ID)
+  assert snapshot.action_count == 2
+  assert snapshot.latest_action.number == 2
+  assert snapshot.game.status_text == 'Q4 0:12'
+  assert get_playbyplay_store(GAME_ID).etag == '"2"'
+
+
+def test_unchanged_polls_are_not_stored(response_store):
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  poll_done(poller, 'playbyplay', 0)
+  poller._save()
+  assert response_store.load('live-playbyplay', GAME_ID) is None
+
+
+def test_finished_games_are_forgotten_once_off_the_scoreboard():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  poll_done(poller, 'boxscore', Game(make_game_data(status=3, status_text='Final')))
+
+  poller.set_tracked_games([])
+  assert poller.get_snapshot(GAME_ID) is None
+  assert not poller.finished
+  assert not poller.unsaved
+
+
+def test_polls_finishing_after_untrack_are_dropped():
+  poller = LivePoller()
+  poller.track(Game(make_game_data()))
+  tracked = poller.tracked[GAME_ID]
+  poller.set_tracked_games([])
+
+  future = Future()
+  future.set_result(Game(make_game_data(status_text='Q4 0:12')))
+  poller._on_poll_done(tracked, 'boxscore', future)
+  assert poller.get_snapshot(GAME_ID) is None
+  assert poller.get_tracked_game_ids() == []
+  assert not poller.unsaved
+
+
+def test_dropped_pollers_leave_the_metrics():
+  gc.collect()
+  pollers = len(live_poller._pollers)
+  poller = LivePoller()
+  assert len(live_poller._pollers) == pollers + 1
+  del poller
+  gc.collect()
+  assert len(live_poller._pollers) == pollers
+
+
+def test_boxscore_is_parsed_off_the_event_loop(monkeypatch):
+  parsed_on = []
+
+  def parse(result):
+    parsed_on.append(threading.get_ident())
+    return Game(result)
+
+  class FakeAsyncClient(object):
+
+    async def get_game(self, game_id):
+      return make_game_data(status_text='Q4 0:12')
+
+  monkeypatch.setattr(live_poller, 'Game', parse)
+  game = asyncio.run(LivePoller()._poll_boxscore(FakeAsyncClient(), GAME_ID))
+  assert game.status_text == 'Q4 0:12'
+  assert parsed_on and parsed_on[0] != threading.get_ident()
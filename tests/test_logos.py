@@ -0,0 +1,105 @@
+from data import nba_data
+from PIL import Image, ImageDraw
+import os
+import pytest
+import time
+
+TEAM_ID = 1610612749
+
+
+def make_logo(color=(0, 71, 27, 255)):
+  logo = Image.new('RGBA', (200, 200))
+  ImageDraw.Draw(logo).ellipse((20, 40, 180, 160), fill=color)
+  return logo
+
+
+class Downloads(object):
+
+  def __init__(self, logo=None, error=None):
+    self.logo = logo
+    self.error = error
+    self.count = 0
+
+  def __call__(self, team_id):
+    self.count += 1
+    if self.error:
+      raise self.error
+    return self.logo
+
+
+@pytest.fixture(autouse=True)
+def logo_dir(tmp_path, monkeypatch):
+  monkeypatch.setattr(nba_data, 'TEAM_LOGO_DIR', str(tmp_path))
+  nba_data._get_team_logo.clear()
+  yield str(tmp_path)
+  nba_data._get_team_logo.clear()
+
+
+def colors(image):
+  return set(color for _, color in image.getcolors(image.width * image.height))
+
+
+def use_downloads(monkeypatch, downloads):
+  monkeypatch.setattr(nba_data, '_download_team_logo', downloads)
+  nba_data._get_team_logo.clear()
+  return downloads
+
+
+def test_downloaded_logo_is_rendered_and_stored(monkeypatch, logo_dir):
+  use_downloads(monkeypatch, Downloads(make_logo()))
+  logo = nba_data.get_team_logo(TEAM_ID)
+  assert logo.mode == 'RGB'
+  assert logo.size == (30, 30)
+  assert os.listdir(logo_dir) == ['%d_30x30.png' % TEAM_ID]
+
+
+def test_stored_logo_is_used_after_a_restart(monkeypatch):
+  use_downloads(monkeypatch, Downloads(make_logo()))
+  logo = nba_data.get_team_logo(TEAM_ID)
+
+  downloads = use_downloads(monkeypatch, Downloads(error=AssertionError('downloaded')))
+  stored = nba_data.get_team_logo(TEAM_ID)
+  assert downloads.count == 0
+  assert stored.tobytes() == logo.tobytes()
+
+
+def test_expired_logo_is_downloaded_again(monkeypatch, logo_dir):
+  use_downloads(monkeypatch, Downloads(make_logo()))
+  nba_data.get_team_logo(TEAM_ID)
+  path = os.path.join(logo_dir, '%d_30x30.png' % TEAM_ID)
+  month_ago = time.time() - 31 * 24 * 60 * 60
+  os.utime(path, (month_ago, month_ago))
+
+  downloads = use_downloads(monkeypatch, Downloads(make_logo(color=(200, 16, 46, 255))))
+  logo = nba_data.get_team_logo(TEAM_ID)
+  assert downloads.count == 1
+  assert (200, 16, 46) in colors(logo)
+  assert os.path.getmtime(path) > month_ago
+
+
+def test_stored_logo_is_used_offline_even_when_expired(monkeypatch, logo_dir):
+  use_downloads(monkeypatch, Downloads(make_logo()))
+  logo = nba_data.get_team_logo(TEAM_ID)
+  path = os.path.join(logo_dir, '%d_30x30.png' % TEAM_ID)
+  month_ago = time.time() - 31 * 24 * 60 * 60
+  os.utime(path, (month_ago, month_ago))
+
+  downloads = use_downloads(monkeypatch, Downloads(error=IOError('offline')))
+  assert nba_data.get_team_logo(TEAM_ID).tobytes() == logo.tobytes()
+  assert downloads.count == 1
+
+
+def test_missing_logo_offline_raises(monkeypatch):
+  use_downloads(monkeypatch, Downloads(error=IOError('offline')))
+  with pytest.raises(IOError):
+    nba_data.get_team_logo(TEAM_ID)
+
+
+def test_override_downloads_a_fresh_logo(monkeypatch):
+  use_downloads(monkeypatch, Downloads(make_logo()))
+  nba_data.get_team_logo(TEAM_ID)
+
+  downloads = use_downloads(monkeypatch, Downloads(make_logo(color=(200, 16, 46, 255))))
+  logo = nba_data.get_team_logo(TEAM_ID, cache_override=True)
+  assert downloads.count == 1
+  assert (200, 16, 46) in colors(logo)
@@ -0,0 +1,111 @@
+from data import metrics
+from urllib.request import urlopen
+import json
+import pytest
+import re
+
+# name{labels} value, as the Prometheus text format has it
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]+="([^"\\]|\\.)*",?)*\})? '
+                         r'(-?[0-9.e+-]+|\+Inf)$')
+
+
+@pytest.fixture
+def registry(monkeypatch):
+  # Metrics registered by a test only live as long as it does
+  monkeypatch.setattr(metrics, '_metrics', dict(metrics._metrics))
+  return metrics
+
+
+def render(metric):
+  return '\n'.join(metric.render())
+
+
+def test_counter_lines_are_labelled(registry):
+  requests = registry.counter('test_requests_total', 'Test requests', ['endpoint'])
+  requests.inc(endpoint='boxscore')
+  requests.inc(2, endpoint='boxscore')
+  requests.inc(endpoint='play"by\\play')
+  assert render(requests) == '\n'.join([
+      '# HELP scoreboard_test_requests_total Test requests',
+      '# TYPE scoreboard_test_requests_total counter',
+      'scoreboard_test_requests_total{endpoint="boxscore"} 3',
+      'scoreboard_test_requests_total{endpoint="play\\"by\\\\play"} 1',
+  ])
+
+
+def test_histogram_buckets_are_cumulative(registry):
+  seconds = registry.histogram('test_seconds', 'Test timings', buckets=(0.1, 1))
+  for value in (0.05, 0.5, 0.5, 5):
+    seconds.observe(value)
+  assert render(seconds) == '\n'.join([
+      '# HELP scoreboard_test_seconds Test timings',
+      '# TYPE scoreboard_test_seconds histogram',
+      'scoreboard_test_seconds_bucket{le="0.1"} 1',
+      'scoreboard_test_seconds_bucket{le="1"} 3',
+      'scoreboard_test_seconds_bucket{le="+Inf"} 4',
+      'scoreboard_test_seconds_sum 6.05',
+      'scoreboard_test_seconds_count 4',
+  ])
+  assert seconds.get_snapshot() == {'count': 4, 'sum': 6.05, 'max': 5}
+
+
+def test_collected_values_are_read_when_rendered(registry):
+  values = {('a',): 1}
+  gauge = registry.collected('test_size', 'Test sizes', 'gauge', ['cache'], lambda: values)
+  assert render(gauge).splitlines()[-1] == 'scoreboard_test_size{cache="a"} 1'
+  values[('a',)] = 2.5
+  assert render(gauge).splitlines()[-1] == 'scoreboard_test_size{cache="a"} 2.5'
+
+
+def test_failing_collector_renders_no_values(registry):
+
+  def collect():
+    raise ValueError('gone')
+
+  gauge = registry.collected('test_broken', 'Test broken', 'gauge', [], collect)
+  assert gauge.render() == ['# HELP scoreboard_test_broken Test broken',
+                            '# TYPE scoreboard_test_broken gauge']
+
+
+def test_metrics_are_registered_once(registry):
+  requests = registry.counter('test_once_total', 'Test once')
+  assert registry.counter('test_once_total', 'Test once') is requests
+  with pytest.raises(Exception):
+    registry.histogram('test_once_total', 'Test once')
+
+
+def test_exposition_is_well_formed(registry):
+  registry.counter('test_exposed_total', 'Test exposed', ['endpoint']).inc(endpoint='scoreboard')
+  registry.histogram('test_exposed_seconds', 'Test exposed', ['endpoint']).observe(
+      0.2, endpoint='scoreboard')
+  text = registry.render_prometheus()
+  assert text.endswith('\n')
+
+  names = []
+  for line in text.splitlines():
+    if line.startswith('# HELP '):
+      names.append(line.split()[2])
+    elif line.startswith('# TYPE '):
+      assert line.split()[2] == names[-1]
+      assert line.split()[3] in ('counter', 'gauge', 'histogram')
+    else:
+      assert SAMPLE_LINE.match(line), line
+      assert line.startswith(names[-1])
+  assert names == sorted(names)
+  assert 'scoreboard_test_exposed_total{endpoint="scoreboard"} 1' in text
+  assert 'scoreboard_test_exposed_seconds_count{endpoint="scoreboard"} 1' in text
+
+
+def test_endpoint_serves_both_formats(registry):
+  registry.counter('test_served_total', 'Test served').inc()
+  server = registry.serve(0)
+  try:
+    url = 'http://%s:%d' % server.server_address
+    with urlopen(url + '/metrics') as response:
+      assert response.headers['Content-Type'].startswith('text/plain')
+      assert 'scoreboard_test_served_total 1\n' in response.read().decode()
+    with urlopen(url + '/metrics.json') as response:
+      assert json.load(response)['test_served_total'] == 1
+  finally:
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,59 @@
+from data.models import Game, GameStatus, parse_clock, parse_utc_time
+from datetime import datetime, timezone
+import json
+import pytest
+
+
+def make_game(**fields):
+  data = {
+      'gameId': '0022200555',
+      'gameStatus': 2,
+      'gameStatusText': 'Q3 5:12',
+      'period': 3,
+      'gameClock': 'PT05M12.00S',
+      'gameTimeUTC': '2023-01-05T00:30:00Z',
+      'awayTeam': {'teamTricode': 'MIL', 'score': 80},
+      'homeTeam': {'teamTricode': 'CHI', 'score': 78},
+  }
+  data.update(fields)
+  return Game(data)
+
+
+@pytest.mark.parametrize('clock_text, seconds', [
+    ('PT05M32.00S', 332),
+    ('PT00M00.50S', 0.5),
+    ('', None),
+    (None, None),
+    ('5:32', None),
+])
+def test_parse_clock(clock_text, seconds):
+  assert parse_clock(clock_text) == seconds
+
+
+@pytest.mark.parametrize('text', ['2023-01-05T00:30:00Z', '2023-01-05T00:30:00.000Z'])
+def test_parse_utc_time(text):
+  assert parse_utc_time(text) == datetime(2023, 1, 5, 0, 30, tzinfo=timezone.utc)
+
+
+def test_game_fields_are_parsed_once():
+  game = make_game()
+  assert game.status == GameStatus.LIVE
+  assert game.clock_seconds == 312
+  assert [team.score for team in game.teams] == [80, 78]
+  assert game.away_team.info['abbreviation'] == 'MIL'
+
+
+def test_overtime_finals_are_final():
+  assert make_game(gameStatus=2, gameStatusText='Final/OT').status == GameStatus.FINAL
+
+
+@pytest.mark.parametrize('status', [0, 4, 5, None])
+def test_unknown_statuses_are_scheduled(status):
+  assert make_game(gameStatus=status, gameStatusText='PPD').status == GameStatus.SCHEDULED
+
+
+def test_recorded_boxscore_parses():
+  with open('benchmarks/fixtures/boxscore.json') as f:
+    game = Game(json.load(f)['game'])
+  assert game.status == GameStatus.FINAL
+  assert game.home_team.tricode == 'CHI'
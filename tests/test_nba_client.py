@@ -0,0 +1,75 @@
+from data import nba_client
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+
+class FakeClock(object):
+
+  def __init__(self):
+    self.now = 1000.0
+    self.sleeps = []
+
+  def monotonic(self):
+    return self.now
+
+  async def sleep(self, secs):
+    self.sleeps.append(secs)
+    self.now += secs
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  clock = FakeClock()
+  monkeypatch.setattr(nba_client, 'time', SimpleNamespace(monotonic=clock.monotonic))
+  monkeypatch.setattr(nba_client, 'asyncio', SimpleNamespace(sleep=clock.sleep))
+  return clock
+
+
+def acquire(bucket):
+  return asyncio.run(bucket.acquire())
+
+
+def test_burst_up_to_capacity_does_not_wait(clock):
+  bucket = nba_client.TokenBucket(3, 6)
+  assert [acquire(bucket) for _ in range(3)] == [0, 0, 0]
+  assert clock.sleeps == []
+
+
+def test_empty_bucket_waits_for_the_next_token(clock):
+  bucket = nba_client.TokenBucket(3, 6)
+  for _ in range(3):
+    acquire(bucket)
+
+  assert acquire(bucket) == pytest.approx(2)
+  assert clock.sleeps == [pytest.approx(2)]
+  assert clock.now == pytest.approx(1002)
+
+
+def test_waits_only_for_the_missing_part_of_a_token(clock):
+  bucket = nba_client.TokenBucket(3, 6)
+  for _ in range(3):
+    acquire(bucket)
+  clock.now += 1.5
+
+  assert acquire(bucket) == pytest.approx(0.5)
+
+
+def test_tokens_refill_over_time_up_to_capacity(clock):
+  bucket = nba_client.TokenBucket(3, 6)
+  for _ in range(3):
+    acquire(bucket)
+  clock.now += 60
+
+  assert [acquire(bucket) for _ in range(3)] == [0, 0, 0]
+  assert bucket.tokens == pytest.approx(0)
+  assert acquire(bucket) == pytest.approx(2)
+
+
+def test_sustained_rate_matches_the_limit(clock):
+  bucket = nba_client.TokenBucket(3, 6)
+  start = clock.now
+  for _ in range(13):
+    acquire(bucket)
+  # Three calls from the initial burst, then one every two seconds
+  assert clock.now - start == pytest.approx(20)
@@ -0,0 +1,123 @@
+from collections import namedtuple
+from data.playbyplay import PlayByPlayStore
+import asyncio
+import json
+import threading
+
+Response = namedtuple('Response', ['content', 'headers'])
+
+
+def make_action(number, edited=None, action_type='2pt', score_home=0):
+  return {
+      'actionNumber': number,
+      'period': 1,
+      'clock': 'PT10M00.00S',
+      'actionType': action_type,
+      'scoreAway': '0',
+      'scoreHome': str(score_home),
+      'edited': edited,
+  }
+
+
+def make_response(actions, etag='"1"'):
+  return Response(json.dumps({'game': {'actions': actions}}).encode(), {'ETag': etag})
+
+
+class FakeAsyncClient(object):
+
+  def __init__(self, responses):
+    self.responses = list(responses)
+    self.requests = []
+
+  async def get_playbyplay_if_modified(self, game_id, etag=None, last_modified=None):
+    self.requests.append(etag)
+    return self.responses.pop(0)
+
+
+def test_new_actions_are_appended():
+  store = PlayByPlayStore('game')
+  assert store.merge_actions([make_action(1), make_action(2)]) == 2
+  assert store.merge_actions([make_action(1), make_action(2), make_action(4)]) == 1
+  assert [action.number for action in store.actions] == [1, 2, 4]
+  assert store.watermark == 4
+  assert store.latest_action().number == 4
+
+
+def test_unchanged_actions_are_not_converted_again():
+  store = PlayByPlayStore('game', [make_action(1), make_action(2)])
+  first = store.actions[0]
+  assert store.merge_actions([make_action(1), make_action(2)]) == 0
+  assert store.actions[0] is first
+
+
+def test_edited_actions_are_replaced_in_place():
+  store = PlayByPlayStore('game', [make_action(1), make_action(2)])
+  changed = store.merge_actions([
+      make_action(1, edited='2023-01-05T01:00:00Z', score_home=3),
+      make_action(2),
+  ])
+  assert changed == 1
+  assert [action.number for action in store.actions] == [1, 2]
+  assert store.actions[0].score_home == 3
+
+
+def test_removed_actions_rebuild_the_store():
+  store = PlayByPlayStore('game', [make_action(1), make_action(2), make_action(3)])
+  assert store.merge_actions([make_action(1), make_action(3)]) == 2
+  assert [action.number for action in store.actions] == [1, 3]
+  assert store.merge_actions([make_action(1), make_action(3), make_action(4)]) == 1
+
+
+def test_not_modified_response_changes_nothing():
+  store = PlayByPlayStore('game', [make_action(1)])
+  assert store.apply_response(None) == 0
+  assert store.get_stats()['notModified'] == 1
+  assert len(store.actions) == 1
+
+
+def test_response_validators_are_kept():
+  store = PlayByPlayStore('game')
+  assert store.apply_response(make_response([make_action(1)], etag='"abc"')) == 1
+  assert store.etag == '"abc"'
+  assert store.get_stats()['bytesReceived'] > 0
+
+
+def test_sync_sends_the_last_etag():
+  store = PlayByPlayStore('game')
+  client = FakeAsyncClient([make_response([make_action(1)], etag='"1"'), None])
+  assert asyncio.run(store.sync_async(client)) == 1
+  assert asyncio.run(store.sync_async(client)) == 0
+  assert client.requests == [None, '"1"']
+
+
+def test_state_round_trips():
+  store = PlayByPlayStore('game', [make_action(1), make_action(2)])
+  store.etag, store.last_modified = '"2"', 'Thu, 05 Jan 2023 01:00:00 GMT'
+
+  restored = PlayByPlayStore('game')
+  restored.set_state(store.get_state())
+  assert [action.number for action in restored.actions] == [1, 2]
+  assert restored.etag == '"2"'
+  assert restored.last_modified == 'Thu, 05 Jan 2023 01:00:00 GMT'
+  assert restored.merge_actions([make_action(1), make_action(2), make_action(3)]) == 1
+
+
+def test_changed_feed_is_parsed_off_the_event_loop():
+  store = PlayByPlayStore('game')
+  client = FakeAsyncClient([make_response([make_action(1)]), None])
+  parsed_on = []
+  apply_response = store.apply_response
+
+  def record_thread(response):
+    parsed_on.append(threading.get_ident())
+    return apply_response(response)
+
+  store.apply_response = record_thread
+
+  async def sync():
+    return [await store.sync_async(client), await store.sync_async(client)]
+
+  assert asyncio.run(sync()) == [1, 0]
+  # Only the changed feed needs parsing, a 304 is applied straight away
+  assert parsed_on[0] != threading.get_ident()
+  assert parsed_on[1] == threading.get_ident()
@@ -0,0 +1,117 @@
+from data import polling
+from data.game_clock import is_clock_running
+from data.models import Action, Game
+from data.polling import PollScheduler, RequestBudget
+from datetime import datetime, timedelta, timezone
+import pytest
+
+
+def make_game(status=2, status_text='Q1 10:00', period=1, tipoff_in=-3600):
+  tipoff = datetime.now(timezone.utc) + timedelta(seconds=tipoff_in)
+  return Game({
+      'gameId': '0022200555',
+      'gameStatus': status,
+      'gameStatusText': status_text,
+      'period': period,
+      'gameClock': 'PT10M00.00S',
+      'gameTimeUTC': tipoff.strftime('%Y-%m-%dT%H:%M:%SZ'),
+      'awayTeam': {'teamTricode': 'MIL', 'score': 10},
+      'homeTeam': {'teamTricode': 'CHI', 'score': 12},
+  })
+
+
+def make_action(action_type, sub_type=None, period=1, clock='PT10M00.00S', shot_result=None):
+  return Action({
+      'actionNumber': 10,
+      'period': period,
+      'clock': clock,
+      'actionType': action_type,
+      'subType': sub_type,
+      'shotResult': shot_result,
+  })
+
+
+def test_final_games_are_not_polled():
+  assert PollScheduler().next_live_poll(make_game(status=3, status_text='Final')) == (None, None)
+
+
+@pytest.mark.parametrize('tipoff_in, delay', [
+    (2 * 60 * 60, polling.SCOREBOARD_SOON_DELAY),
+    (30 * 60, 2 * 60),
+    (5 * 60, polling.PERIOD_BREAK_DELAY),
+])
+def test_pregame_polls_speed_up_towards_tipoff(tipoff_in, delay):
+  game = make_game(status=1, status_text='7:30 pm ET', period=0, tipoff_in=tipoff_in)
+  assert PollScheduler().next_live_poll(game)[0] == delay
+
+
+@pytest.mark.parametrize('action, delay', [
+    (make_action('timeout', 'full'), polling.TIMEOUT_DELAY),
+    (make_action('instantreplay'), polling.REVIEW_DELAY),
+    (make_action('period', 'end', period=2, clock='PT00M00.00S'), polling.HALFTIME_DELAY),
+    (make_action('period', 'end', period=1, clock='PT00M00.00S'), polling.PERIOD_BREAK_DELAY),
+    (make_action('foul', 'personal'), polling.CLOCK_STOPPED_DELAY),
+    (make_action('2pt', 'jumpshot', shot_result='Made'), polling.CLOCK_RUNNING_DELAY),
+    (make_action('rebound', 'defensive'), polling.CLOCK_RUNNING_DELAY),
+])
+def test_playbyplay_delay_follows_the_latest_action(action, delay):
+  playbyplay_delay, boxscore_delay = PollScheduler().next_live_poll(make_game(), action)
+  assert playbyplay_delay == delay
+  assert boxscore_delay == max(delay * polling.BOXSCORE_DELAY_FACTOR, polling.MIN_BOXSCORE_DELAY)
+
+
+@pytest.mark.parametrize('action', [
+    make_action('jumpball', 'recovered'),
+    make_action('turnover', 'bad pass'),
+    make_action('turnover', 'out-of-bounds'),
+    make_action('violation', 'kicked ball'),
+    make_action('ejection'),
+    make_action('2pt', 'layup', period=4, clock='PT01M00.00S', shot_result='Made'),
+])
+def test_polling_and_the_clock_model_agree_on_a_stopped_clock(action):
+  delay, _ = PollScheduler().next_live_poll(make_game(), action)
+  running = is_clock_running(action)
+  assert (delay == polling.CLOCK_RUNNING_DELAY) == running
+  assert (delay == polling.CLOCK_STOPPED_DELAY) == (not running)
+
+
+def test_boxscore_is_polled_as_often_as_playbyplay_at_the_end_of_the_fourth():
+  action = make_action('period', 'end', period=4, clock='PT00M00.00S')
+  delay, boxscore_delay = PollScheduler().next_live_poll(make_game(period=4), action)
+  assert delay == boxscore_delay == polling.PERIOD_BREAK_DELAY
+
+
+@pytest.mark.parametrize('games, delay', [
+    ([make_game()], polling.SCOREBOARD_LIVE_DELAY),
+    ([make_game(status=3, status_text='Final')], polling.SCOREBOARD_IDLE_DELAY),
+    ([make_game(status=1, period=0, tipoff_in=10 * 60)], polling.SCOREBOARD_TIPOFF_DELAY),
+    ([make_game(status=1, period=0, tipoff_in=60 * 60)], polling.SCOREBOARD_SOON_DELAY),
+    ([make_game(status=1, period=0, tipoff_in=5 * 60 * 60)], polling.SCOREBOARD_IDLE_DELAY),
+])
+def test_scoreboard_delay_follows_the_days_games(games, delay):
+  assert PollScheduler().next_scoreboard_poll(games) == pytest.approx(delay, abs=1)
+
+
+def test_decisions_are_reported():
+  scheduler = PollScheduler()
+  scheduler.next_live_poll(make_game(), make_action('timeout', 'full'))
+  scheduler.record_poll('playbyplay')
+  report = scheduler.get_report()
+  assert report['decisions']['playbyplay'] == {'delay': polling.TIMEOUT_DELAY, 'reason': 'timeout'}
+  assert report['requestsPerHour'] == {'playbyplay': 1}
+
+
+def test_request_budget_holds_back_requests_over_the_limit():
+  budget = RequestBudget(2, 60)
+  assert budget.try_spend()
+  assert budget.try_spend()
+  assert not budget.try_spend()
+  assert 0 < budget.seconds_until_available() <= 60
+
+
+def test_request_budget_frees_up_after_its_period():
+  budget = RequestBudget(1, 60)
+  budget.try_spend()
+  budget.requests[0] -= 61
+  assert budget.seconds_until_available() == 0
+  assert budget.try_spend()
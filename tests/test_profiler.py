@@ -0,0 +1,90 @@
+from data import profiler
+from data.profiler import SamplingProfiler
+import os
+import pytest
+import signal
+import threading
+import time
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+  monkeypatch.setattr(profiler, 'PROFILE_DIR', str(tmp_path))
+  return str(tmp_path)
+
+
+def spin_for_the_profiler(stop):
+  while not stop.is_set():
+    time.sleep(0.001)
+
+
+@pytest.fixture
+def busy_thread():
+  stop = threading.Event()
+  thread = threading.Thread(target=spin_for_the_profiler, args=(stop,), name='busy')
+  thread.start()
+  yield thread
+  stop.set()
+  thread.join()
+
+
+def test_samples_are_collapsed_stacks_per_thread(busy_thread):
+  sampler = SamplingProfiler(interval=0.005)
+  sampler.run(0.1)
+  assert sampler.sample_count >= 5
+
+  stacks = sampler.get_collapsed_stacks().splitlines()
+  busy = [line for line in stacks if line.startswith('busy;')]
+  assert busy
+  stack, count = busy[0].rsplit(' ', 1)
+  assert int(count) > 0
+  assert stack.split(';')[-1] == 'spin_for_the_profiler (test_profiler.py)'
+  # The sampling thread leaves itself out
+  assert not any('SamplingProfiler.run' in line for line in stacks)
+
+
+def test_profile_stops_after_its_time_and_writes_the_stacks(profile_dir, busy_thread):
+  started = time.monotonic()
+  result = profiler.profile(0.05)
+  assert time.monotonic() - started < 1
+  assert result.sample_count > 0
+  files = os.listdir(profile_dir)
+  assert len(files) == 1 and files[0].startswith('profile-')
+  with open(os.path.join(profile_dir, files[0])) as f:
+    assert f.read() == result.get_collapsed_stacks()
+
+
+def test_only_one_profile_runs_at_a_time(profile_dir):
+  with profiler._running:
+    assert profiler.profile(0.05) is None
+  assert profiler.profile(0) is not None
+
+
+def test_profile_length_is_capped(profile_dir, monkeypatch):
+  lengths = []
+  monkeypatch.setattr(SamplingProfiler, 'run', lambda self, seconds: lengths.append(seconds))
+  profiler.profile(-1)
+  profiler.profile(profiler.MAX_SECS * 10)
+  profiler.profile('0.5')
+  assert lengths == [0, profiler.MAX_SECS, 0.5]
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='needs SIGUSR1')
+def test_signal_starts_a_background_profile(monkeypatch):
+  started = threading.Event()
+  monkeypatch.setattr(profiler, 'profile_in_background', started.set)
+  previous = signal.getsignal(signal.SIGUSR1)
+  try:
+    profiler.install_signal_handler()
+    os.kill(os.getpid(), signal.SIGUSR1)
+    assert started.wait(timeout=5)
+  finally:
+    signal.signal(signal.SIGUSR1, previous)
+
+
+def test_background_profile_runs_on_its_own_thread(profile_dir):
+  thread = profiler.profile_in_background(0.05)
+  assert thread.name == 'profiler' and thread.daemon
+  thread.join(timeout=5)
+  assert not thread.is_alive()
+  assert len(os.listdir(profile_dir)) == 1
@@ -0,0 +1,75 @@
+from display.render_cache import get_rendered_size, RenderCache
+from PIL import Image
+
+
+class Render(object):
+
+  def __init__(self, size=(64, 32)):
+    self.size = size
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    return Image.new('RGB', self.size)
+
+
+FRAME_BYTES = 64 * 32 * 3
+
+
+def test_same_slot_and_version_is_rendered_once():
+  cache = RenderCache()
+  render = Render()
+  image = cache.get(('AfterGame', 'a'), 1, render)
+  assert cache.get(('AfterGame', 'a'), 1, render) is image
+  assert render.calls == 1
+  stats = cache.get_stats()
+  assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_slots_are_kept_apart():
+  cache = RenderCache()
+  render = Render()
+  cache.get(('AfterGame', 'a'), 1, render)
+  cache.get(('AfterGame', 'b'), 1, render)
+  cache.get(('Standings', 'a'), 1, render)
+  assert render.calls == 3
+  assert cache.get_stats()['entries'] == 3
+
+
+def test_new_version_replaces_the_slot():
+  cache = RenderCache()
+  render = Render()
+  cache.get(('AfterGame', 'a'), 1, render)
+  cache.get(('AfterGame', 'a'), 2, render)
+  assert render.calls == 2
+  stats = cache.get_stats()
+  assert (stats['invalidations'], stats['entries'], stats['bytes']) == (1, 1, FRAME_BYTES)
+  cache.get(('AfterGame', 'a'), 2, render)
+  assert render.calls == 2
+
+
+def test_least_recently_used_entries_are_evicted_over_the_cap():
+  cache = RenderCache(max_bytes=2 * FRAME_BYTES)
+  render = Render()
+  cache.get('a', 1, render)
+  cache.get('b', 1, render)
+  cache.get('a', 1, render)
+  cache.get('c', 1, render)
+  assert list(cache.entries) == ['a', 'c']
+  stats = cache.get_stats()
+  assert (stats['evictions'], stats['bytes']) == (1, 2 * FRAME_BYTES)
+
+
+def test_values_over_the_cap_are_returned_but_not_kept():
+  cache = RenderCache(max_bytes=FRAME_BYTES - 1)
+  render = Render()
+  assert cache.get('a', 1, render).size == (64, 32)
+  cache.get('a', 1, render)
+  assert render.calls == 2
+  assert cache.get_stats()['entries'] == 0
+
+
+def test_rendered_size_counts_every_image():
+  slides = [Image.new('RGBA', (64, 32)), Image.new('L', (64, 32))]
+  assert get_rendered_size((slides, Image.new('RGB', (64, 32)))) == 64 * 32 * (4 + 1 + 3)
+  assert get_rendered_size(None) == 0
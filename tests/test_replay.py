@@ -0,0 +1,29 @@
+from data.models import Game, GameStatus
+from data.replay import GameRecording
+from datetime import timedelta
+import pytest
+
+
+@pytest.fixture(scope='module')
+def recording():
+  return GameRecording('benchmarks/fixtures')
+
+
+def test_replay_starts_with_the_game_live(recording):
+  game = Game(recording.get_game(recording.start.timestamp()))
+  assert game.status == GameStatus.LIVE
+  assert game.period == 1
+  assert recording.start >= recording.tipoff
+
+
+def test_replay_before_the_start_is_pregame(recording):
+  game = Game(recording.get_game((recording.start - timedelta(minutes=1)).timestamp()))
+  assert game.status == GameStatus.SCHEDULED
+  assert game.period == 0
+
+
+def test_replay_ends_final(recording):
+  game = Game(recording.get_game(recording.end))
+  assert game.status == GameStatus.FINAL
+  assert [team.score for team in game.teams] == [int(recording.actions[-1]['scoreAway']),
+                                                 int(recording.actions[-1]['scoreHome'])]
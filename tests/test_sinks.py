@@ -0,0 +1,124 @@
+from display.sinks import (FakeRGBMatrix, get_dirty_rects, MultiSink, NullSink, RecorderSink,
+                           RGBMatrixSink)
+from PIL import Image, ImageDraw
+import numpy as np
+import os
+import random
+
+
+def make_frame(boxes=(), size=(64, 32)):
+  image = Image.new('RGB', size)
+  draw = ImageDraw.Draw(image)
+  for box, color in boxes:
+    draw.rectangle(box, fill=color)
+  return image
+
+
+def shown(matrix):
+  return np.asarray(matrix.displayed_canvas.image)
+
+
+def test_matrix_shows_the_presented_frame():
+  matrix = FakeRGBMatrix()
+  sink = RGBMatrixSink(matrix)
+  for boxes in ([((2, 2, 10, 10), (255, 0, 0))], [((30, 5, 40, 20), (0, 255, 0))]):
+    frame = make_frame(boxes)
+    sink.present(frame)
+    assert np.array_equal(shown(matrix), np.asarray(frame))
+  assert matrix.swap_count == 2
+
+
+def test_no_dirty_rects_for_an_unchanged_frame():
+  frame = np.asarray(make_frame([((2, 2, 10, 10), (255, 0, 0))]))
+  assert get_dirty_rects(frame, frame.copy()) is None
+
+
+def test_dirty_rects_cover_each_run_of_changed_rows():
+  previous = np.asarray(make_frame())
+  frame = np.asarray(make_frame([((5, 1, 9, 2), (255, 0, 0)), ((20, 10, 40, 12), (0, 255, 0)),
+                                 ((2, 11, 3, 11), (0, 0, 255))]))
+  assert get_dirty_rects(frame, previous) == [(5, 1, 10, 3), (2, 10, 41, 13)]
+
+
+def test_dirty_rects_at_the_edges():
+  previous = np.asarray(make_frame())
+  frame = np.asarray(make_frame([((0, 0, 0, 0), (1, 1, 1)), ((63, 31, 63, 31), (1, 1, 1))]))
+  assert get_dirty_rects(frame, previous) == [(0, 0, 1, 1), (63, 31, 64, 32)]
+
+
+def test_matrix_shows_every_frame_exactly():
+  # Small changes go out as dirty rects against the frame from two swaps ago, so check the result
+  # against the full frame every time
+  rng = random.Random(7)
+  matrix = FakeRGBMatrix()
+  sink = RGBMatrixSink(matrix)
+  boxes = []
+  for _ in range(60):
+    if rng.random() < 0.2:
+      boxes = []
+    x, y = rng.randrange(60), rng.randrange(28)
+    color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    boxes.append(((x, y, x + rng.randrange(4), y + rng.randrange(4)), color))
+    frame = make_frame(boxes)
+    sink.present(frame)
+    assert np.array_equal(shown(matrix), np.asarray(frame))
+    if rng.random() < 0.3:
+      sink.present(frame.copy())
+      assert np.array_equal(shown(matrix), np.asarray(frame))
+
+  stats = sink.get_stats()
+  assert stats['partial'] > 0
+  assert stats['skipped'] > 0
+
+
+def test_unchanged_frames_are_skipped():
+  matrix = FakeRGBMatrix()
+  sink = RGBMatrixSink(matrix)
+  frame = make_frame([((2, 2, 10, 10), (255, 0, 0))])
+  sink.present(frame)
+  sink.present(frame.copy())
+  assert matrix.swap_count == 1
+  assert sink.get_stats()['skipped'] == 1
+
+
+def test_rgba_frames_are_shown_as_rgb():
+  matrix = FakeRGBMatrix()
+  sink = RGBMatrixSink(matrix)
+  frame = make_frame([((2, 2, 10, 10), (255, 0, 0))])
+  sink.present(frame.convert('RGBA'))
+  assert np.array_equal(shown(matrix), np.asarray(frame))
+
+
+def test_multi_sink_presents_to_every_sink():
+  sinks = [NullSink(), NullSink(copy_frames=True)]
+  sink = MultiSink(sinks)
+  frame = make_frame([((2, 2, 10, 10), (255, 0, 0))])
+  sink.present(frame)
+  sink.present(frame)
+  assert [each.frame_count for each in sinks] == [2, 2]
+  assert np.array_equal(sinks[1].buffer, np.asarray(frame))
+
+
+def test_gif_recordings_are_written_in_parts(tmp_path):
+  sink = RecorderSink(directory=str(tmp_path), format='gif', max_gif_frames=3)
+  for i in range(7):
+    sink.present(make_frame([((i, 0, i, 0), (255, 255, 255))]))
+  assert len(sink.frames) == 1
+  sink.close()
+  sink.close()
+
+  parts = sorted(os.listdir(sink.directory))
+  assert parts == ['recording-001.gif', 'recording-002.gif', 'recording-003.gif']
+  frame_counts = []
+  for part in parts:
+    with Image.open(os.path.join(sink.directory, part)) as gif:
+      frame_counts.append(gif.n_frames)
+  assert frame_counts == [3, 3, 1]
+
+
+def test_png_recordings_are_written_per_frame(tmp_path):
+  sink = RecorderSink(directory=str(tmp_path))
+  sink.present(make_frame())
+  sink.present(make_frame())
+  sink.close()
+  assert sorted(os.listdir(sink.directory)) == ['000001.png', '000002.png']
@@ -0,0 +1,28 @@
+from data.teams import find_team, get_team_by_abbreviation, get_team_by_id, get_teams
+import pytest
+
+
+@pytest.mark.parametrize('keyword', [
+    'MIL', 'mil', 'Milwaukee Bucks', 'milwaukee bucks', 'Bucks', 'Milwaukee', 'Wisconsin', 'Buck'
+])
+def test_find_team(keyword):
+  assert find_team(keyword)['abbreviation'] == 'MIL'
+
+
+def test_find_team_takes_the_first_match_like_a_scan():
+  assert find_team('Los Angeles')['abbreviation'] == 'LAC'
+  assert find_team('Cavalier')['abbreviation'] == 'CLE'
+
+
+@pytest.mark.parametrize('keyword', [None, '', 'Sonics'])
+def test_find_team_without_a_match(keyword):
+  assert find_team(keyword) is None
+
+
+def test_lookups_share_one_record_per_team():
+  team = find_team('Bulls')
+  assert get_team_by_id(team['id']) is team
+  assert get_team_by_id(str(team['id'])) is team
+  assert get_team_by_abbreviation('chi') is team
+  assert team in get_teams()
+  assert len(get_teams()) == 30
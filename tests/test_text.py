@@ -0,0 +1,65 @@
+from display import nba_display
+from PIL import Image, ImageColor, ImageDraw
+import pytest
+
+
+# The full-canvas compositing draw_text did before sprites were cached
+def draw_text_uncached(img, *args, **kwargs):
+  black_bg = Image.new('RGB', (img.width, img.height))
+  black_draw = ImageDraw.Draw(black_bg)
+  black_draw.text(*args, **kwargs)
+  bounding_box = black_bg.getbbox()
+
+  gray_bg = Image.new('RGBA', (img.width, img.height), color='#00000080')
+  gray_draw = ImageDraw.Draw(gray_bg)
+  gray_draw.text(*args, **kwargs)
+  text_img = gray_bg.crop(bounding_box)
+
+  clear_bg = Image.new('RGBA', (img.width, img.height), color='#00000000')
+  clear_bg.paste(text_img, bounding_box)
+  return Image.alpha_composite(img, clear_bg)
+
+
+def background():
+  image = Image.new('RGBA', (64, 32), color='#000')
+  ImageDraw.Draw(image).rectangle((10, 4, 50, 28), fill='#1d428a')
+  return image
+
+
+CENTERED = dict(anchor='mm', spacing=-2, align='center')
+TEXT_CASES = [
+    ((32, 16), 'MIL\nVS.\nBOS\n7:30', nba_display.get_seven_px_font, CENTERED),
+    ((32, 16), ' \n \nBOS\n ', nba_display.get_seven_px_font, CENTERED),
+    ((2, 1), 'Q4 0:45', nba_display.get_five_px_font, {}),
+    ((32, 24), '108-104', nba_display.get_seven_px_font_bold, dict(anchor='mt')),
+    ((58, 30), 'EDGE', nba_display.get_seven_px_font, dict(anchor='lt')),
+    ((-6, -3), 'EDGE', nba_display.get_seven_px_font, dict(anchor='lt')),
+]
+
+
+@pytest.mark.parametrize('xy, text, get_font, kwargs', TEXT_CASES,
+                         ids=[repr(case[1]) for case in TEXT_CASES])
+def test_cached_sprite_matches_uncached_draw(xy, text, get_font, kwargs):
+  kwargs = dict(kwargs, font=get_font(), fill=ImageColor.getrgb('#f00'))
+  expected = draw_text_uncached(background(), xy, text, **kwargs)
+  for _ in range(2):
+    assert nba_display.draw_text(background(), xy, text, **kwargs).tobytes() == expected.tobytes()
+
+
+def test_draw_text_reuses_sprites():
+  nba_display._get_text_sprite.cache_clear()
+  kwargs = dict(font=nba_display.get_seven_px_font(), fill=ImageColor.getrgb('#fff'), anchor='mm')
+  nba_display.draw_text(background(), (32, 16), '1:23', **kwargs)
+  nba_display.draw_text(background(), (20, 10), '1:23', **kwargs)
+  nba_display.draw_text(background(), (32, 16), '1:22', **kwargs)
+  info = nba_display.get_text_sprite_cache_info()
+  assert (info.hits, info.misses) == (1, 2)
+
+
+def test_blank_text_leaves_image_unchanged():
+  image = background()
+  result = nba_display.draw_text(image, (32, 16), ' \n ',
+                                 font=nba_display.get_seven_px_font(),
+                                 fill='#fff')
+  assert result is not image
+  assert result.tobytes() == image.tobytes()
@@ -0,0 +1,36 @@
+from benchmarks.transitions import TRANSITIONS
+from display.display import ArrayTransition
+from PIL import Image
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def images():
+  with Image.open('assets/testing/1642740948.png') as start_img:
+    start_img = start_img.convert('RGBA')
+  with Image.open('assets/testing/1642740978.png') as end_img:
+    end_img = end_img.convert('RGBA')
+  return start_img, end_img
+
+
+def get_frames(transition_class, images, use_arrays, **kwargs):
+  ArrayTransition.use_arrays = use_arrays
+  try:
+    return [
+        np.array(frame.convert('RGBA'))
+        for frame in transition_class(*images, **kwargs).iter_frames()
+    ]
+  finally:
+    ArrayTransition.use_arrays = True
+
+
+@pytest.mark.parametrize('transition_class, kwargs', TRANSITIONS,
+                         ids=['%s%s' % (cls.__name__, kwargs or '') for cls, kwargs in TRANSITIONS])
+def test_array_frames_match_pil_frames(transition_class, kwargs, images):
+  array_frames = get_frames(transition_class, images, True, **kwargs)
+  pil_frames = get_frames(transition_class, images, False, **kwargs)
+
+  assert len(array_frames) == len(pil_frames) > 0
+  for i, (array_frame, pil_frame) in enumerate(zip(array_frames, pil_frames)):
+    assert np.array_equal(array_frame, pil_frame), 'frame %d differs' % i